@@ -1,7 +1,6 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, send_file, abort, Response, stream_with_context, g
 from flask_cors import CORS
 from dotenv import load_dotenv
-from models.image_model import ImageTransformer
 from models.voice_model import VoiceConverter
 from models.meme_generator import MemeGenerator
 from utils.era_detector import EraDetector
@@ -9,6 +8,19 @@ from utils.cringe_meter import CringeMeter
 from services.google_services import GoogleVisionService, GoogleSpeechService, YouTubeService
 from services.gemini_service import GeminiService
 from models.text_model import TextTranslator
+from utils.vision_preprocess import prepare_vision_image
+from utils.audio_ingest import ingest_audio, sniff_audio_format, HEADER_BYTES
+from utils.derivatives import DerivativeStore
+from services.job_queue import JobQueue, FINISHED_STATUSES
+from services.render_pool import RenderPool, RenderPoolBusy
+from utils.data_store import memory_report
+from utils.incremental_scorer import IncrementalScorer, MAX_TEXT_LENGTH
+from utils.admission import AdmissionController, AdmissionRejected, RouteLimit
+import os
+import json
+import math
+import time
+from concurrent.futures.process import BrokenProcessPool
 
 # Load environment variables
 load_dotenv()
@@ -16,19 +28,125 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# Initialize models
-text_translator = TextTranslator()
-image_transformer = ImageTransformer()
-voice_converter = VoiceConverter()
-meme_generator = MemeGenerator()
-era_detector = EraDetector()
-cringe_meter = CringeMeter()
+# Admission control, checked before a request does any work: a token bucket
+# per client, a route bucket for upstream quotas, and concurrency capped at
+# the render pool for CPU work or at what upstream APIs take. Limits are per
+# web worker process
+upstream_slots = int(os.getenv('UPSTREAM_CONCURRENCY', 8))
 
-# Initialize services
-vision_service = GoogleVisionService()
-speech_service = GoogleSpeechService()
-youtube_service = YouTubeService()
-gemini_service = GeminiService()  # Replace OpenAI with Gemini
+# Each open event stream holds a server thread, so only a few per process;
+# streams end after a while and the client falls back to polling
+event_stream_slots = int(os.getenv('EVENT_STREAM_CONCURRENCY', 2))
+EVENT_STREAM_MAX_AGE = 60
+
+def translation_limit():
+    return RouteLimit(client_rate=1, client_burst=5, route_rate=10, route_burst=20,
+                      concurrency=upstream_slots, queue_depth=upstream_slots * 2)
+
+def speech_limit():
+    return RouteLimit(client_rate=0.2, client_burst=3, route_rate=1, route_burst=5,
+                      concurrency=max(1, render_slots // 2), queue_depth=render_slots, max_wait=15.0)
+
+def upstream_limit(client_rate=0.5):
+    return RouteLimit(client_rate=client_rate, client_burst=5,
+                      concurrency=upstream_slots, queue_depth=upstream_slots)
+
+def create_app():
+    """
+    Build the models, services and admission limits and return the app.
+    Nothing is built at import: render workers are spawned, and a spawned
+    process re-imports the main script, so `python app.py` would otherwise
+    build every service again in each worker.
+    """
+    global text_translator, voice_converter, meme_generator, era_detector, derivative_store
+    global cringe_meter, live_scorer, vision_service, speech_service, youtube_service
+    global gemini_service, render_pool, job_queue, render_slots, admission
+    
+    # Initialize models
+    text_translator = TextTranslator()
+    voice_converter = VoiceConverter()
+    meme_generator = MemeGenerator()
+    era_detector = EraDetector()
+    derivative_store = DerivativeStore()
+    cringe_meter = CringeMeter()
+    live_scorer = IncrementalScorer(era_detector, cringe_meter)
+
+    # Initialize services
+    vision_service = GoogleVisionService()
+    speech_service = GoogleSpeechService()
+    youtube_service = YouTubeService()
+    gemini_service = GeminiService()  # Replace OpenAI with Gemini
+
+    # Rendering runs in worker processes so it never blocks cheap routes;
+    # heavy endpoints can also run as background jobs with ?async=1
+    render_pool = RenderPool()
+    job_queue = JobQueue(pool=render_pool)
+
+    render_slots = render_pool.max_workers
+
+    admission = AdmissionController({
+        'transform_image': RouteLimit(client_rate=0.5, client_burst=5,
+                                      concurrency=render_slots, queue_depth=render_slots * 2),
+        'generate_meme': RouteLimit(client_rate=2, client_burst=10,
+                                    concurrency=render_slots, queue_depth=render_slots * 2),
+        'convert_voice': speech_limit(),
+        'speech_to_text': speech_limit(),
+        'translate_text': translation_limit(),
+        'translate_stream': translation_limit(),
+        'translate_and_rate': translation_limit(),
+        'rate_cringe': upstream_limit(client_rate=1),
+        'detect_era': upstream_limit(client_rate=1),
+        'detect_image_era': upstream_limit(),
+        'analyze_image': upstream_limit(),
+        'search_youtube': RouteLimit(client_rate=0.5, client_burst=5, route_rate=2, route_burst=10,
+                                     concurrency=upstream_slots, queue_depth=upstream_slots),
+        'live_score': RouteLimit(client_rate=20, client_burst=40),
+        'job_events': RouteLimit(client_rate=0.5, client_burst=5, concurrency=event_stream_slots)
+    })
+    
+    return app
+
+@app.before_request
+def admit_request():
+    # Clients may ask to be shed sooner than the route's own queue limit
+    try:
+        timeout = float(request.headers.get('X-Request-Timeout', 0)) or None
+    except ValueError:
+        timeout = None
+    try:
+        g.admission_ticket = admission.acquire(request.endpoint, request.remote_addr, timeout)
+    except AdmissionRejected as e:
+        response = jsonify({'error': e.reason})
+        response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+        return response, e.status
+
+@app.teardown_request
+def release_admission(exc):
+    admission.release(g.pop('admission_ticket', None))
+
+def hold_admission(response):
+    """
+    Keep the request's admission slot until a streamed response is closed;
+    teardown_request runs as soon as the view returns, before the stream.
+    """
+    ticket = g.pop('admission_ticket', None)
+    response.call_on_close(lambda: admission.release(ticket))
+    return response
+
+def wants_async():
+    return request.values.get('async', '').lower() in ('1', 'true', 'yes')
+
+def render_busy():
+    response = jsonify({'error': 'Server busy, try again shortly'})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+def job_accepted(job_id):
+    return jsonify({
+        'job_id': job_id,
+        'status_url': f'/jobs/{job_id}',
+        'events_url': f'/jobs/{job_id}/events'
+    }), 202
 
 @app.route('/')
 def index():
@@ -76,14 +194,54 @@ def translate_text():
 
 def mock_translate(text, era):
     """Provide reliable mock translations without external dependencies"""
-    if era == "1990s":
-        return f"<<< {text} >>> LOL!! *dials up modem sounds* ASL?? ~*~Only 90s kids will understand~*~ BRB, mom needs the phone line!!"
-    elif era == "2000s":
-        return f"~*~*{text}*~*~ roflmao!! xD :P (8) msn messenger status (8) brb g2g ttyl l8r sk8r"
-    elif era == "2010s":
-        return f"I can't even... {text} #blessed #nofilter #yolo #swag #tbt *insert instagram filter* literally dying rn"
-    else:  # 2020s
-        return f"no cap fr fr {text} 💀💅 *emotional damage* POV: you're reading this in 2023, vibing, it's giving main character energy"
+    return text_translator.mock_engine.translate(text, era)
+
+@app.route('/translate-stream', methods=['POST'])
+def translate_stream():
+    data = request.get_json(silent=True)
+    if not data or not data.get('text'):
+        return jsonify({"error": "No text provided"}), 400
+    
+    text = data['text']
+    era = data.get('era', '2000s')
+    
+    def stream():
+        # Tokens are forwarded as they arrive; the final event adds the rating
+        for event, payload in text_translator.translate_stream(text, era):
+            if event == 'done':
+                payload = dict(payload, original=text, era=era,
+                               cringe_score=cringe_meter.quick_rate(payload['translated'], era))
+            else:
+                payload = {'text': payload}
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    return hold_admission(Response(stream_with_context(stream()), mimetype='text/event-stream',
+                                   headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}))
+
+@app.route('/translate-and-rate', methods=['POST'])
+def translate_and_rate():
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    
+    text = data.get('text', '')
+    era = data.get('era', '2000s')
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+    
+    try:
+        # One model call returns the translation and its rating together
+        result = text_translator.translate_and_rate(text, era, cringe_meter)
+        return jsonify({
+            "translated": result["translated"],
+            "cringe_score": result["cringe_score"],
+            "source": result["source"],
+            "original": text,
+            "era": era
+        })
+    except Exception as e:
+        print(f"Error in translate_and_rate: {str(e)}")
+        return jsonify({"error": "Server error: Could not translate text"}), 500
 
 @app.route('/transform-image', methods=['POST'])
 def transform_image():
@@ -92,18 +250,57 @@ def transform_image():
     
     image = request.files['image']
     era = request.form.get('era', '2000s')
+    max_kb = request.form.get('max_kb', type=int)
+    
+    if wants_async():
+        job_id = job_queue.submit('image', {
+            'image_path': job_queue.save_upload(image, os.path.splitext(image.filename or '')[1]),
+            'era': era,
+            'accept': request.headers.get('Accept'),
+            'max_kb': max_kb
+        })
+        return job_accepted(job_id)
     
-    transformed_url = image_transformer.transform(image, era)
-    return jsonify({'transformed_url': transformed_url})
+    try:
+        result = render_pool.run('image', {
+            'era': era,
+            'accept': request.headers.get('Accept'),
+            'max_kb': max_kb
+        }, image.read())
+    except (RenderPoolBusy, BrokenProcessPool):
+        return render_busy()
+    except Exception as e:
+        return jsonify({'error': f'Error transforming image: {str(e)}'}), 500
+    return jsonify(result)
 
 @app.route('/convert-voice', methods=['POST'])
 def convert_voice():
     if 'audio' not in request.files:
         return jsonify({'error': 'No audio provided'}), 400
     
-    audio = request.files['audio']
     era = request.form.get('era', '2000s')
     
+    if wants_async():
+        # Only sniff here; the worker does the decoding
+        audio_file = request.files['audio']
+        container, _ = sniff_audio_format(audio_file.stream.read(HEADER_BYTES))
+        audio_file.stream.seek(0)
+        if container is None:
+            return jsonify({'error': 'Unsupported audio format'}), 400
+        job_id = job_queue.submit('voice', {
+            'audio_path': job_queue.save_upload(audio_file, f'.{container}'),
+            'era': era
+        })
+        return job_accepted(job_id)
+    
+    # Decode once up front; unsupported formats fail fast instead of upstream
+    try:
+        audio = ingest_audio(request.files['audio'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except OSError as e:
+        return jsonify({'error': f'Audio decoding unavailable: {str(e)}'}), 503
+    
     converted_url = voice_converter.convert(audio, era)
     return jsonify({'converted_url': converted_url})
 
@@ -116,9 +313,98 @@ def generate_meme():
     else:
         image = None
     text = data.get('text', '')
+    output_format = data.get('format')
+    max_kb = data.get('max_kb', type=int)
+    
+    if wants_async():
+        job_id = job_queue.submit('meme', {
+            'template': template,
+            'image_path': job_queue.save_upload(image) if image else None,
+            'text': text,
+            'format': output_format,
+            'accept': request.headers.get('Accept'),
+            'max_kb': max_kb
+        })
+        return job_accepted(job_id)
+    
+    try:
+        result = render_pool.run('meme', {
+            'template': template,
+            'text': text,
+            'format': output_format,
+            'accept': request.headers.get('Accept'),
+            'max_kb': max_kb
+        }, image.read() if image else None)
+    except (RenderPoolBusy, BrokenProcessPool):
+        return render_busy()
+    except Exception as e:
+        return jsonify({'error': f'Error generating meme: {str(e)}'}), 500
+    return jsonify(result)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def stream(job):
+        # One event per status change, ending when the job finishes or the
+        # stream reaches its maximum age
+        deadline = time.monotonic() + EVENT_STREAM_MAX_AGE
+        yield f"event: status\ndata: {json.dumps(job)}\n\n"
+        while job['status'] not in FINISHED_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            updated = job_queue.wait_for_update(job_id, job['status'], timeout=min(15.0, remaining))
+            if updated is None:
+                break
+            if updated['status'] == job['status']:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: status\ndata: {json.dumps(updated)}\n\n"
+            job = updated
+    
+    return hold_admission(Response(stream(job), mimetype='text/event-stream',
+                                   headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}))
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        'render_pool': render_pool.stats(),
+        'memory': memory_report(),
+        'live_score': live_scorer.stats(),
+        'admission': admission.stats(),
+        'image_context_parser': gemini_service.image_context_parser.stats()
+    })
+
+@app.route('/templates', methods=['GET'])
+def list_templates():
+    templates = meme_generator.list_templates(
+        era=request.args.get('era'),
+        template_type=request.args.get('type'),
+        query=request.args.get('q')
+    )
+    return jsonify({'templates': templates})
+
+@app.route('/thumb/<kind>/<int:width>/<filename>', methods=['GET'])
+def thumbnail(kind, width, filename):
+    # Generated files are never rewritten, so derivatives can be cached forever
+    path = derivative_store.get(kind, width, filename)
+    if path is None:
+        abort(404)
     
-    meme_url = meme_generator.generate(template, image, text)
-    return jsonify({'meme_url': meme_url})
+    response = send_file(path, max_age=31536000)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/detect-era', methods=['POST'])
 def detect_era():
@@ -128,6 +414,43 @@ def detect_era():
     era = era_detector.detect(content)
     return jsonify({'era': era})
 
+@app.route('/live-score', methods=['POST'])
+def live_score():
+    """
+    Era and cringe scores while typing. The first request sends the text and
+    gets a session_id; later ones send the edit {start, end, text} with the
+    resulting length and hash (see text_digest). A 409 means this worker's
+    copy of the session is missing or stale: the client resends the full
+    text with the same session_id. Sessions are per worker process, so
+    sticky routing by session avoids most resyncs.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'No data provided'}), 400
+    
+    era = data.get('era', '2020s')
+    session_id = data.get('session_id')
+    edit = data.get('edit')
+    if not isinstance(era, str) or (session_id is not None and not isinstance(session_id, str)):
+        return jsonify({'error': 'era and session_id must be strings'}), 400
+    
+    if session_id and edit is not None:
+        try:
+            start, end, insert = int(edit['start']), int(edit['end']), str(edit.get('text', ''))
+            length, digest = int(data['length']), str(data['hash'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Edit needs start, end, text, length and hash'}), 400
+        result = live_scorer.update(session_id, start, end, insert, era, length, digest)
+        if result is None:
+            return jsonify({'error': 'Session out of sync, resend the full text', 'resync': True}), 409
+    else:
+        text = data.get('text', '')
+        if not isinstance(text, str) or len(text) > MAX_TEXT_LENGTH:
+            return jsonify({'error': f'Text must be at most {MAX_TEXT_LENGTH} characters'}), 400
+        session_id, result = live_scorer.start(text, era, session_id)
+    
+    return jsonify(dict(result, session_id=session_id))
+
 @app.route('/rate-cringe', methods=['POST'])
 def rate_cringe():
     data = request.json
@@ -149,7 +472,11 @@ def detect_image_era():
     if 'image' not in request.files:
         return jsonify({'error': 'No image provided'}), 400
     
-    image = request.files['image']
+    # Decode and downscale once; every vision backend gets the same buffer
+    try:
+        image = prepare_vision_image(request.files['image'])
+    except (OSError, ValueError):
+        return jsonify({'error': 'Could not read image'}), 400
     
     try:
         era = vision_service.detect_era(image)
@@ -162,7 +489,10 @@ def analyze_image():
     if 'image' not in request.files:
         return jsonify({'error': 'No image provided'}), 400
     
-    image = request.files['image']
+    try:
+        image = prepare_vision_image(request.files['image'])
+    except (OSError, ValueError):
+        return jsonify({'error': 'Could not read image'}), 400
     
     try:
         # Use Gemini Vision to analyze image
@@ -176,9 +506,19 @@ def speech_to_text():
     if 'audio' not in request.files:
         return jsonify({'error': 'No audio provided'}), 400
     
-    audio = request.files['audio']
+    try:
+        audio = ingest_audio(request.files['audio'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except OSError as e:
+        return jsonify({'error': f'Audio decoding unavailable: {str(e)}'}), 503
     
     try:
+        # Long recordings are chunked at silences and recognized in parallel
+        if request.form.get('mode') == 'long':
+            result = speech_service.transcribe_long_audio(audio)
+            return jsonify({'transcript': result['transcript'], 'segments': result['segments']})
+        
         transcript = speech_service.transcribe_audio(audio)
         return jsonify({'transcript': transcript})
     except Exception as e:
@@ -200,4 +540,4 @@ def search_youtube():
         return jsonify({'error': f'Error searching YouTube: {str(e)}'}), 500
 
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import argparse
+from models.meme_generator import MemeGenerator
+from models.meme_batch import load_captions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render one meme template over many captions"
+    )
+    parser.add_argument("template", help="Template name from data/meme_templates.json")
+    parser.add_argument("captions", nargs="*",
+                        help="Caption sets, with fields separated by '|'")
+    parser.add_argument("--captions-file",
+                        help="JSONL file (string, list or {\"text\"/\"captions\", \"name\"} per line) "
+                             "or a text file with one caption set per line")
+    parser.add_argument("--image", help="Image shared by every meme")
+    parser.add_argument("--out-dir", help="Directory for the rendered memes")
+    parser.add_argument("--zip", help="Write a zip archive instead ('-' for stdout)")
+    parser.add_argument("--format", choices=["jpeg", "webp", "avif"], help="Output format")
+    parser.add_argument("--max-kb", type=int, help="Size budget per meme")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    captions = list(args.captions)
+    if args.captions_file:
+        captions.extend(load_captions(args.captions_file))
+    if not captions:
+        parser.error("No captions provided")
+
+    zip_file = args.zip
+    if zip_file == "-":
+        # The archive gets its own handle on stdout; fd 1 then points at
+        # stderr, so nothing printed here or in worker processes lands in it
+        sys.stdout.flush()
+        zip_file = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    try:
+        generator = MemeGenerator()
+        report = generator.generate_batch(
+            args.template,
+            captions,
+            image=args.image,
+            output_format=args.format,
+            max_kb=args.max_kb,
+            output_dir=args.out_dir,
+            zip_file=zip_file,
+            workers=args.workers
+        )
+    finally:
+        if args.zip == "-":
+            zip_file.close()
+
+    if "error" in report:
+        print(f"Error: {report['error']}", file=sys.stderr)
+        return 1
+
+    print(f"Rendered {report['count']} memes in {report['seconds']}s "
+          f"({report['memes_per_second']} memes/sec, {report['workers']} workers)")
+    if args.zip is None:
+        print(json.dumps(report["outputs"], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import gc
+import os
+
+# gunicorn -c gunicorn.conf.py 'app:create_app()'
+#
+# The app, slang dictionary and meme templates are loaded once in the master
+# and forked into every worker, so those pages stay shared copy-on-write.
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", min(4, (os.cpu_count() or 1) * 2)))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = 120
+preload_app = True
+
+# gRPC clients (Vision, Speech) are created at import, before the fork
+os.environ.setdefault("GRPC_ENABLE_FORK_SUPPORT", "1")
+
+
+def on_starting(server):
+    from utils.data_store import preload, memory_report
+
+    preload()
+    server.log.info(f"Master memory after preload: {memory_report()}")
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach; a collection
+    # in a worker would otherwise write to those objects and unshare their pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from utils.data_store import memory_report
+
+    server.log.info(f"Worker {worker.pid} memory at fork: {memory_report()}")
+
+
+def post_worker_init(worker):
+    from utils.data_store import memory_report
+
+    worker.log.info(f"Worker {worker.pid} memory after init: {memory_report()}")
@@ -0,0 +1,174 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageChops, ImageDraw, ImageSequence, ImageStat, GifImagePlugin
+
+ANIMATED_FORMATS = ("gif", "webp")
+DEFAULT_FRAME_DURATION = 100
+WEBP_QUALITY = 80
+
+# Frames sampled across the animation to build the GIF's global palette
+PALETTE_SAMPLE_FRAMES = 8
+PALETTE_SAMPLE_SIZE = 256
+
+# Mean distance (0-255) from a frame's colors to the nearest global palette
+# entry above which the frame gets its own local palette
+LOCAL_PALETTE_THRESHOLD = 8
+
+
+def is_animated(img):
+    """True for multi-frame images such as animated GIF or WebP"""
+    return bool(getattr(img, "is_animated", False)) and getattr(img, "n_frames", 1) > 1
+
+
+class _FrameStream:
+    """
+    Stands in for a multi-frame image in Pillow's WebP writer, which pulls
+    frames with seek(). Each seek takes the next rendered frame from the
+    stream, so only the frames in flight are ever held in memory. Frame
+    durations are appended to `durations`, which the writer reads per frame
+    after seeking.
+    """
+
+    def __init__(self, frames, n_frames, durations):
+        self._frames = frames
+        self._current = None
+        self._durations = durations
+        self.n_frames = n_frames
+
+    def seek(self, index):
+        self._current, duration = next(self._frames)
+        self._durations.append(duration)
+
+    def __getattr__(self, name):
+        return getattr(self._current, name)
+
+
+class AnimatedMemeRenderer:
+    """
+    Render captions onto every frame of an animation.
+    Frames are decoded one at a time and composited on a thread pool with a
+    bounded window; static layers are rendered once and reused per frame.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.window = self.max_workers * 2
+
+    def render(self, plan, user_img, draw_text, output_path, output_format="gif"):
+        """Write the animated meme to output_path"""
+        background = plan.background()
+        animate_user = user_img is not None and bool(plan.slots) and is_animated(user_img)
+
+        # Everything above the animated layer is drawn once into an overlay
+        overlay = Image.new("RGBA", background.size, (0, 0, 0, 0))
+        if animate_user:
+            source = user_img
+        else:
+            source = Image.open(plan.background_path)
+            if user_img is not None and plan.slots:
+                plan.paste_slots(overlay, plan.prepare_source(user_img).convert("RGBA"))
+        draw_text(ImageDraw.Draw(overlay), overlay)
+
+        def compose(frame):
+            if animate_user:
+                canvas = background.copy()
+                plan.paste_slots(canvas, plan.resize_source(frame))
+                canvas = canvas.convert("RGBA")
+            else:
+                canvas = frame if frame.size == background.size else frame.resize(background.size)
+                canvas = canvas.convert("RGBA")
+            canvas.alpha_composite(overlay)
+            return canvas.convert("RGB")
+
+        frame_count = source.n_frames
+
+        if output_format == "webp":
+            source_frames = self._read_frames(source)
+            first, duration = next(source_frames)
+            first = compose(first)
+            rest = self._ordered_map(compose, source_frames)
+            durations = [duration]
+            first.save(
+                output_path,
+                format="WEBP",
+                save_all=True,
+                append_images=[_FrameStream(rest, frame_count - 1, durations)],
+                duration=durations,
+                loop=0,
+                quality=WEBP_QUALITY
+            )
+        else:
+            palette = self._global_palette(source, compose)
+            frames = self._ordered_map(
+                lambda frame: self._quantize(compose(frame), palette), self._read_frames(source)
+            )
+            self._write_gif(output_path, palette, frames)
+
+    def _global_palette(self, source, compose):
+        """One palette for the GIF, quantized from frames sampled across it"""
+        step = max(1, source.n_frames // PALETTE_SAMPLE_FRAMES)
+        samples = []
+        for index in range(0, source.n_frames, step):
+            source.seek(index)
+            sample = compose(source.convert("RGB"))
+            sample.thumbnail((PALETTE_SAMPLE_SIZE, PALETTE_SAMPLE_SIZE))
+            samples.append(sample)
+        source.seek(0)
+
+        montage = Image.new("RGB", (max(s.width for s in samples), sum(s.height for s in samples)))
+        top = 0
+        for sample in samples:
+            montage.paste(sample, (0, top))
+            top += sample.height
+        return montage.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+
+    def _quantize(self, canvas, palette):
+        """
+        Map a frame onto the global palette, or give it a local palette when
+        that shifts its colors too far. Returns (frame, has_local_palette).
+        """
+        # Undithered on a small copy: how far the palette is from the frame's colors
+        sample = canvas.copy()
+        sample.thumbnail((PALETTE_SAMPLE_SIZE, PALETTE_SAMPLE_SIZE))
+        mapped = sample.quantize(palette=palette, dither=Image.Dither.NONE).convert("RGB")
+        error = ImageStat.Stat(ImageChops.difference(sample, mapped)).mean
+        if sum(error) / len(error) > LOCAL_PALETTE_THRESHOLD:
+            return canvas.quantize(colors=256, method=Image.Quantize.MEDIANCUT), True
+        return canvas.quantize(palette=palette), False
+
+    def _read_frames(self, source):
+        """Decode frames one at a time as independent RGB images"""
+        for frame in ImageSequence.Iterator(source):
+            duration = frame.info.get("duration") or DEFAULT_FRAME_DURATION
+            yield frame.convert("RGB"), duration
+
+    def _ordered_map(self, fn, frames):
+        """Apply fn across the pool, keeping at most `window` frames in flight"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for frame, duration in frames:
+                pending.append((executor.submit(fn, frame), duration))
+                if len(pending) >= self.window:
+                    future, frame_duration = pending.popleft()
+                    yield future.result(), frame_duration
+            while pending:
+                future, frame_duration = pending.popleft()
+                yield future.result(), frame_duration
+
+    def _write_gif(self, output_path, palette, frames):
+        """Stream frames into a GIF with a global palette and per-frame local ones"""
+        with open(output_path, "wb") as fp:
+            header = None
+            for (frame, local_palette), frame_duration in frames:
+                if header is None:
+                    # The header's global color table comes from the shared palette
+                    screen = Image.new("P", frame.size)
+                    screen.putpalette(palette.getpalette())
+                    header, _ = GifImagePlugin.getheader(screen, info={"loop": 0})
+                    for chunk in header:
+                        fp.write(chunk)
+                for chunk in GifImagePlugin.getdata(frame, duration=frame_duration,
+                                                    include_color_table=local_palette):
+                    fp.write(chunk)
+            fp.write(b";")
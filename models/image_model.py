@@ -1,10 +1,15 @@
 import os
-import uuid
 import base64
-from PIL import Image, ImageFont, ImageDraw, ImageFilter, ImageEnhance
+from PIL import Image
 import requests
 from io import BytesIO
 from dotenv import load_dotenv
+from utils.image_encoding import save_image, encode_image, choose_profile
+from utils import tiled_filters
+from utils.service_cache import ServiceCache, make_key, read_source, static_file_exists
+
+# Transformed images are reused for identical uploads while the file exists
+TRANSFORM_CACHE_TTL = 24 * 3600
 
 class ImageTransformer:
     def __init__(self):
@@ -15,6 +20,9 @@ class ImageTransformer:
         # Create output directory if it doesn't exist
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
+        
+        # Shared by every worker on the host, so an upload is transformed once
+        self.cache = ServiceCache("transforms", ttl=TRANSFORM_CACHE_TTL)
             
         # Era-specific parameters
         self.era_params = {
@@ -36,71 +44,75 @@ class ImageTransformer:
             }
         }
     
-    def transform(self, image_file, era):
+    def transform(self, image_file, era, accept=None, max_kb=None):
         """
-        Transform an image to match the aesthetic of a specific internet era
+        Transform an image to match the aesthetic of a specific internet era.
+        The output is encoded for the client's Accept header, optionally under max_kb.
         """
         if era not in self.era_params:
             return "Era not supported"
-            
+        
+        data = read_source(image_file)
+        cache_key = make_key(data, era, choose_profile(accept), max_kb, bool(self.api_key))
+        return self.cache.get_or_compute(
+            cache_key,
+            lambda: self._transform(BytesIO(data), era, accept, max_kb),
+            valid=static_file_exists
+        )
+    
+    def _transform(self, image_file, era, accept, max_kb):
+        """Filter, optionally restyle and save one image, returning its URL"""
         # Save original image
         img = Image.open(image_file)
         
         # Apply era-specific filter
         img = self._apply_filter(img, era)
         
-        # Generate a unique filename
-        filename = f"{uuid.uuid4()}.jpg"
-        output_path = os.path.join(self.output_dir, filename)
-        
-        # Save transformed image
-        img.save(output_path)
-        
         # If Stability API is available, use it for more advanced transformation
         if self.api_key:
             try:
-                img_base64 = self._get_base64_from_file(output_path)
-                transformed_img = self._apply_stability_ai(img_base64, era)
-                transformed_img.save(output_path)
+                # Upload a compact JPEG rather than a re-read output file
+                img_base64 = base64.b64encode(encode_image(img, "jpeg")).decode('utf-8')
+                img = self._apply_stability_ai(img_base64, era)
             except Exception as e:
                 print(f"Stability API error: {str(e)}")
         
+        # Encode once with the negotiated profile
+        filename = save_image(img, self.output_dir, accept, max_kb=max_kb)
+        
         return f"/static/images/output/{filename}"
     
     def _apply_filter(self, img, era):
-        """Apply basic filter based on era"""
+        """
+        Apply basic filter based on era.
+        Filters run in place over horizontal strips, so working memory stays
+        a few strips on top of the decoded image however large it is.
+        """
         filter_type = self.era_params[era]["filter"]
         
+        # Sepia needs RGB; other filters keep alpha but not palettes
+        if filter_type == "sepia" and img.mode != "RGB":
+            img = img.convert('RGB')
+        elif img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert('RGB')
+        else:
+            img.load()
+        
         if filter_type == "pixelate":
             # Downsample then upsample for pixelation effect
-            small_img = img.resize((img.width // 10, img.height // 10), resample=Image.NEAREST)
-            img = small_img.resize(img.size, resample=Image.NEAREST)
+            img = tiled_filters.pixelate(img)
             
         elif filter_type == "sharpen":
             # Add sharpening and saturation for 2000s look
-            enhancer = ImageEnhance.Sharpness(img)
-            img = enhancer.enhance(2.0)
-            enhancer = ImageEnhance.Color(img)
-            img = enhancer.enhance(1.5)
+            img = tiled_filters.sharpen_saturate(img)
             
         elif filter_type == "sepia":
             # Apply sepia tone for 2010s Instagram look
-            img = img.convert('RGB')
-            w, h = img.size
-            for i in range(w):
-                for j in range(h):
-                    r, g, b = img.getpixel((i, j))
-                    tr = int(0.393 * r + 0.769 * g + 0.189 * b)
-                    tg = int(0.349 * r + 0.686 * g + 0.168 * b)
-                    tb = int(0.272 * r + 0.534 * g + 0.131 * b)
-                    img.putpixel((i, j), (tr if tr < 255 else 255, tg if tg < 255 else 255, tb if tb < 255 else 255))
+            img = tiled_filters.sepia(img)
                     
         elif filter_type == "enhance":
             # Enhance contrast and sharpness for modern look
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(1.2)
-            enhancer = ImageEnhance.Sharpness(img)
-            img = enhancer.enhance(1.1)
+            img = tiled_filters.contrast_sharpen(img)
             
         return img
     
@@ -0,0 +1,140 @@
+import os
+import re
+import json
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from utils.image_encoding import ENCODING_PROFILES, choose_profile, encode_image
+
+# Set once per worker process by _init_worker
+_worker = {}
+
+
+def _init_worker(template_name, source, profile_name, max_kb):
+    """
+    Build the generator and render plan once per process. The background is
+    decoded here and the shared user image arrives already at slot size.
+    """
+    from models.meme_generator import MemeGenerator
+
+    generator = MemeGenerator()
+    _set_worker_state(generator, generator._get_plan(template_name), source, profile_name, max_kb)
+
+
+def _set_worker_state(generator, plan, source, profile_name, max_kb):
+    plan.background()
+
+    user_img = None
+    if source is not None:
+        mode, size, data = source
+        user_img = Image.frombytes(mode, size, data)
+
+    _worker.update(generator=generator, plan=plan, user_img=user_img,
+                   profile_name=profile_name, max_kb=max_kb)
+
+
+def _render_caption(text):
+    """Render and encode one caption set in a worker"""
+    meme = _worker["generator"]._render(_worker["plan"], _worker["user_img"], text)
+    return encode_image(meme, _worker["profile_name"], _worker["max_kb"])
+
+
+def load_captions(path):
+    """
+    Read caption sets from a file. .jsonl lines may be a string, a list of
+    fields, or an object with "text" or "captions" and an optional "name";
+    any other file is one '|'-separated caption set per line.
+    """
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                items.append(json.loads(line))
+            else:
+                items.append(line)
+    return items
+
+
+def normalize_caption(item):
+    """Turn one caption item into (text, name)"""
+    name = None
+    if isinstance(item, dict):
+        name = item.get("name")
+        item = item.get("captions", item.get("text", ""))
+    if isinstance(item, (list, tuple)):
+        item = "|".join(str(part) for part in item)
+    return str(item), name
+
+
+def _output_name(index, name, extension):
+    if name:
+        stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.splitext(str(name))[0]).strip("._")
+        if stem:
+            return f"{index:04d}_{stem}.{extension}"
+    return f"{index:04d}.{extension}"
+
+
+def render_batch(generator, plan, captions, image=None, output_format=None, max_kb=None,
+                 output_dir=None, zip_file=None, workers=None):
+    """
+    Render one template over many caption sets. Outputs go to output_dir,
+    or into zip_file (a path or writable stream) when given.
+    """
+    profile_name = choose_profile(None, output_format)
+    extension = ENCODING_PROFILES[profile_name]["extension"]
+    items = [normalize_caption(item) for item in captions]
+    texts = [text for text, _ in items]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(items) or 1))
+
+    # Shared input: the user image decoded and resized once for every meme
+    source = None
+    if image is not None and plan.slots:
+        prepared = plan.prepare_source(image)
+        source = (prepared.mode, prepared.size, prepared.tobytes())
+
+    start = time.time()
+    if workers == 1:
+        _set_worker_state(generator, plan, source, profile_name, max_kb)
+        results = map(_render_caption, texts)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(plan.template_name, source, profile_name, max_kb)
+        )
+        chunksize = max(1, len(texts) // (workers * 4))
+        results = executor.map(_render_caption, texts, chunksize=chunksize)
+
+    outputs = []
+    try:
+        if zip_file is not None:
+            # Encoded images don't compress further, so entries are stored
+            with zipfile.ZipFile(zip_file, "w", compression=zipfile.ZIP_STORED) as archive:
+                for index, data in enumerate(results):
+                    filename = _output_name(index, items[index][1], extension)
+                    archive.writestr(filename, data)
+                    outputs.append(filename)
+        else:
+            os.makedirs(output_dir, exist_ok=True)
+            for index, data in enumerate(results):
+                filename = _output_name(index, items[index][1], extension)
+                with open(os.path.join(output_dir, filename), "wb") as f:
+                    f.write(data)
+                outputs.append(os.path.join(output_dir, filename))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.time() - start
+    return {
+        "count": len(outputs),
+        "outputs": outputs,
+        "seconds": round(elapsed, 3),
+        "memes_per_second": round(len(outputs) / elapsed, 2) if elapsed > 0 else None,
+        "workers": workers
+    }
@@ -1,11 +1,20 @@
 import os
 import json
 import uuid
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from dotenv import load_dotenv
 import requests
 import io
 import base64
+from utils.text_layout import LayoutEngine
+from utils.data_store import template_registry
+from models.animated_meme import AnimatedMemeRenderer, ANIMATED_FORMATS, is_animated
+from utils.image_encoding import save_image, choose_profile
+from models.meme_batch import render_batch
+from utils.service_cache import ServiceCache, make_key, read_source, static_file_exists
+
+# Rendered memes are reused for identical requests while the file exists
+MEME_CACHE_TTL = 24 * 3600
 
 class MemeGenerator:
     def __init__(self):
@@ -16,159 +25,127 @@ class MemeGenerator:
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
         
-        # Load meme templates
-        with open('data/meme_templates.json', 'r') as f:
-            self.templates = json.load(f)
+        # Validated templates compiled into render plans, reloaded when the file changes
+        self.registry = template_registry()
+        
+        # Captions are wrapped and auto-sized to fit their text field boxes
+        self.layout_engine = LayoutEngine()
+        
+        # Reaction GIFs and animated backgrounds are rendered frame by frame
+        self.animated_renderer = AnimatedMemeRenderer()
+        
+        # Shared by every worker on the host, so a meme is rendered once
+        self.cache = ServiceCache("memes", ttl=MEME_CACHE_TTL)
     
-    def generate(self, template_name, image=None, text=""):
+    def generate(self, template_name, image=None, text="", output_format=None, accept=None, max_kb=None):
         """
-        Generate a meme using the specified template, image, and text
+        Generate a meme using the specified template, image, and text.
+        The output format follows output_format or else the client's Accept
+        header; max_kb caps the size of static output.
         """
-        if template_name not in self.templates:
+        plan = self._get_plan(template_name)
+        if plan is None:
             return "Template not found"
-        
-        template = self.templates[template_name]
-        
-        # Create the meme based on template type
-        if template["type"] == "text_only":
-            return self._create_text_meme(template, text)
-        elif template["type"] == "image_text":
-            if not image:
-                return "Image required for this template"
-            return self._create_image_text_meme(template, image, text)
-        elif template["type"] == "multi_panel":
-            if not image:
-                return "Image required for this template"
-            return self._create_multi_panel_meme(template, image, text)
-        else:
-            return "Unknown template type"
+        if plan.requires_image and not image:
+            return "Image required for this template"
+        
+        # Keyed by the template definition too, so edited templates re-render
+        data = read_source(image) if image else b""
+        cache_key = make_key(
+            template_name, json.dumps(self.templates.get(template_name), sort_keys=True),
+            data, text, output_format, choose_profile(accept), max_kb
+        )
+        return self.cache.get_or_compute(
+            cache_key,
+            lambda: self._generate(plan, io.BytesIO(data) if data else None, text, output_format, accept, max_kb),
+            valid=static_file_exists
+        )
     
-    def _create_text_meme(self, template, text):
-        """Create a text-only meme"""
-        # Load template background
-        bg_path = os.path.join("static/images/templates", template["background"])
-        img = Image.open(bg_path)
-        
-        draw = ImageDraw.Draw(img)
+    def _generate(self, plan, image, text, output_format, accept, max_kb):
+        """Render and save one meme, returning its URL"""
+        # Opening only reads the header; the pixels are decoded later at slot size
+        user_img = Image.open(image) if image else None
+        
+        if (user_img is not None and plan.slots and is_animated(user_img)) or plan.background_animated:
+            if output_format not in ANIMATED_FORMATS and choose_profile(accept) in ("webp", "avif"):
+                output_format = "webp"
+            return self._render_animated(plan, user_img, text, output_format)
+        
+        meme = self._render(plan, user_img, text)
+        return self._save(meme, accept, output_format, max_kb)
+    
+    def generate_batch(self, template_name, captions, image=None, output_format=None, max_kb=None,
+                       output_dir=None, zip_file=None, workers=None):
+        """
+        Generate one meme per caption set across a process pool.
+        The background and user image are decoded once and shared by all
+        memes. Returns a report with the outputs and memes per second.
+        """
+        plan = self._get_plan(template_name)
+        if plan is None:
+            return {"error": "Template not found"}
+        if plan.requires_image and not image:
+            return {"error": "Image required for this template"}
         
-        # Split text if there are multiple text fields
-        text_parts = text.split('|')
+        user_img = Image.open(image) if image else None
+        if (user_img is not None and plan.slots and is_animated(user_img)) or plan.background_animated:
+            return {"error": "Animated memes can't be batch rendered"}
         
-        for i, text_field in enumerate(template["text_fields"]):
-            if i < len(text_parts):
-                field_text = text_parts[i]
-                position = tuple(text_field["position"])
-                font_size = text_field.get("font_size", 36)
-                font_color = text_field.get("color", "white")
-                
-                # Load font
-                font = ImageFont.truetype("static/fonts/impact.ttf", font_size)
-                
-                # Add text to image
-                draw.text(position, field_text, font=font, fill=font_color, stroke_width=2, stroke_fill="black")
-        
-        # Save the meme
-        filename = f"{uuid.uuid4()}.jpg"
-        output_path = os.path.join(self.output_dir, filename)
-        img.save(output_path)
+        if zip_file is None and output_dir is None:
+            output_dir = os.path.join(self.output_dir, f"batch-{uuid.uuid4()}")
         
-        return f"/static/images/memes/{filename}"
+        return render_batch(self, plan, captions, user_img, output_format, max_kb,
+                            output_dir, zip_file, workers)
     
-    def _create_image_text_meme(self, template, image, text):
-        """Create a meme with user image and text"""
-        # Load template background
-        bg_path = os.path.join("static/images/templates", template["background"])
-        base_img = Image.open(bg_path)
-        
-        # Open and resize user image to fit in the template
-        user_img = Image.open(image)
-        
-        for img_field in template["image_fields"]:
-            width = img_field["width"]
-            height = img_field["height"]
-            position = tuple(img_field["position"])
-            
-            # Resize user image
-            resized_user_img = user_img.resize((width, height))
-            
-            # Paste user image onto template
-            base_img.paste(resized_user_img, position)
-        
-        draw = ImageDraw.Draw(base_img)
+    def _render_animated(self, plan, user_img, text, output_format):
+        """Render an animated meme straight to disk"""
+        extension = output_format if output_format in ANIMATED_FORMATS else "gif"
+        filename = f"{uuid.uuid4()}.{extension}"
+        output_path = os.path.join(self.output_dir, filename)
         
-        # Split text if there are multiple text fields
-        text_parts = text.split('|')
+        def draw_text(draw, img):
+            self._draw_text_fields(draw, img, plan.layout_key, plan.text_fields, text)
         
-        for i, text_field in enumerate(template["text_fields"]):
-            if i < len(text_parts):
-                field_text = text_parts[i]
-                position = tuple(text_field["position"])
-                font_size = text_field.get("font_size", 36)
-                font_color = text_field.get("color", "white")
-                
-                # Load font
-                font = ImageFont.truetype("static/fonts/impact.ttf", font_size)
-                
-                # Add text to image
-                draw.text(position, field_text, font=font, fill=font_color, stroke_width=2, stroke_fill="black")
-        
-        # Save the meme
-        filename = f"{uuid.uuid4()}.jpg"
-        output_path = os.path.join(self.output_dir, filename)
-        base_img.save(output_path)
+        self.animated_renderer.render(plan, user_img, draw_text, output_path, extension)
         
         return f"/static/images/memes/{filename}"
     
-    def _create_multi_panel_meme(self, template, image, text):
-        """Create a multi-panel meme (like Drake format)"""
-        # Load template
-        bg_path = os.path.join("static/images/templates", template["background"])
-        base_img = Image.open(bg_path)
-        
-        # Open user image
-        user_img = Image.open(image)
-        
-        # If there's panel image placement, use it
-        if "panels" in template:
-            for panel in template["panels"]:
-                panel_img = user_img.copy()
-                width = panel["width"]
-                height = panel["height"]
-                position = tuple(panel["position"])
-                
-                # Apply transformations if specified
-                if "rotate" in panel:
-                    panel_img = panel_img.rotate(panel["rotate"], expand=True)
-                if "flip" in panel and panel["flip"]:
-                    panel_img = panel_img.transpose(Image.FLIP_LEFT_RIGHT)
-                
-                # Resize user image for this panel
-                resized_panel_img = panel_img.resize((width, height))
-                
-                # Paste into template
-                base_img.paste(resized_panel_img, position)
+    @property
+    def templates(self):
+        return self.registry.templates
+    
+    def list_templates(self, era=None, template_type=None, query=None):
+        """Templates matching the era, type and search filters"""
+        return self.registry.search(era, template_type, query)
+    
+    def _get_plan(self, template_name):
+        """Render plan precompiled by the registry, or None for unknown templates"""
+        return self.registry.plan(template_name)
+    
+    def _render(self, plan, user_img, text):
+        """Composite background, image slots and captions in one pass"""
+        base_img = plan.background()
+        
+        # The user image is resized once; each slot derives its panel from it
+        if user_img is not None and plan.slots:
+            source = plan.prepare_source(user_img)
+            plan.paste_slots(base_img, source)
         
         draw = ImageDraw.Draw(base_img)
+        self._draw_text_fields(draw, base_img, plan.layout_key, plan.text_fields, text)
+        return base_img
+    
+    def _save(self, img, accept=None, output_format=None, max_kb=None):
+        """Encode a rendered meme with the negotiated profile and return its URL"""
+        filename = save_image(img, self.output_dir, accept, output_format, max_kb)
         
-        # Add text to panels if specified
+        return f"/static/images/memes/{filename}"
+    
+    def _draw_text_fields(self, draw, img, layout_key, fields, text):
+        """Draw each '|'-separated caption into its text field, fitted to the field box"""
         text_parts = text.split('|')
         
-        for i, text_field in enumerate(template["text_fields"]):
+        for i, text_field in enumerate(fields):
             if i < len(text_parts):
-                field_text = text_parts[i]
-                position = tuple(text_field["position"])
-                font_size = text_field.get("font_size", 36)
-                font_color = text_field.get("color", "white")
-                
-                # Load font
-                font = ImageFont.truetype("static/fonts/impact.ttf", font_size)
-                
-                # Add text to image
-                draw.text(position, field_text, font=font, fill=font_color, stroke_width=2, stroke_fill="black")
-        
-        # Save the meme
-        filename = f"{uuid.uuid4()}.jpg"
-        output_path = os.path.join(self.output_dir, filename)
-        base_img.save(output_path)
-        
-        return f"/static/images/memes/{filename}"
+                layout = self.layout_engine.layout(layout_key, i, fields, text_parts[i], img.size)
+                self.layout_engine.draw(draw, layout, text_field.get("color", "white"))
@@ -0,0 +1,156 @@
+import re
+import random
+import hashlib
+
+# Output layout and word pools per era. {text} is the slang-substituted
+# input; other fields are filled from the pools with the seeded RNG.
+ERA_RULES = {
+    "1990s": {
+        "template": ">>> {text} <<<\n**COOL DUDE** {emoticon} {ascii_art}\n"
+                    "omg did u just say that?? LOL!! *dials up modem*\n"
+                    "a/s/l?? gotta go my mom needs 2 use the phone!!",
+        "pools": {
+            "emoticon": (":)", ":P", ":-)", ">:)", ":-D", ";)"),
+            "ascii_art": ("(^_^)", "<(^.^)>", "\\(^o^)/", "(>_<)", "(o_O)", "(*_*)")
+        },
+        "shout_below": 15,
+        "substitutions": {"cool": "rad", "internet": "information superhighway"}
+    },
+    "2000s": {
+        "template": "{sparkles}\n{text} roflmao!! {emoticon}\n"
+                    "(8) my msn messenger status (8)\nbrb g2g ttyl!! {sparkles}",
+        "pools": {
+            "emoticon": ("xD", ":P", "^_^", "o.O", "<3", "=^_^=", ":3")
+        }
+    },
+    "2010s": {
+        "template": "I can't even...\n\n{text}\n\n✨ {hashtags} ✨\n"
+                    "*insert instagram filter*\nomg literally dying rn 😂",
+        "pools": {
+            "hashtags": ("#blessed", "#nofilter", "#yolo", "#swag", "#tbt",
+                         "#instagood", "#likeforlike", "#followme")
+        },
+        "samples": {"hashtags": (4, " ✨ ")}
+    },
+    "2020s": {
+        "template": "{phrase} {text}\n{emojis}\nPOV: you're reading this in {year}",
+        "pools": {
+            "phrase": ("no cap fr fr", "it's giving", "main character energy", "rent free", "living for this"),
+            "emojis": ("💀", "✨", "👁️👄👁️", "💅", "🔥", "🤌", "🥺"),
+            "year": ("2020", "2021", "2022", "2023", "2024", "2025")
+        },
+        "samples": {"emojis": (3, " ")}
+    }
+}
+
+DEFAULT_ERA = "2020s"
+
+# Dictionary meanings that describe a term rather than paraphrase it
+DESCRIPTIVE_MEANINGS = re.compile(r"^(expression of|exclamation of|indicates|someone)\b", re.IGNORECASE)
+
+# Meanings too common to rewrite safely
+SKIPPED_PHRASES = frozenset(["own", "lie"])
+
+WORD_PATTERN = re.compile(r"[A-Za-z0-9']+")
+TERMINAL = None
+
+
+def meaning_phrases(meaning):
+    """Plain phrases a slang meaning stands for: 'Hot/attractive' -> ['hot', 'attractive']"""
+    if DESCRIPTIVE_MEANINGS.match(meaning):
+        return []
+    meaning = re.sub(r"\([^)]*\)", "", meaning)
+    phrases = []
+    for part in meaning.split("/"):
+        words = WORD_PATTERN.findall(part.lower())
+        if words and len(words) <= 4 and " ".join(words) not in SKIPPED_PHRASES:
+            phrases.append(" ".join(words))
+    return phrases
+
+
+class MockTranslationEngine:
+    """
+    Offline era translation. Phrases are swapped for era slang through a
+    word trie built from the dictionary's reverse mapping, then laid out by
+    the era's rule table. The RNG is seeded from the input, so the same
+    text and era always give the same output.
+    """
+
+    def __init__(self, slang_dictionary, rules=ERA_RULES):
+        self.rules = rules
+        self.tries = {}
+        for era in rules:
+            reverse = {}
+            for term, meaning in slang_dictionary.get(era, {}).items():
+                for phrase in meaning_phrases(meaning):
+                    # The first term listed for a meaning wins
+                    reverse.setdefault(phrase, term)
+            reverse.update(rules[era].get("substitutions", {}))
+            self.tries[era] = self._build_trie(reverse)
+
+    def _build_trie(self, phrases):
+        root = {}
+        for phrase, replacement in phrases.items():
+            node = root
+            for word in phrase.split():
+                node = node.setdefault(word, {})
+            node[TERMINAL] = replacement
+        return root
+
+    def substitute(self, text, era):
+        """Replace the longest matching phrase at each word with its slang"""
+        trie = self.tries.get(era)
+        if not trie:
+            return text
+
+        words = list(WORD_PATTERN.finditer(text))
+        pieces = []
+        last_end = 0
+        i = 0
+        while i < len(words):
+            node = trie
+            match = None
+            j = i
+            while j < len(words):
+                node = node.get(words[j].group().lower())
+                if node is None:
+                    break
+                if TERMINAL in node:
+                    match = (j, node[TERMINAL])
+                j += 1
+
+            if match is None:
+                i += 1
+                continue
+            end_index, replacement = match
+            pieces.append(text[last_end:words[i].start()])
+            pieces.append(replacement)
+            last_end = words[end_index].end()
+            i = end_index + 1
+
+        pieces.append(text[last_end:])
+        return "".join(pieces)
+
+    def translate(self, text, era):
+        """Deterministic era translation of text"""
+        if era not in self.rules:
+            era = DEFAULT_ERA
+        rules = self.rules[era]
+
+        seed = hashlib.sha256(f"{era}\x00{text}".encode("utf-8")).digest()
+        rng = random.Random(int.from_bytes(seed[:8], "big"))
+
+        body = self.substitute(text, era)
+        if len(text) < rules.get("shout_below", 0):
+            body = body.upper()
+
+        fields = {"text": body, "sparkles": "~*~*~" * (len(text) // 20 + 1)}
+        samples = rules.get("samples", {})
+        for name, pool in rules["pools"].items():
+            if name in samples:
+                count, separator = samples[name]
+                fields[name] = separator.join(rng.sample(pool, min(count, len(pool))))
+            else:
+                fields[name] = rng.choice(pool)
+
+        return rules["template"].format(**fields)
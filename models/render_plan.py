@@ -0,0 +1,118 @@
+import os
+import itertools
+from PIL import Image
+
+TEMPLATES_DIR = "static/images/templates"
+
+# How each template type is rendered. A new type only needs an entry here;
+# its layers come from the template data.
+TEMPLATE_TYPES = {
+    "text_only": {"requires_image": False},
+    "image_text": {"requires_image": True},
+    "multi_panel": {"requires_image": True}
+}
+
+# Distinguishes plans compiled from different versions of the same template
+_plan_ids = itertools.count()
+
+# Right-angle rotations done as lossless transposes at the slot size
+TRANSPOSE_ROTATIONS = {
+    90: Image.ROTATE_90,
+    180: Image.ROTATE_180,
+    270: Image.ROTATE_270
+}
+
+
+class ImageSlot:
+    """Where and how the user image is placed in the template"""
+
+    def __init__(self, spec):
+        self.position = tuple(spec["position"])
+        self.size = (spec["width"], spec["height"])
+        self.rotate = spec.get("rotate", 0) % 360
+        self.flip = bool(spec.get("flip", False))
+
+        # Size the user image must have before rotation so that it lands
+        # exactly on the slot size afterwards
+        if self.rotate in (90, 270):
+            self.source_size = (self.size[1], self.size[0])
+        else:
+            self.source_size = self.size
+
+    def render(self, source):
+        """Produce this slot's image from the shared resized source"""
+        panel = source if source.size == self.source_size else source.resize(self.source_size)
+
+        if self.rotate in TRANSPOSE_ROTATIONS:
+            panel = panel.transpose(TRANSPOSE_ROTATIONS[self.rotate])
+        elif self.rotate:
+            panel = panel.rotate(self.rotate, expand=True).resize(self.size)
+        if self.flip:
+            panel = panel.transpose(Image.FLIP_LEFT_RIGHT)
+        return panel
+
+
+class RenderPlan:
+    """
+    A template compiled into layers: background, image slots, then text.
+    The background is decoded once per plan; each render copies it.
+    """
+
+    def __init__(self, template_name, template, templates_dir=TEMPLATES_DIR):
+        self.template_name = template_name
+        self.layout_key = (template_name, next(_plan_ids))
+        self.template_type = template["type"]
+        self.requires_image = TEMPLATE_TYPES[self.template_type]["requires_image"]
+        self.background_path = os.path.join(templates_dir, template["background"])
+        self.text_fields = template.get("text_fields", [])
+        self.slots = [
+            ImageSlot(spec)
+            for spec in template.get("image_fields", []) + template.get("panels", [])
+        ]
+        self._background = None
+        self._background_animated = None
+
+        # One resize of the user image covers every slot
+        if self.slots:
+            self.source_size = (
+                max(slot.source_size[0] for slot in self.slots),
+                max(slot.source_size[1] for slot in self.slots)
+            )
+        else:
+            self.source_size = None
+
+    def background(self):
+        """Return a fresh copy of the decoded background"""
+        if self._background is None:
+            with Image.open(self.background_path) as bg:
+                self._background = bg.convert("RGB")
+        return self._background.copy()
+
+    @property
+    def background_animated(self):
+        """True when the template background has more than one frame"""
+        if self._background_animated is None:
+            with Image.open(self.background_path) as bg:
+                self._background_animated = getattr(bg, "n_frames", 1) > 1
+        return self._background_animated
+
+    def prepare_source(self, image):
+        """Decode the user image once, at the largest size any slot needs"""
+        if not self.slots:
+            return None
+
+        user_img = image if isinstance(image, Image.Image) else Image.open(image)
+        if user_img.format == "JPEG":
+            user_img.draft("RGB", self.source_size)
+        return self.resize_source(user_img)
+
+    def resize_source(self, user_img):
+        """Resize an already decoded image (or frame) to the shared source size"""
+        if user_img.mode not in ("RGB", "RGBA"):
+            user_img = user_img.convert("RGB")
+        return user_img.resize(self.source_size)
+
+    def paste_slots(self, base_img, source):
+        """Paste every image slot onto the base image"""
+        for slot in self.slots:
+            base_img.paste(slot.render(source), slot.position)
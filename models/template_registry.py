@@ -0,0 +1,216 @@
+import os
+import re
+import sys
+import time
+import threading
+from models.render_plan import RenderPlan, TEMPLATE_TYPES
+from utils.data_store import load_json
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TEMPLATES_PATH = os.path.join(ROOT_DIR, "data", "meme_templates.json")
+
+# Backgrounds live in static/images/templates next to the data folder
+TEMPLATE_IMAGES_SUBDIR = os.path.join("static", "images", "templates")
+
+# How often the templates file is checked for changes, in seconds
+RELOAD_CHECK_INTERVAL = 2.0
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def validate_template(name, template):
+    """
+    Check one template against the schema.
+    Returns (errors, warnings); templates with errors are not loaded.
+    """
+    errors = []
+    warnings = []
+
+    if not isinstance(template, dict):
+        return [f"{name}: template must be an object"], warnings
+
+    for key in ("name", "type", "background"):
+        if not isinstance(template.get(key), str) or not template.get(key):
+            errors.append(f"{name}: missing '{key}'")
+    if template.get("type") and template["type"] not in TEMPLATE_TYPES:
+        errors.append(f"{name}: unknown type '{template['type']}'")
+
+    text_fields = template.get("text_fields", [])
+    if not isinstance(text_fields, list):
+        errors.append(f"{name}: 'text_fields' must be a list")
+        text_fields = []
+    for i, field in enumerate(text_fields):
+        if not _is_point(field.get("position") if isinstance(field, dict) else None):
+            errors.append(f"{name}: text field {i} needs a [x, y] position")
+
+    slots = []
+    for key in ("image_fields", "panels"):
+        specs = template.get(key, [])
+        if not isinstance(specs, list):
+            errors.append(f"{name}: '{key}' must be a list")
+            continue
+        for i, spec in enumerate(specs):
+            if not isinstance(spec, dict) or not _is_point(spec.get("position")) \
+                    or not _is_positive(spec.get("width")) or not _is_positive(spec.get("height")):
+                errors.append(f"{name}: {key}[{i}] needs a position, width and height")
+        slots.extend(specs)
+
+    if not errors and TEMPLATE_TYPES[template["type"]]["requires_image"] and not slots:
+        warnings.append(f"{name}: '{template['type']}' template has no image slots; "
+                        f"it is treated as text only until slots are added")
+
+    return errors, warnings
+
+
+def _is_point(value):
+    return isinstance(value, (list, tuple)) and len(value) == 2 \
+        and all(isinstance(v, (int, float)) for v in value)
+
+
+def _is_positive(value):
+    return isinstance(value, (int, float)) and value > 0
+
+
+class TemplateSnapshot:
+    """
+    One immutable load of the templates file: validated templates, their
+    compiled render plans and the era/type/word indexes used for listing.
+    """
+
+    def __init__(self, templates, templates_dir, mtime):
+        self.mtime = mtime
+        self.templates = {}
+        self.plans = {}
+        self.errors = []
+        self.warnings = []
+        self.by_era = {}
+        self.by_type = {}
+        self.words = {}
+
+        for name, template in templates.items():
+            errors, warnings = validate_template(name, template)
+            self.errors.extend(errors)
+            self.warnings.extend(warnings)
+            if errors:
+                continue
+
+            plan = RenderPlan(name, template, templates_dir)
+            if plan.requires_image and not plan.slots:
+                plan.requires_image = False
+            if not os.path.exists(plan.background_path):
+                self.warnings.append(f"{name}: background {template['background']} not found")
+
+            self.templates[name] = template
+            self.plans[name] = plan
+            self.by_era.setdefault(template.get("era"), []).append(name)
+            self.by_type.setdefault(template["type"], []).append(name)
+            text = " ".join([name.replace("_", " "), template["name"], template.get("description", "")])
+            for word in set(WORD_PATTERN.findall(text.lower())):
+                self.words.setdefault(word, set()).add(name)
+
+    def summary(self, name):
+        """Listing entry for one template"""
+        template = self.templates[name]
+        plan = self.plans[name]
+        return {
+            "id": name,
+            "name": template["name"],
+            "description": template.get("description", ""),
+            "era": template.get("era"),
+            "type": template["type"],
+            "requires_image": plan.requires_image,
+            "text_fields": len(plan.text_fields),
+            "image_slots": len(plan.slots),
+            "background": template["background"]
+        }
+
+    def search(self, era=None, template_type=None, query=None):
+        """Names matching every given filter, in file order"""
+        names = set(self.templates)
+        if era:
+            names &= set(self.by_era.get(era, ()))
+        if template_type:
+            names &= set(self.by_type.get(template_type, ()))
+        for token in WORD_PATTERN.findall((query or "").lower()):
+            # Every query word must start some word of the template
+            matches = set()
+            for word, word_names in self.words.items():
+                if word.startswith(token):
+                    matches |= word_names
+            names &= matches
+        return [name for name in self.templates if name in names]
+
+
+class TemplateRegistry:
+    """
+    Meme templates loaded from data/meme_templates.json and reloaded when
+    the file changes. A reload builds a new snapshot and swaps it in whole,
+    so renders already holding a plan finish on the version they started with.
+    """
+
+    def __init__(self, path=None, templates_dir=None, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path or os.environ.get("MEME_TEMPLATES_PATH", DEFAULT_TEMPLATES_PATH)
+        self.templates_dir = templates_dir or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(self.path))), TEMPLATE_IMAGES_SUBDIR
+        )
+        self.check_interval = check_interval
+        self._reload_lock = threading.Lock()
+        self._next_check = 0
+        self._snapshot = None
+        self._failed_mtime = None
+        self.reload()
+
+    def snapshot(self):
+        """Current snapshot, reloading first if the file changed"""
+        now = time.time()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                changed = os.path.getmtime(self.path) not in (self._snapshot.mtime, self._failed_mtime)
+            except OSError:
+                changed = False
+            if changed:
+                self.reload()
+        return self._snapshot
+
+    def reload(self):
+        """Load and validate the file; on failure the previous snapshot stays in use"""
+        if not self._reload_lock.acquire(blocking=self._snapshot is None):
+            # Another thread is already reloading; keep serving the old snapshot
+            return self._snapshot
+        mtime = None
+        try:
+            mtime = os.path.getmtime(self.path)
+            templates = load_json(self.path)
+            if not isinstance(templates, dict):
+                raise ValueError("templates file must hold an object")
+
+            snapshot = TemplateSnapshot(templates, self.templates_dir, mtime)
+            for message in snapshot.errors:
+                print(f"Template error: {message}", file=sys.stderr)
+            for message in snapshot.warnings:
+                print(f"Template warning: {message}", file=sys.stderr)
+            self._snapshot = snapshot
+            # Diagnostics go to stderr; stdout may carry data, e.g. batch_memes.py --zip -
+            print(f"Loaded {len(snapshot.templates)} meme templates from {self.path}", file=sys.stderr)
+        except (OSError, ValueError) as e:
+            if self._snapshot is None:
+                raise
+            self._failed_mtime = mtime
+            print(f"Template reload failed, keeping previous templates: {str(e)}", file=sys.stderr)
+        finally:
+            self._reload_lock.release()
+        return self._snapshot
+
+    @property
+    def templates(self):
+        return self.snapshot().templates
+
+    def plan(self, name):
+        """Compiled render plan for a template, or None"""
+        return self.snapshot().plans.get(name)
+
+    def search(self, era=None, template_type=None, query=None):
+        """Listing entries for templates matching the filters"""
+        snapshot = self.snapshot()
+        return [snapshot.summary(name) for name in snapshot.search(era, template_type, query)]
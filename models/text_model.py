@@ -1,12 +1,28 @@
 import os
-import json
 from dotenv import load_dotenv
+from services.structured_response import StructuredResponseParser
+from utils.prompt_builder import EraPromptBuilder
+from models.mock_translation import MockTranslationEngine
+from utils.service_cache import ServiceCache, make_key
+from utils.data_store import slang_dictionary
+
+# Model translations are cached for a week; mock output is deterministic
+# and cheap to rebuild, so it is never cached
+TRANSLATION_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Fields returned by translate_and_rate: name -> (type, default)
+TRANSLATE_AND_RATE_SCHEMA = {
+    "translated": (str, ""),
+    "cringe_score": (str, "")
+}
 
 class TextTranslator:
     def __init__(self):
         load_dotenv()
         self.api_available = False
         self.model = None
+        self.json_mode_supported = True
+        self.translate_and_rate_parser = StructuredResponseParser(TRANSLATE_AND_RATE_SCHEMA)
         
         # Try to import Google Generative AI module and set up API
         try:
@@ -33,18 +49,13 @@ class TextTranslator:
             print(f"Warning: Google Generative AI module not available: {str(e)}. Using mock translation.")
             self.api_available = False
 
-        # Load slang dictionary with error handling
-        try:
-            with open('data/slang_dictionary.json', 'r') as f:
-                self.slang_dictionary = json.load(f)
-        except FileNotFoundError:
-            print("Warning: slang_dictionary.json not found. Using default dictionary.")
-            self.slang_dictionary = {
-                "1990s": {"lol": "laugh out loud", "asl": "age/sex/location"},
-                "2000s": {"rofl": "rolling on floor laughing", "brb": "be right back"},
-                "2010s": {"yolo": "you only live once", "swag": "style"},
-                "2020s": {"no cap": "no lie", "fr": "for real"}
-            }
+        # Shared read-only slang dictionary, parsed once per process
+        self.slang_dictionary = slang_dictionary()
+        
+        # Era prompt text and slang indexes are compiled once here
+        self.prompt_builder = EraPromptBuilder(self.slang_dictionary)
+        self.mock_engine = MockTranslationEngine(self.slang_dictionary)
+        self.cache = ServiceCache("translation", ttl=TRANSLATION_CACHE_TTL)
 
     def translate(self, text, era):
         """
@@ -59,92 +70,146 @@ class TextTranslator:
         if not self.api_available:
             print(f"API not available. Using mock translation for era: {era}")
             return self._mock_translation(text, era)
-            
+        
         try:
-            # Create a prompt based on the era
-            prompt = self._create_prompt(text, era)
-            
-            print(f"Attempting Gemini API translation for era: {era}")
-            # Call Gemini API
-            response = self.model.generate_content(prompt)
-            
-            # Extract translated text
-            if response and hasattr(response, 'text') and response.text:
-                print(f"Gemini API translation successful for era: {era}")
-                return response.text.strip()
-            else:
-                print("Empty or invalid response from Gemini API")
-                return self._mock_translation(text, era)
-                
+            # One worker on the host calls the model for a given text; the
+            # others wait for its result in the shared cache
+            return self.cache.get_or_compute(make_key(text, era), lambda: self._model_translate(text, era))
         except Exception as e:
             print(f"Gemini API error: {str(e)}. Falling back to mock translation.")
             # Fallback to mock translation
             return self._mock_translation(text, era)
     
-    def _create_prompt(self, text, era):
+    def _model_translate(self, text, era):
+        """Gemini translation; raises on an empty response so it isn't cached"""
+        # Create a prompt based on the era
+        prompt = self._create_prompt(text, era)
+        
+        print(f"Attempting Gemini API translation for era: {era}")
+        # Call Gemini API
+        response = self.model.generate_content(prompt)
+        
+        # Extract translated text
+        if response and hasattr(response, 'text') and response.text:
+            print(f"Gemini API translation successful for era: {era}")
+            return response.text.strip()
+        raise ValueError("Empty or invalid response from Gemini API")
+    
+    def translate_stream(self, text, era):
         """
-        Create a prompt for the Gemini API based on the era
+        Translate with streaming generation, yielding (event, data) pairs:
+        ("chunk", text) as tokens arrive, ("replace", text) when a failed
+        stream is swapped for the mock translation, then ("done", result).
+        Cached translations arrive as a single chunk.
         """
-        slang_terms = self.slang_dictionary.get(era, {})
-        return f"""
-        Translate the following modern text into {era} internet language and slang:
-        "{text}"
+        if era not in self.slang_dictionary or not self.api_available:
+            translated = self.translate(text, era)
+            source = "error" if era not in self.slang_dictionary else "mock"
+            yield "chunk", translated
+            yield "done", {"translated": translated, "source": source}
+            return
         
-        Use these {era} slang terms and style as reference:
-        {json.dumps(slang_terms, indent=2)}
+        cache_key = make_key(text, era)
+        cached = self.cache.peek(cache_key)
+        if cached is not None:
+            yield "chunk", cached
+            yield "done", {"translated": cached, "source": "cache"}
+            return
         
-        Make it sound authentic to the {era} internet culture while keeping the original meaning.
-        """
+        parts = []
+        try:
+            print(f"Attempting streaming Gemini API translation for era: {era}")
+            response = self.model.generate_content(self._create_prompt(text, era), stream=True)
+            for chunk in response:
+                piece = getattr(chunk, 'text', '')
+                if piece:
+                    parts.append(piece)
+                    yield "chunk", piece
+        except Exception as e:
+            print(f"Gemini API stream error: {str(e)}. Falling back to mock translation.")
+            parts = None
+        
+        translated = "".join(parts).strip() if parts else ""
+        if not translated:
+            # Nothing usable arrived; whatever was shown is replaced
+            translated = self._mock_translation(text, era)
+            yield "replace", translated
+            yield "done", {"translated": translated, "source": "mock"}
+            return
+        
+        self.cache.store(cache_key, translated)
+        yield "done", {"translated": translated, "source": "model"}
     
-    def _mock_translation(self, text, era):
-        """Provide direct era translations without analytical text."""
-        if era == "1990s":
-            # 90s internet style
-            text_upper = text.upper() if len(text) < 15 else text
-            emoticons = [":)", ":P", ":-)", ">:)", ":-D", ";)"]
-            ascii_art = ["(^_^)", "<(^.^)>", "\\(^o^)/", "(>_<)", "(o_O)", "(*_*)"]
-            
-            import random
-            result = f">>> {text_upper} <<<\n"
-            result += f"**COOL DUDE** {random.choice(emoticons)} {random.choice(ascii_art)}\n"
-            result += f"omg did u just say that?? LOL!! *dials up modem*\n"
-            result += f"a/s/l?? gotta go my mom needs 2 use the phone!!\n"
-            
-            # Replace modern terms
-            result = result.replace("cool", "rad").replace("internet", "information superhighway")
-            return result
+    def translate_and_rate(self, text, era, cringe_meter):
+        """
+        Translate text and rate its cringe in one model call.
+        Returns {"translated", "cringe_score", "source"} with a 1-10 score;
+        the mock translation and missing scores are rated locally instead.
+        """
+        if era not in self.slang_dictionary:
+            return {
+                "translated": self.translate(text, era),
+                "cringe_score": None,
+                "source": "error"
+            }
         
-        elif era == "2000s":
-            # MySpace/MSN era
-            dec = "~*~*~" * (len(text) // 20 + 1)
-            emoticons = ["xD", ":P", "^_^", "o.O", "<3", "=^_^=", ":3"]
-            
-            import random
-            result = f"{dec}\n"
-            result += f"{text} roflmao!! {random.choice(emoticons)}\n"
-            result += f"(8) my msn messenger status (8)\n"
-            result += f"brb g2g ttyl!! {dec}"
-            return result
+        result = None
+        if self.api_available:
+            try:
+                prompt = self._create_prompt(text, era, (
+                    f'Also rate from 1 to 10 how authentically "cringe" the translation is for {era}. '
+                    'Respond with JSON: {"translated": "<translation>", "cringe_score": "<1-10>"}'
+                ))
+                print(f"Attempting Gemini API translate-and-rate for era: {era}")
+                response = self._generate_json(prompt)
+                if response and hasattr(response, 'text') and response.text:
+                    result = self.translate_and_rate_parser.parse(response.text)
+                    print(f"Translate-and-rate parse: {self.translate_and_rate_parser.last_stats}")
+            except Exception as e:
+                print(f"Gemini API error: {str(e)}. Falling back to mock translation.")
         
-        elif era == "2010s":
-            # Tumblr/Instagram
-            import random
-            hashtags = ["#blessed", "#nofilter", "#yolo", "#swag", "#tbt", "#instagood", "#likeforlike", "#followme"]
-            selected_tags = random.sample(hashtags, min(4, len(hashtags)))
-            
-            result = f"I can't even...\n\n{text}\n\n"
-            result += "✨ " + " ✨ ".join(selected_tags) + " ✨\n"
-            result += f"*insert instagram filter*\n"
-            result += f"omg literally dying rn 😂"
-            return result
+        if not result or not result["translated"]:
+            translated = self._mock_translation(text, era)
+            return {
+                "translated": translated,
+                "cringe_score": cringe_meter.quick_rate(translated, era),
+                "source": "mock"
+            }
         
-        else:  # 2020s
-            # TikTok/modern
-            import random
-            phrases = ["no cap fr fr", "it's giving", "main character energy", "rent free", "living for this"]
-            emojis = ["💀", "✨", "👁️👄👁️", "💅", "🔥", "🤌", "🥺"]
-            
-            result = f"{random.choice(phrases)} {text}\n"
-            result += f"{' '.join(random.sample(emojis, min(3, len(emojis))))}\n"
-            result += f"POV: you're reading this in {random.randint(2020, 2025)}"
-            return result
+        try:
+            score = max(1, min(10, round(float(result["cringe_score"]))))
+        except (ValueError, OverflowError):
+            # Not a number, or nan/inf
+            score = cringe_meter.quick_rate(result["translated"], era)
+        
+        return {
+            "translated": result["translated"].strip(),
+            "cringe_score": score,
+            "source": "model"
+        }
+    
+    def _generate_json(self, prompt):
+        """Ask for JSON output, falling back to plain generation on older SDKs"""
+        if self.json_mode_supported:
+            try:
+                return self.model.generate_content(
+                    prompt,
+                    generation_config={"response_mime_type": "application/json"}
+                )
+            except (TypeError, ValueError) as e:
+                # Only an SDK that can't build the JSON-mode config disables it
+                print(f"JSON mode unavailable, using plain generation: {str(e)}")
+                self.json_mode_supported = False
+        
+        return self.model.generate_content(prompt)
+    
+    def _create_prompt(self, text, era, instructions="Reply with only the translation."):
+        """
+        Create a prompt for the Gemini API based on the era, with only the
+        slang relevant to the text and within the prompt token budget
+        """
+        return self.prompt_builder.build(text, era, instructions)
+    
+    def _mock_translation(self, text, era):
+        """Provide direct era translations without analytical text."""
+        return self.mock_engine.translate(text, era)
@@ -56,6 +56,7 @@ class VoiceConverter:
         }
         
         self.dependencies_met = self._check_dependencies()
+        self.long_transcriber = None
     
     def _check_dependencies(self):
         """Check if all required dependencies are available."""
@@ -216,28 +217,18 @@ class VoiceConverter:
     def _speech_to_text(self, audio_file):
         """Convert speech to text using Google Cloud Speech."""
         try:
-            from google.cloud import speech
+            from services.long_audio import LongAudioTranscriber, create_recognizer
+            from utils.audio_ingest import ingest_audio
             
-            client = speech.SpeechClient()
+            # Split at silences so recordings of any length can be recognized
+            if self.long_transcriber is None:
+                self.long_transcriber = LongAudioTranscriber(create_recognizer())
             
-            with open(audio_file, "rb") as audio_file:
-                content = audio_file.read()
+            # Reuses the PCM buffer if the caller already ingested the upload
+            audio = ingest_audio(audio_file)
+            result = self.long_transcriber.transcribe(audio.pcm, audio.sample_rate, "en-US")
             
-            audio = speech.RecognitionAudio(content=content)
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=44100,
-                language_code="en-US",
-            )
-            
-            response = client.recognize(config=config, audio=audio)
-            
-            # Get text from response
-            text = ""
-            for result in response.results:
-                text += result.alternatives[0].transcript
-                
-            return text
+            return result["transcript"]
         except Exception as e:
             print(f"Speech to text error: {e}")
             return None
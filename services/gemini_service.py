@@ -1,13 +1,26 @@
 import os
-import base64
 import google.generativeai as genai
+from google.api_core.exceptions import InvalidArgument
 from dotenv import load_dotenv
-from PIL import Image
-import io
+from services.structured_response import StructuredResponseParser
+from utils.vision_preprocess import prepare_vision_image
+from utils.phash_index import PerceptualHashIndex, dhash
+from utils.service_cache import ServiceCache, make_key
 
 # Load environment variables
 load_dotenv()
 
+# Text generations are keyed by prompt and shared by all workers for a week
+TEXT_CACHE_TTL = 7 * 24 * 3600
+
+# Fields returned by analyze_image_context: name -> (type, default)
+IMAGE_CONTEXT_SCHEMA = {
+    "description": (str, "brief description"),
+    "meme_references": (list, []),
+    "likely_era": (str, "2020s"),
+    "visual_elements": (list, [])
+}
+
 class GeminiService:
     """Service for Google Gemini AI integration"""
     
@@ -23,6 +36,16 @@ class GeminiService:
         # Initialize models
         self.text_model = genai.GenerativeModel('gemini-pro')
         self.vision_model = genai.GenerativeModel('gemini-pro-vision')
+        
+        # Structured output handling for image analysis
+        self.structured_output_supported = True
+        self.image_context_parser = StructuredResponseParser(IMAGE_CONTEXT_SCHEMA)
+        
+        # Near-duplicate images reuse a previous analysis
+        self.image_context_index = PerceptualHashIndex("gemini_image_context")
+        
+        # Identical text prompts are answered once per host
+        self.text_cache = ServiceCache("gemini_text", ttl=TEXT_CACHE_TTL)
     
     def translate_text_to_era(self, text, era):
         """Translate modern text to a specific internet era style"""
@@ -36,8 +59,7 @@ class GeminiService:
         Respond with ONLY the transformed text, nothing else.
         """
         
-        response = self.text_model.generate_content(prompt)
-        return response.text.strip()
+        return self._generate_text(prompt)
     
     def rate_cringe(self, content, era):
         """Rate how authentically 'cringe' content is for a specific era"""
@@ -51,9 +73,9 @@ class GeminiService:
         Respond with ONLY a number from 1 to 10, nothing else.
         """
         
-        response = self.text_model.generate_content(prompt)
+        response_text = self._generate_text(prompt)
         try:
-            rating = float(response.text.strip())
+            rating = float(response_text)
             # Ensure rating is between 1 and 10
             return max(1, min(10, rating))
         except ValueError:
@@ -62,12 +84,13 @@ class GeminiService:
     
     def analyze_image_context(self, image_file):
         """Analyze the context of an image using Gemini Vision"""
-        # Read image file
-        image_bytes = image_file.read()
-        image_file.seek(0)  # Reset file pointer for future use
+        # Downscale once; a buffer already prepared for this request is reused
+        prepared = prepare_vision_image(image_file)
+        image_hash = dhash(prepared.image)
         
-        # Create image object for Gemini
-        image = Image.open(io.BytesIO(image_bytes))
+        cached_analysis = self.image_context_index.lookup(image_hash)
+        if cached_analysis is not None:
+            return cached_analysis
         
         # Prompt for image analysis
         prompt = """
@@ -86,36 +109,51 @@ class GeminiService:
         }
         """
         
-        response = self.vision_model.generate_content([prompt, image])
-        
-        # Process response
-        # Note: Ideally we'd parse JSON but for robustness, we'll extract key fields
-        text_response = response.text
-        
-        # If response looks like JSON, try to clean it up
-        if '{' in text_response and '}' in text_response:
-            import json
-            import re
-            
-            # Extract JSON part using regex
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', text_response, re.DOTALL)
-            if not json_match:
-                json_match = re.search(r'\{.*\}', text_response, re.DOTALL)
-            
-            if json_match:
-                try:
-                    json_str = json_match.group(1) if json_match.groups() else json_match.group(0)
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    pass  # Fall back to text parsing
-        
-        # Fall back to simple parsing
-        return {
-            "description": extract_section(text_response, "description", "brief description"),
-            "meme_references": extract_list(text_response, "meme_references"),
-            "likely_era": extract_section(text_response, "likely_era", "2020s"),
-            "visual_elements": extract_list(text_response, "visual_elements")
-        }
+        response = self._generate_structured(self.vision_model, [prompt, prepared.as_blob()], self.image_context_parser)
+        
+        # Schema-constrained JSON parses in one pass; malformed output falls
+        # back to a single tolerant scan inside the parser
+        analysis = self.image_context_parser.parse(response.text)
+        
+        # Only cache analyses that actually parsed; cumulative parse figures
+        # are in image_context_parser.stats()
+        if self.image_context_parser.last_stats['path'] != "failed":
+            self.image_context_index.add(image_hash, analysis)
+        
+        return analysis
+    
+    def _generate_text(self, prompt):
+        """Text model response for a prompt, from the shared cache when possible"""
+        return self.text_cache.get_or_compute(
+            make_key(prompt),
+            lambda: self.text_model.generate_content(prompt).text.strip()
+        )
+    
+    def _generate_structured(self, model, contents, parser):
+        """Request JSON output constrained to the parser's schema"""
+        if self.structured_output_supported:
+            try:
+                return model.generate_content(
+                    contents,
+                    generation_config={
+                        "response_mime_type": "application/json",
+                        "response_schema": parser.response_schema()
+                    }
+                )
+            except (TypeError, ValueError) as e:
+                # Older SDKs can't build a JSON-mode generation config; stop
+                # asking for it. Anything else (quota, network) is a real error.
+                print(f"Structured output unavailable, using plain generation: {str(e)}")
+                self.structured_output_supported = False
+            except InvalidArgument as e:
+                # Models without JSON mode (gemini-pro-vision) reject the config
+                # server-side. If the plain request works, that was the cause.
+                response = model.generate_content(contents)
+                print(f"Structured output rejected by the model, using plain generation: {str(e)}")
+                self.structured_output_supported = False
+                return response
+        
+        return model.generate_content(contents)
     
     def generate_meme_text(self, template, input_text, era=None):
         """Generate appropriate text for a meme template"""
@@ -129,8 +167,7 @@ class GeminiService:
         Respond with ONLY the meme text, nothing else.
         """
         
-        response = self.text_model.generate_content(prompt)
-        return response.text.strip()
+        return self._generate_text(prompt)
     
     def detect_content_era(self, content):
         """Detect which internet era (1990s, 2000s, 2010s, 2020s) content is from"""
@@ -144,8 +181,7 @@ class GeminiService:
         Respond with ONLY the era (1990s, 2000s, 2010s, or 2020s), nothing else.
         """
         
-        response = self.text_model.generate_content(prompt)
-        era = response.text.strip().lower()
+        era = self._generate_text(prompt).lower()
         
         # Ensure valid era is returned
         valid_eras = ["1990s", "2000s", "2010s", "2020s"]
@@ -156,49 +192,3 @@ class GeminiService:
         # Default if no valid era detected
         return "2020s"
 
-
-# Helper functions for response parsing
-def extract_section(text, section_name, default=""):
-    """Extract a section from text based on section name"""
-    import re
-    
-    # Try to find the section using various patterns
-    patterns = [
-        rf'"{section_name}"\s*:\s*"([^"]*)"',  # "section": "value"
-        rf'"{section_name}"\s*:\s*\'([^\']*)\'',  # "section": 'value'
-        rf'{section_name}:\s*(.*?)(?:,|\n|$)',  # section: value
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-    
-    return default
-
-def extract_list(text, section_name):
-    """Extract a list section from text"""
-    import re
-    
-    # Try to find the section using various patterns
-    list_match = re.search(rf'"{section_name}"\s*:\s*\[(.*?)\]', text, re.DOTALL)
-    
-    if list_match:
-        items_text = list_match.group(1)
-        # Extract quoted strings
-        items = re.findall(r'"([^"]*)"', items_text)
-        if items:
-            return items
-    
-    # If not found or empty, try to extract based on formatting
-    if section_name.lower() in text.lower():
-        section_text = text.split(section_name, 1)[1]
-        lines = section_text.split("\n")
-        items = []
-        for line in lines[:5]:  # Look at first 5 lines after section name
-            if line.strip().startswith("- "):
-                items.append(line.strip()[2:])
-        if items:
-            return items
-    
-    return []
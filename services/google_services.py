@@ -6,10 +6,18 @@ from google.cloud import vision, speech
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
 import sys
+from utils.vision_preprocess import prepare_vision_image
+from utils.phash_index import PerceptualHashIndex, dhash
+from utils.image_stats import compute_image_stats
+from utils.service_cache import ServiceCache, make_key
+from services.long_audio import LongAudioTranscriber, create_recognizer
+from utils.audio_ingest import ingest_audio
 
 # Load environment variables
 load_dotenv()
 
+SYNC_RECOGNIZE_SECONDS = 55
+
 class GoogleVisionService:
     """Service for Google Cloud Vision API integration"""
     
@@ -42,18 +50,31 @@ class GoogleVisionService:
         except Exception as e:
             print(f"Error initializing Google Vision client: {e}")
             sys.exit(1)
+        
+        # Near-duplicate uploads reuse the era verdict of a previously seen image
+        self.era_index = PerceptualHashIndex("vision_era")
+        
+        # Identical uploads reuse the Vision response for a day
+        self.cache = ServiceCache("vision", ttl=24 * 3600, stale_ttl=7 * 24 * 3600)
     
     def analyze_image(self, image_file):
         """Analyze image content using Google Vision API"""
-        # Read the image file
-        content = image_file.read()
-        image = vision.Image(content=content)
+        # Send the downscaled buffer instead of the raw upload
+        prepared = prepare_vision_image(image_file)
         
-        # Feature types to request
+        return self.cache.get_or_compute(
+            make_key(prepared.data),
+            lambda: self._annotate(prepared)
+        )
+    
+    def _annotate(self, prepared):
+        """Call Vision for labels and web entities on a prepared image"""
+        image = vision.Image(content=prepared.data)
+        
+        # Feature types to request; color statistics are computed locally
         features = [
             vision.Feature(type_=vision.Feature.Type.LABEL_DETECTION),
-            vision.Feature(type_=vision.Feature.Type.WEB_DETECTION),
-            vision.Feature(type_=vision.Feature.Type.IMAGE_PROPERTIES)
+            vision.Feature(type_=vision.Feature.Type.WEB_DETECTION)
         ]
         
         # Perform API request
@@ -65,23 +86,24 @@ class GoogleVisionService:
         return {
             'labels': [label.description for label in response.label_annotations],
             'web_entities': [entity.description for entity in response.web_detection.web_entities],
-            'colors': [
-                {
-                    'color': f'rgb({int(color.color.red)}, {int(color.color.green)}, {int(color.color.blue)})',
-                    'score': color.score,
-                    'pixel_fraction': color.pixel_fraction
-                }
-                for color in response.image_properties_annotation.dominant_colors.colors
-            ]
+            'image_stats': compute_image_stats(prepared.image, prepared.scale)
         }
     
     def detect_era(self, image_file):
         """Try to estimate the era of the image based on content and styling"""
-        analysis = self.analyze_image(image_file)
+        prepared = prepare_vision_image(image_file)
+        image_hash = dhash(prepared.image)
         
-        # Reset the file pointer for future use
-        image_file.seek(0)
+        cached_era = self.era_index.lookup(image_hash)
+        if cached_era is not None:
+            return cached_era
         
+        era = self._score_era(self.analyze_image(prepared))
+        self.era_index.add(image_hash, era)
+        return era
+    
+    def _score_era(self, analysis):
+        """Score each era from a Vision analysis and pick the best match"""
         # Era indicators
         era_keywords = {
             "1990s": ["90s", "1990s", "dial-up", "windows 95", "floppy disk", "vhs", "y2k"],
@@ -102,20 +124,21 @@ class GoogleVisionService:
                     era_scores[era] += 1
         
         # Check colors for era association
-        colors = analysis['colors']
+        stats = analysis['image_stats']
+        colors = stats['palette']
         
         # 90s had bright neon colors
-        neon_count = sum(1 for color in colors if self._is_neon(color['color']))
+        neon_count = sum(1 for color in colors if self._is_neon(color))
         if neon_count >= 2:
             era_scores["1990s"] += 2
         
         # 2000s often had dark backgrounds with bright accents
-        dark_count = sum(1 for color in colors if self._is_dark(color['color']))
+        dark_count = sum(1 for color in colors if self._is_dark(color))
         if dark_count >= 2:
             era_scores["2000s"] += 1
         
         # 2010s often had vintage filters (faded colors)
-        faded_count = sum(1 for color in colors if self._is_faded(color['color']))
+        faded_count = sum(1 for color in colors if self._is_faded(color))
         if faded_count >= 2:
             era_scores["2010s"] += 1
         
@@ -124,6 +147,14 @@ class GoogleVisionService:
         if minimal_palette:
             era_scores["2020s"] += 1
         
+        # Blocky upscaled pixels are the 90s low-res look
+        if stats['pixelation'] > 0.5:
+            era_scores["1990s"] += 1
+        
+        # Visible JPEG block edges come from memes re-shared over and over
+        if stats['blockiness'] > 0.5:
+            era_scores["2010s"] += 1
+        
         # Return the era with highest score or the most recent if tie
         max_score = max(era_scores.values())
         if max_score == 0:
@@ -136,39 +167,19 @@ class GoogleVisionService:
             if era in top_eras:
                 return era
     
-    def _is_neon(self, rgb_str):
+    def _is_neon(self, color):
         """Check if a color is neon (very bright and saturated)"""
-        # Extract RGB values
-        rgb = rgb_str.replace('rgb(', '').replace(')', '').split(', ')
-        r, g, b = int(rgb[0]), int(rgb[1]), int(rgb[2])
-        
         # Neon colors have high brightness and saturation
-        brightness = (r + g + b) / 3
-        max_channel = max(r, g, b)
-        min_channel = min(r, g, b)
-        saturation = (max_channel - min_channel) / max_channel if max_channel > 0 else 0
-        
-        return brightness > 180 and saturation > 0.5
+        return color['brightness'] > 180 and color['saturation'] > 0.5
     
-    def _is_dark(self, rgb_str):
+    def _is_dark(self, color):
         """Check if a color is dark"""
-        rgb = rgb_str.replace('rgb(', '').replace(')', '').split(', ')
-        r, g, b = int(rgb[0]), int(rgb[1]), int(rgb[2])
-        brightness = (r + g + b) / 3
-        return brightness < 80
+        return color['brightness'] < 80
     
-    def _is_faded(self, rgb_str):
+    def _is_faded(self, color):
         """Check if a color has the faded/vintage look"""
-        rgb = rgb_str.replace('rgb(', '').replace(')', '').split(', ')
-        r, g, b = int(rgb[0]), int(rgb[1]), int(rgb[2])
-        
         # Faded/vintage typically has reduced saturation but not too dark/light
-        max_channel = max(r, g, b)
-        min_channel = min(r, g, b)
-        saturation = (max_channel - min_channel) / max_channel if max_channel > 0 else 0
-        brightness = (r + g + b) / 3
-        
-        return saturation < 0.3 and 80 < brightness < 200
+        return color['saturation'] < 0.3 and 80 < color['brightness'] < 200
 
 
 class GoogleSpeechService:
@@ -177,17 +188,34 @@ class GoogleSpeechService:
     def __init__(self):
         # Initialize Speech client
         self.client = speech.SpeechClient()
+        
+        # Transcripts of identical clips never change
+        self.cache = ServiceCache("speech", ttl=30 * 24 * 3600)
+        
+        # Long clips are split at silences and recognized in parallel
+        self.long_transcriber = LongAudioTranscriber(create_recognizer(self.client))
     
     def transcribe_audio(self, audio_file, language_code="en-US"):
         """Transcribe speech to text using Google Speech-to-Text API"""
-        # Read audio file
-        content = audio_file.read()
+        # Sniff and decode once into 16 kHz mono PCM; unknown formats fail here
+        audio = ingest_audio(audio_file)
         
+        # Synchronous recognize only accepts about a minute of audio
+        if audio.duration > SYNC_RECOGNIZE_SECONDS:
+            return self.transcribe_long_audio(audio, language_code)['transcript']
+        
+        return self.cache.get_or_compute(
+            make_key(audio.source_digest, language_code),
+            lambda: self._recognize(audio, language_code)
+        )
+    
+    def _recognize(self, canonical_audio, language_code):
+        """Send one synchronous recognize request"""
         # Configure the request
-        audio = speech.RecognitionAudio(content=content)
+        audio = speech.RecognitionAudio(content=canonical_audio.pcm)
         config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.MP3,
-            sample_rate_hertz=16000,
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=canonical_audio.sample_rate,
             language_code=language_code,
             enable_automatic_punctuation=True
         )
@@ -201,6 +229,15 @@ class GoogleSpeechService:
             transcript += result.alternatives[0].transcript
         
         return transcript
+    
+    def transcribe_long_audio(self, audio_file, language_code="en-US"):
+        """Transcribe audio of any length, returning text and segment timestamps"""
+        audio = ingest_audio(audio_file)
+        
+        return self.cache.get_or_compute(
+            make_key("long", audio.source_digest, language_code),
+            lambda: self.long_transcriber.transcribe(audio.pcm, audio.sample_rate, language_code)
+        )
 
 
 class YouTubeService:
@@ -212,6 +249,9 @@ class YouTubeService:
         
         # Initialize YouTube API client
         self.youtube = build('youtube', 'v3', developerKey=self.api_key)
+        
+        # Trending searches repeat constantly; serve them without burning quota
+        self.cache = ServiceCache("youtube", ttl=6 * 3600, stale_ttl=24 * 3600)
     
     def search_meme_videos(self, query, era=None, max_results=5):
         """Search YouTube for meme videos relevant to query and era"""
@@ -222,6 +262,13 @@ class YouTubeService:
         else:
             full_query = f"{query} meme"
         
+        return self.cache.get_or_compute(
+            make_key(full_query.lower(), max_results),
+            lambda: self._search(full_query, max_results)
+        )
+    
+    def _search(self, full_query, max_results):
+        """Execute a YouTube search and simplify the results"""
         # Execute search
         search_response = self.youtube.search().list(
             q=full_query,
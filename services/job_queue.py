@@ -0,0 +1,408 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from services.render_pool import RenderPool
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_QUEUE_PATH = os.path.join(BASE_DIR, "data", "cache", "jobs.sqlite3")
+UPLOAD_DIR = os.path.join(BASE_DIR, "data", "cache", "job_uploads")
+
+# Lower runs first: quick meme renders aren't stuck behind voice conversions
+JOB_PRIORITIES = {
+    "meme": 0,
+    "image": 1,
+    "voice": 2
+}
+
+FINISHED_STATUSES = ("done", "failed")
+
+# Finished jobs are kept this long for polling clients
+JOB_RETENTION = 24 * 60 * 60
+
+# The process running a job refreshes its heartbeat this often; a running
+# job whose owner has exited, or whose heartbeat is older than the timeout,
+# is requeued. Long jobs that are still working are left alone
+HEARTBEAT_INTERVAL = 15
+JOB_HEARTBEAT_TIMEOUT = int(os.getenv("JOB_HEARTBEAT_TIMEOUT", 120))
+
+# How often the dispatcher prunes and requeues
+MAINTAIN_INTERVAL = 60
+
+# How often the dispatcher looks for jobs submitted by other web processes
+POLL_INTERVAL = 1.0
+
+JOB_COLUMNS = ("id", "type", "priority", "status", "payload", "result", "error",
+               "created", "started", "finished")
+
+
+def _process_alive(pid):
+    """Whether a process with this pid exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SQLiteJobStore:
+    """Jobs in a local SQLite file, shared by every web process on the host"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("JOB_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._connection = None
+        self._pid = None
+        # Opened now so a bad path or schema fails at startup
+        self._conn
+
+    @property
+    def _conn(self):
+        # Connections can't cross fork (gunicorn preload_app), so each process opens its own
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, type TEXT NOT NULL, priority INTEGER NOT NULL, "
+                "status TEXT NOT NULL, payload TEXT NOT NULL, result TEXT, error TEXT, "
+                "created REAL NOT NULL, started REAL, finished REAL)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            for column, column_type in (("owner", "INTEGER"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    try:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+                    except sqlite3.OperationalError:
+                        pass  # another process added it first
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, priority, created)"
+            )
+            self._connection = conn
+            self._pid = os.getpid()
+        return self._connection
+
+    def add(self, job):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(JOB_COLUMNS)}) VALUES ({', '.join('?' * len(JOB_COLUMNS))})",
+                [self._encode(column, job.get(column)) for column in JOB_COLUMNS]
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._decode(row) if row else None
+
+    def claim_next(self, owner):
+        """Atomically mark the highest-priority queued job as running by owner (a pid) and return it"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE status = 'queued' "
+                    "ORDER BY priority, created LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                started = time.time()
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started = ?, owner = ?, heartbeat = ? WHERE id = ?",
+                    (started, owner, started, row[0])
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = self._decode(row)
+        job["status"] = "running"
+        job["started"] = started
+        return job
+
+    def finish(self, job_id, status, result=None, error=None, owner=None):
+        """Record the outcome; with owner, only while that owner still runs the job"""
+        query = "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE id = ?"
+        params = [status, json.dumps(result) if result is not None else None, error, time.time(), job_id]
+        if owner is not None:
+            query += " AND status = 'running' AND owner = ?"
+            params.append(owner)
+        with self._lock:
+            self._conn.execute(query, params)
+
+    def heartbeat(self, job_ids, owner):
+        """Mark owner's running jobs as still alive"""
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET heartbeat = ? WHERE status = 'running' AND owner = ? "
+                f"AND id IN ({', '.join('?' * len(job_ids))})",
+                [time.time(), owner, *job_ids]
+            )
+
+    def running_owners(self):
+        """Pids of the processes with running jobs"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status = 'running' AND owner IS NOT NULL"
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def requeue_running(self, stale_before, dead_owners=()):
+        """Return running jobs to the queue if their heartbeat is stale or their owner has exited"""
+        dead_owners = list(dead_owners)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started = NULL, owner = NULL, heartbeat = NULL "
+                "WHERE status = 'running' AND (heartbeat IS NULL OR heartbeat < ? "
+                f"OR owner IN ({', '.join('?' * len(dead_owners))}))",
+                [stale_before, *dead_owners]
+            )
+
+    def prune(self, older_than):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished < ?", (older_than,)
+            )
+
+    def _encode(self, column, value):
+        if column in ("payload", "result") and value is not None:
+            return json.dumps(value)
+        return value
+
+    def _decode(self, row):
+        job = dict(zip(JOB_COLUMNS, row))
+        for column in ("payload", "result"):
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+
+class MemoryJobStore:
+    """Jobs held in this process only"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return {column: job.get(column) for column in JOB_COLUMNS} if job else None
+
+    def claim_next(self, owner):
+        with self._lock:
+            queued = [job for job in self._jobs.values() if job["status"] == "queued"]
+            if not queued:
+                return None
+            job = min(queued, key=lambda job: (job["priority"], job["created"]))
+            job.update(status="running", started=time.time(), owner=owner)
+            job["heartbeat"] = job["started"]
+            return {column: job.get(column) for column in JOB_COLUMNS}
+
+    def finish(self, job_id, status, result=None, error=None, owner=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and (owner is None or (job["status"] == "running" and job.get("owner") == owner)):
+                job.update(status=status, result=result, error=error, finished=time.time())
+
+    def heartbeat(self, job_ids, owner):
+        now = time.time()
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job and job["status"] == "running" and job.get("owner") == owner:
+                    job["heartbeat"] = now
+
+    def running_owners(self):
+        with self._lock:
+            return {job.get("owner") for job in self._jobs.values()
+                    if job["status"] == "running" and job.get("owner") is not None}
+
+    def requeue_running(self, stale_before, dead_owners=()):
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] != "running":
+                    continue
+                if (job.get("heartbeat") or 0) < stale_before or job.get("owner") in dead_owners:
+                    job.update(status="queued", started=None, owner=None, heartbeat=None)
+
+    def prune(self, older_than):
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job["status"] in FINISHED_STATUSES and job["finished"] < older_than]:
+                del self._jobs[job_id]
+
+
+def create_store():
+    """Pick the job store from JOB_QUEUE_BACKEND (sqlite or memory)"""
+    if os.getenv("JOB_QUEUE_BACKEND", "sqlite").lower() == "memory":
+        return MemoryJobStore()
+    return SQLiteJobStore()
+
+
+class JobQueue:
+    """
+    Runs heavy requests off the web worker. Submitted jobs are stored, then a
+    dispatcher thread hands the highest-priority queued job to the render
+    pool whenever one of its workers is free. Clients poll get() or wait on
+    wait_for_update().
+    """
+
+    def __init__(self, store=None, pool=None):
+        self.store = store or create_store()
+        self.pool = pool or RenderPool()
+        self.max_workers = self.pool.max_workers
+        self._running = 0
+        self._changed = threading.Condition()
+        self._dispatcher = None
+        self._active = set()
+        self._last_prune = 0
+        self._last_heartbeat = 0
+
+        if not os.path.exists(UPLOAD_DIR):
+            os.makedirs(UPLOAD_DIR)
+
+    def save_upload(self, file_storage, suffix=""):
+        """Persist an uploaded file for the worker process and return its path"""
+        path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}{suffix}")
+        file_storage.save(path)
+        return path
+
+    def submit(self, job_type, payload, priority=None):
+        """Queue a job and return its id immediately"""
+        if job_type not in JOB_PRIORITIES:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "priority": JOB_PRIORITIES[job_type] if priority is None else priority,
+            "status": "queued",
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "created": time.time(),
+            "started": None,
+            "finished": None
+        }
+        self.store.add(job)
+        self._start()
+        with self._changed:
+            self._changed.notify_all()
+        return job["id"]
+
+    def get(self, job_id):
+        """Public view of a job, or None"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        view = {key: job[key] for key in ("id", "type", "status", "created", "started", "finished")}
+        if job["status"] == "done":
+            view["result"] = job["result"]
+        elif job["status"] == "failed":
+            view["error"] = job["error"]
+        return view
+
+    def wait_for_update(self, job_id, status, timeout=15.0):
+        """Block until the job leaves `status` or timeout passes; returns the job"""
+        deadline = time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] != status:
+                return job
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return job
+            with self._changed:
+                # Completions in this process notify; other processes are polled
+                self._changed.wait(min(remaining, POLL_INTERVAL))
+
+    def _start(self):
+        if self._dispatcher is not None:
+            return
+        with self._changed:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            self._maintain()
+            with self._changed:
+                if self._running >= self.max_workers:
+                    # Wake up now and then to keep heartbeats going
+                    self._changed.wait(HEARTBEAT_INTERVAL)
+                    continue
+
+            owner = os.getpid()
+            job = self.store.claim_next(owner)
+            if job is None:
+                with self._changed:
+                    self._changed.wait(POLL_INTERVAL)
+                continue
+
+            with self._changed:
+                self._running += 1
+                self._active.add(job["id"])
+            try:
+                # Jobs wait for a pool slot rather than being rejected
+                future = self.pool.submit(job["type"], job["payload"], timeout=None)
+            except Exception as e:
+                self.store.finish(job["id"], "failed", error=str(e), owner=owner)
+                with self._changed:
+                    self._running -= 1
+                    self._active.discard(job["id"])
+                continue
+            future.add_done_callback(
+                lambda future, job_id=job["id"], owner=owner: self._finish(job_id, future, owner)
+            )
+
+    def _finish(self, job_id, future, owner):
+        # A job requeued from under this process (stale heartbeat) keeps the
+        # other run's outcome; finish() only applies while owner still runs it
+        try:
+            self.store.finish(job_id, "done", result=future.result(), owner=owner)
+        except Exception as e:
+            print(f"Job {job_id} failed: {str(e)}")
+            self.store.finish(job_id, "failed", error=str(e), owner=owner)
+        with self._changed:
+            self._running -= 1
+            self._active.discard(job_id)
+            self._changed.notify_all()
+
+    def _maintain(self):
+        """
+        Keep this process's running jobs' heartbeats fresh, and occasionally
+        drop old finished jobs and requeue ones orphaned by a crash
+        """
+        now = time.time()
+        if now - self._last_heartbeat >= HEARTBEAT_INTERVAL:
+            self._last_heartbeat = now
+            with self._changed:
+                active = list(self._active)
+            self.store.heartbeat(active, os.getpid())
+
+        if now - self._last_prune < MAINTAIN_INTERVAL:
+            return
+        self._last_prune = now
+        self.store.prune(now - JOB_RETENTION)
+        dead_owners = [pid for pid in self.store.running_owners() if not _process_alive(pid)]
+        self.store.requeue_running(now - JOB_HEARTBEAT_TIMEOUT, dead_owners)
@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from utils.vad import detect_speech_segments
+from utils.audio_ingest import CANONICAL_SAMPLE_RATE
+
+RECOGNIZER_SAMPLE_RATE = CANONICAL_SAMPLE_RATE
+MAX_PARALLEL_SEGMENTS = 4
+
+
+class GoogleSegmentRecognizer:
+    """Recognize one PCM segment with Google Cloud Speech"""
+
+    def __init__(self, client=None):
+        from google.cloud import speech
+        self.speech = speech
+        self.client = client or speech.SpeechClient()
+
+    def recognize(self, pcm, sample_rate, language_code):
+        audio = self.speech.RecognitionAudio(content=pcm)
+        config = self.speech.RecognitionConfig(
+            encoding=self.speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            language_code=language_code,
+            enable_automatic_punctuation=True
+        )
+        response = self.client.recognize(config=config, audio=audio)
+        return " ".join(result.alternatives[0].transcript.strip() for result in response.results)
+
+
+class FakeRecognizer:
+    """Offline recognizer for tests and local development"""
+
+    def recognize(self, pcm, sample_rate, language_code):
+        seconds = len(pcm) / 2 / sample_rate
+        return f"[{seconds:.2f}s of {language_code} speech]"
+
+
+def create_recognizer(client=None):
+    """Pick the recognizer from SPEECH_RECOGNIZER (google or fake)"""
+    if os.getenv("SPEECH_RECOGNIZER", "google").lower() == "fake":
+        return FakeRecognizer()
+    return GoogleSegmentRecognizer(client)
+
+
+class LongAudioTranscriber:
+    """
+    Transcribe audio of any length by splitting it at silences and
+    recognizing the segments concurrently.
+    """
+
+    def __init__(self, recognizer, max_workers=MAX_PARALLEL_SEGMENTS):
+        self.recognizer = recognizer
+        self.max_workers = max_workers
+
+    def transcribe(self, pcm, sample_rate=RECOGNIZER_SAMPLE_RATE, language_code="en-US"):
+        """Return the stitched transcript and per-segment timestamps"""
+        boundaries = detect_speech_segments(pcm, sample_rate)
+        if not boundaries:
+            return {"transcript": "", "segments": []}
+
+        def recognize(bounds):
+            start, end = bounds
+            try:
+                return self.recognizer.recognize(pcm[start * 2:end * 2], sample_rate, language_code)
+            except Exception as e:
+                print(f"Segment recognition error at {start / sample_rate:.2f}s: {str(e)}")
+                return ""
+
+        # map() keeps results in segment order however they finish
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(boundaries))) as executor:
+            texts = list(executor.map(recognize, boundaries))
+
+        segments = [
+            {
+                "start": round(start / sample_rate, 2),
+                "end": round(end / sample_rate, 2),
+                "text": text
+            }
+            for (start, end), text in zip(boundaries, texts)
+        ]
+        transcript = " ".join(segment["text"] for segment in segments if segment["text"])
+        return {"transcript": transcript, "segments": segments}
@@ -0,0 +1,156 @@
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from services.worker_tasks import run_task
+
+# Requests waiting for a free worker beyond the workers themselves
+DEFAULT_QUEUE_DEPTH = 8
+
+# How long a synchronous caller waits for a slot before giving up
+QUEUE_TIMEOUT = 10.0
+
+# Latencies kept for the percentile figures in stats()
+LATENCY_WINDOW = 500
+
+
+class RenderPoolBusy(Exception):
+    """Raised when the pool's queue is full"""
+
+
+class RenderPool:
+    """
+    Process pool for CPU-heavy rendering, so Pillow work never holds the web
+    process's GIL. Uploads travel to workers in shared memory and results
+    come back as file URLs, so no image is ever pickled.
+    """
+
+    def __init__(self, max_workers=None, queue_depth=None):
+        self.max_workers = max_workers or int(os.getenv("RENDER_WORKERS", min(4, os.cpu_count() or 1)))
+        self.queue_depth = queue_depth if queue_depth is not None else int(
+            os.getenv("RENDER_QUEUE_DEPTH", DEFAULT_QUEUE_DEPTH)
+        )
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.queue_depth)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, task, payload, data=None, timeout=QUEUE_TIMEOUT):
+        """
+        Start a task and return its Future. data (bytes) is placed in shared
+        memory for the worker. timeout=None waits for a slot indefinitely;
+        otherwise RenderPoolBusy is raised when none frees up in time.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self.rejected += 1
+            raise RenderPoolBusy("Render queue is full")
+
+        shm = None
+        try:
+            if data:
+                shm = shared_memory.SharedMemory(create=True, size=len(data))
+                shm.buf[:len(data)] = data
+                payload = dict(payload, shared_input=(shm.name, len(data)))
+        except Exception:
+            self._release(shm)
+            raise
+
+        with self._lock:
+            self.in_flight += 1
+        started = time.time()
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(run_task, task, payload)
+            except BrokenProcessPool:
+                # A worker died since the last task; start over with a fresh pool
+                self._discard_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(run_task, task, payload)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            self._release(shm)
+            raise
+
+        future.add_done_callback(lambda future: self._done(future, started, shm, executor))
+        return future
+
+    def run(self, task, payload, data=None, timeout=QUEUE_TIMEOUT):
+        """Submit a task and wait for its result"""
+        return self.submit(task, payload, data, timeout).result()
+
+    def stats(self):
+        """Pool size, queue depth and task latency"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            in_flight = self.in_flight
+        return {
+            "workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - self.max_workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "latency_ms": {
+                "p50": _percentile(latencies, 0.5),
+                "p95": _percentile(latencies, 0.95),
+                "max": round(latencies[-1] * 1000, 1) if latencies else None
+            }
+        }
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Spawned workers don't inherit the web server's threads or sockets
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def _discard_executor(self, executor):
+        """Forget a broken executor so the next submit spawns a new one"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        print("Render pool broken, restarting workers")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, future, started, shm, executor):
+        error = future.exception()
+        with self._lock:
+            self.in_flight -= 1
+            self._latencies.append(time.time() - started)
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        self._release(shm)
+        if isinstance(error, BrokenProcessPool):
+            self._discard_executor(executor)
+
+    def _release(self, shm):
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        self._slots.release()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    index = min(len(values) - 1, int(len(values) * fraction))
+    return round(values[index] * 1000, 1)
@@ -0,0 +1,156 @@
+import re
+import json
+import time
+
+# Precompiled once at import; the tolerant parser scans the text a single time
+_FIELD_PATTERN = re.compile(
+    r'["\']?(\w+)["\']?\s*:[ \t]*(\[[^\]]*\]|"[^"]*"|\'[^\']*\'|[^,\n]*)'
+)
+_QUOTED_ITEM_PATTERN = re.compile(r'"([^"]*)"|\'([^\']*)\'')
+
+
+class StructuredResponseParser:
+    """Parse model output against a flat field schema with per-call stats"""
+
+    def __init__(self, schema):
+        # schema maps field name -> (type, default), where type is str or list
+        self.schema = schema
+        self.calls = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.total_parse_ms = 0.0
+        self.last_stats = None
+
+    def response_schema(self):
+        """Build the JSON schema sent to the model for constrained output"""
+        properties = {}
+        for field, (field_type, _) in self.schema.items():
+            if field_type is list:
+                properties[field] = {"type": "array", "items": {"type": "string"}}
+            else:
+                properties[field] = {"type": "string"}
+        return {
+            "type": "object",
+            "properties": properties,
+            "required": list(self.schema.keys())
+        }
+
+    def parse(self, text):
+        """
+        Parse a model response into a dict matching the schema.
+        Well-formed JSON is decoded in one pass; anything else goes through
+        a single tolerant scan.
+        """
+        start = time.perf_counter()
+        self.calls += 1
+
+        result = self._parse_json(text)
+        path = "json"
+        if result is None:
+            path = "fallback"
+            self.fallbacks += 1
+            result = self._parse_tolerant(text)
+            if not result:
+                self.failures += 1
+                path = "failed"
+
+        parsed = self._apply_schema(result or {})
+
+        parse_ms = (time.perf_counter() - start) * 1000
+        self.total_parse_ms += parse_ms
+        self.last_stats = {
+            "path": path,
+            "parse_ms": round(parse_ms, 3),
+            "failure_rate": round(self.failures / self.calls, 4),
+            "fallback_rate": round(self.fallbacks / self.calls, 4)
+        }
+        return parsed
+
+    def stats(self):
+        """Return cumulative parse statistics"""
+        return {
+            "calls": self.calls,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+            "failure_rate": round(self.failures / self.calls, 4) if self.calls else 0.0,
+            "avg_parse_ms": round(self.total_parse_ms / self.calls, 3) if self.calls else 0.0
+        }
+
+    def _parse_json(self, text):
+        """Decode the JSON object in the response, tolerating a code fence"""
+        if not text:
+            return None
+
+        # Locate the outermost object with plain string scans instead of regex
+        start = text.find('{')
+        end = text.rfind('}')
+        if start == -1 or end <= start:
+            return None
+
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return None
+
+        return data if isinstance(data, dict) else None
+
+    def _parse_tolerant(self, text):
+        """Recover schema fields from malformed output in one scan"""
+        if not text:
+            return {}
+
+        found = {}
+        for match in _FIELD_PATTERN.finditer(text):
+            key = match.group(1)
+            if key not in self.schema or key in found:
+                continue
+
+            field_type = self.schema[key][0]
+            raw_value = match.group(2).strip()
+
+            if field_type is list:
+                items = self._parse_list_value(raw_value)
+                if not items:
+                    items = self._parse_bullets(text, match.end())
+                if items:
+                    found[key] = items
+            elif raw_value:
+                found[key] = raw_value.strip('"\'').strip()
+
+        return found
+
+    def _parse_list_value(self, raw_value):
+        """Extract quoted items from a bracketed list"""
+        if not raw_value.startswith('['):
+            return []
+        return [double or single for double, single in _QUOTED_ITEM_PATTERN.findall(raw_value)]
+
+    def _parse_bullets(self, text, offset):
+        """Collect '- item' lines following a field name"""
+        items = []
+        for line in text[offset:].split('\n', 6)[1:6]:  # Look at first 5 lines after field name
+            line = line.strip()
+            if line.startswith('- '):
+                items.append(line[2:])
+        return items
+
+    def _apply_schema(self, data):
+        """Coerce parsed values to the schema types and fill in defaults"""
+        parsed = {}
+        for field, (field_type, default) in self.schema.items():
+            value = data.get(field)
+            if field_type is list:
+                if isinstance(value, list):
+                    parsed[field] = [str(item) for item in value]
+                elif isinstance(value, str) and value:
+                    parsed[field] = [value]
+                else:
+                    parsed[field] = list(default)
+            else:
+                if isinstance(value, str) and value:
+                    parsed[field] = value
+                elif value is not None and not isinstance(value, (dict, list)):
+                    parsed[field] = str(value)
+                else:
+                    parsed[field] = default
+        return parsed
@@ -0,0 +1,87 @@
+import os
+from io import BytesIO
+from multiprocessing import shared_memory
+
+# Models are created on first use in each worker process and then reused
+_models = {}
+
+
+def _model(name):
+    model = _models.get(name)
+    if model is None:
+        if name == "image":
+            from models.image_model import ImageTransformer
+            model = ImageTransformer()
+        elif name == "voice":
+            from models.voice_model import VoiceConverter
+            model = VoiceConverter()
+        elif name == "meme":
+            from models.meme_generator import MemeGenerator
+            model = MemeGenerator()
+        elif name == "derivatives":
+            from utils.derivatives import DerivativeStore
+            model = DerivativeStore()
+        _models[name] = model
+    return model
+
+
+def _read_shared_input(payload):
+    """Copy an upload out of the shared memory block the web process created"""
+    name, size = payload["shared_input"]
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        # Only detach; the web process unlinks the block once the task is done
+        shm.close()
+    return BytesIO(data)
+
+
+def _input(payload, key):
+    """The task's upload: shared memory if given, else a saved file path"""
+    if payload.get("shared_input"):
+        return _read_shared_input(payload)
+    return payload.get(key)
+
+
+def transform_image(payload):
+    """Era filter plus optional Stability round trip"""
+    url = _model("image").transform(
+        _input(payload, "image_path"), payload["era"], payload.get("accept"), payload.get("max_kb")
+    )
+    return {"transformed_url": url, "thumbnails": _model("derivatives").thumbnails(url)}
+
+
+def convert_voice(payload):
+    """Speech to text, era text to speech and audio effects"""
+    from utils.audio_ingest import ingest_audio
+
+    audio = ingest_audio(_input(payload, "audio_path"))
+    return {"converted_url": _model("voice").convert(audio, payload["era"])}
+
+
+def generate_meme(payload):
+    """Render a meme from a template"""
+    url = _model("meme").generate(
+        payload["template"], _input(payload, "image_path"), payload.get("text", ""),
+        payload.get("format"), payload.get("accept"), payload.get("max_kb")
+    )
+    return {"meme_url": url, "thumbnails": _model("derivatives").thumbnails(url)}
+
+
+TASKS = {
+    "image": transform_image,
+    "voice": convert_voice,
+    "meme": generate_meme
+}
+
+
+def run_task(job_type, payload):
+    """Entry point in the worker process; uploads are removed once used"""
+    try:
+        return TASKS[job_type](payload)
+    finally:
+        for key in ("image_path", "audio_path"):
+            path = payload.get(key)
+            if path and os.path.exists(path):
+                os.remove(path)
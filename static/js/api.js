@@ -1,3 +1,120 @@
+/**
+ * Accept header for endpoints that return generated images, so the server
+ * can encode WebP/AVIF when this browser decodes them
+ */
+const IMAGE_ACCEPT = (function() {
+    const types = ['application/json'];
+    try {
+        const canvas = document.createElement('canvas');
+        canvas.width = canvas.height = 1;
+        if (canvas.toDataURL('image/avif').startsWith('data:image/avif')) {
+            types.push('image/avif');
+        }
+        if (canvas.toDataURL('image/webp').startsWith('data:image/webp')) {
+            types.push('image/webp');
+        }
+    } catch (error) {
+        console.error(`Image format detection failed: ${error.message}`);
+    }
+    return types.join(', ');
+})();
+
+/**
+ * Build an <img> that lets the browser pick a downscaled derivative.
+ * thumbnails maps widths to /thumb/ URLs and the original's width to its URL.
+ */
+function responsiveImage(url, thumbnails, alt, sizes = '(max-width: 600px) 100vw, 600px') {
+    const widths = Object.keys(thumbnails || {}).map(Number).sort((a, b) => a - b);
+    if (widths.length === 0) {
+        return `<img src="${url}" alt="${alt}">`;
+    }
+    
+    const srcset = widths.map(width => `${thumbnails[width]} ${width}w`);
+    return `<img src="${url}" srcset="${srcset.join(', ')}" sizes="${sizes}" alt="${alt}">`;
+}
+
+/**
+ * Run a heavy request as a background job: submit with async=1, then wait
+ * for the job's completion event and resolve with its result
+ */
+async function fetchJob(endpoint, options = {}) {
+    const job = await fetchAPI(`${endpoint}?async=1`, options);
+    
+    return new Promise((resolve, reject) => {
+        const events = new EventSource(job.events_url);
+        events.addEventListener('status', (event) => {
+            const status = JSON.parse(event.data);
+            if (status.status === 'done') {
+                events.close();
+                resolve(status.result);
+            } else if (status.status === 'failed') {
+                events.close();
+                reject(new Error(`Job failed: ${status.error}`));
+            }
+        });
+        events.onerror = () => {
+            // Fall back to polling if the event stream drops
+            events.close();
+            pollJob(job.status_url).then(resolve, reject);
+        };
+    });
+}
+
+async function pollJob(statusUrl, interval = 1000) {
+    while (true) {
+        const status = await fetchAPI(statusUrl);
+        if (status.status === 'done') {
+            return status.result;
+        }
+        if (status.status === 'failed') {
+            throw new Error(`Job failed: ${status.error}`);
+        }
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
+/**
+ * POST to a server-sent events endpoint and call onEvent(name, data) for
+ * each event as it arrives (EventSource itself only supports GET)
+ */
+async function fetchEventStream(endpoint, options, onEvent) {
+    const response = await fetch(endpoint, options);
+    if (!response.ok || !response.body) {
+        throw new Error(`API error (${response.status}): ${await response.text()}`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let name = 'message';
+            const data = [];
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event:')) {
+                    name = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data.push(line.slice(5).trim());
+                }
+            }
+            if (data.length) {
+                onEvent(name, JSON.parse(data.join('\n')));
+            }
+        }
+    }
+}
+
 /**
  * Helper function for API calls
  */
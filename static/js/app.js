@@ -27,30 +27,40 @@ function initTextTranslator() {
         translateBtn.textContent = 'Translating...';
         
         try {
-            // Call translation API
-            const response = await fetchAPI('/translate-text', {
+            const request = {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     text: modernText.value,
                     era: textEra.value
                 })
-            });
+            };
             
-            translatedTextOutput.textContent = response.translated_text;
+            let result = null;
+            translatedTextOutput.textContent = '';
+            try {
+                // Render the translation as it streams in
+                await fetchEventStream('/translate-stream', request, (event, data) => {
+                    if (event === 'chunk') {
+                        translatedTextOutput.textContent += data.text;
+                    } else if (event === 'replace') {
+                        translatedTextOutput.textContent = data.text;
+                    } else if (event === 'done') {
+                        result = data;
+                    }
+                });
+            } catch (error) {
+                console.error('Translation stream error:', error);
+            }
             
-            // Get cringe rating for the translated text
-            const cringeResponse = await fetchAPI('/rate-cringe', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    content: response.translated_text,
-                    era: textEra.value
-                })
-            });
+            // Translation and cringe rating in one request if streaming broke off
+            if (!result) {
+                result = await fetchAPI('/translate-and-rate', request);
+            }
+            translatedTextOutput.textContent = result.translated;
             
             // Update cringe meter
-            const cringePct = (cringeResponse.rating / 10) * 100;
+            const cringePct = ((result.cringe_score || 0) / 10) * 100;
             cringeLevel.style.width = `${cringePct}%`;
             
         } catch (error) {
@@ -99,13 +109,14 @@ function initImageTransformer() {
             formData.append('image', imageInput.files[0]);
             formData.append('era', imageEra.value);
             
-            const response = await fetchAPI('/transform-image', {
+            const response = await fetchJob('/transform-image', {
                 method: 'POST',
+                headers: { 'Accept': IMAGE_ACCEPT },
                 body: formData
             });
             
             transformedImage.innerHTML = `
-                <img src="${response.transformed_url}" alt="Transformed Image">
+                ${responsiveImage(response.transformed_url, response.thumbnails, 'Transformed Image')}
                 <div class="download-link">
                     <a href="${response.transformed_url}" download target="_blank">Download</a>
                 </div>
@@ -235,7 +246,7 @@ function initVoiceConverter() {
             formData.append('audio', audioBlob, 'recording.mp3');
             formData.append('era', voiceEra.value);
             
-            const response = await fetchAPI('/convert-voice', {
+            const response = await fetchJob('/convert-voice', {
                 method: 'POST',
                 body: formData
             });
@@ -355,11 +366,12 @@ function initMemeGenerator() {
             
             const response = await fetchAPI('/generate-meme', {
                 method: 'POST',
+                headers: { 'Accept': IMAGE_ACCEPT },
                 body: formData
             });
             
             generatedMeme.innerHTML = `
-                <img src="${response.meme_url}" alt="Generated Meme">
+                ${responsiveImage(response.meme_url, response.thumbnails, 'Generated Meme')}
                 <div class="download-link">
                     <a href="${response.meme_url}" download target="_blank">Download</a>
                 </div>
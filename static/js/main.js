@@ -99,6 +99,125 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Live era and cringe indicator while typing
+    const liveInput = document.getElementById('text-input');
+    const liveEra = document.getElementById('live-era');
+    
+    if (liveInput && liveEra) {
+        let liveSession = null;
+        let scoredText = '';
+        let scoredEra = null;
+        let scoring = false;
+        let resyncing = false;
+        
+        // Smallest edit turning one text into the other, in code points
+        // to match the server's string offsets
+        function textEdit(before, after) {
+            const a = Array.from(before);
+            const b = Array.from(after);
+            let start = 0;
+            while (start < a.length && start < b.length && a[start] === b[start]) {
+                start++;
+            }
+            let end = a.length;
+            let newEnd = b.length;
+            while (end > start && newEnd > start && a[end - 1] === b[newEnd - 1]) {
+                end--;
+                newEnd--;
+            }
+            return { start: start, end: end, text: b.slice(start, newEnd).join('') };
+        }
+        
+        // Same lowercasing and CRC-32 as text_digest on the server, so an
+        // edit can be checked against the session without sending the text
+        const crcTable = Array.from({ length: 256 }, (_, n) => {
+            let c = n;
+            for (let k = 0; k < 8; k++) {
+                c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+            }
+            return c >>> 0;
+        });
+        
+        function textDigest(text) {
+            const lowered = Array.from(text, (c) => {
+                const lower = c.toLowerCase();
+                return Array.from(lower).length === 1 ? lower : c;
+            }).join('');
+            let crc = 0xFFFFFFFF;
+            for (const byte of new TextEncoder().encode(lowered)) {
+                crc = crcTable[(crc ^ byte) & 0xFF] ^ (crc >>> 8);
+            }
+            return ((crc ^ 0xFFFFFFFF) >>> 0).toString(16).padStart(8, '0');
+        }
+        
+        function showLiveScore(data) {
+            if (!data.top_era) {
+                liveEra.textContent = '';
+                return;
+            }
+            const confidence = Math.round(data.confidence * 100);
+            liveEra.textContent = `Sounds like: ${data.top_era} (${confidence}%) | Cringe: ${data.cringe_score}/10`;
+        }
+        
+        // One request in flight; edits made meanwhile go out as a single diff
+        async function updateLiveScore() {
+            if (scoring) {
+                return;
+            }
+            const text = liveInput.value;
+            const era = eraSelect ? eraSelect.value : '2020s';
+            if (text === scoredText && era === scoredEra && liveSession && !resyncing) {
+                return;
+            }
+            
+            const body = liveSession && !resyncing
+                ? {
+                    session_id: liveSession,
+                    era: era,
+                    edit: textEdit(scoredText, text),
+                    length: Array.from(text).length,
+                    hash: textDigest(text)
+                }
+                : { session_id: liveSession, era: era, text: text };
+            let resync = false;
+            scoring = true;
+            try {
+                const response = await fetch('/live-score', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(body)
+                });
+                const data = await response.json();
+                if (response.status === 409) {
+                    // Keep the id; the full text rebuilds the session under it
+                    resyncing = true;
+                    resync = true;
+                } else if (response.ok) {
+                    liveSession = data.session_id;
+                    resyncing = false;
+                    scoredText = text;
+                    scoredEra = era;
+                    showLiveScore(data);
+                }
+            } catch (error) {
+                console.error('Live score error:', error);
+                liveSession = null;
+                return;
+            } finally {
+                scoring = false;
+            }
+            
+            if (resync || liveInput.value !== text || (eraSelect && eraSelect.value !== era)) {
+                updateLiveScore();
+            }
+        }
+        
+        liveInput.addEventListener('input', updateLiveScore);
+        if (eraSelect) {
+            eraSelect.addEventListener('change', updateLiveScore);
+        }
+    }
+    
     // Form submission handling
     const translateBtn = document.getElementById('translate-btn');
     // Update the translate button event handler with better error handling
@@ -1,5 +0,0 @@
-packaging==24.1
-pillow==10.4.0
-python-dotenv==1.0.1
-requests==2.32.3
-urllib3==2.2.3
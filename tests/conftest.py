@@ -1,5 +1,31 @@
-packaging==24.1
-pillow==10.4.0
-python-dotenv==1.0.1
-requests==2.32.3
-urllib3==2.2.3
+import os
+import sys
+import math
+from array import array
+
+import pytest
+
+# Caches stay in process memory so tests never write to data/cache
+os.environ["SERVICE_CACHE_BACKEND"] = "memory"
+
+SAMPLE_RATE = 16000
+
+# 200 Hz divides the sample rate, so one period tiles any duration exactly
+_PERIOD = SAMPLE_RATE // 200
+
+
+def make_pcm(*parts):
+    """16-bit mono PCM from (seconds, amplitude) parts; amplitude 0 is silence"""
+    samples = array("h")
+    for seconds, amplitude in parts:
+        period = array("h", (int(amplitude * math.sin(2 * math.pi * i / _PERIOD)) for i in range(_PERIOD)))
+        count = int(seconds * SAMPLE_RATE)
+        samples.extend((period * (count // _PERIOD + 1))[:count])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+@pytest.fixture
+def pcm():
+    return make_pcm
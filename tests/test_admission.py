@@ -0,0 +1,95 @@
+import time
+import threading
+
+import pytest
+
+from utils.admission import AdmissionController, AdmissionRejected, RouteLimit
+
+
+def test_client_over_its_rate_gets_429():
+    admission = AdmissionController({"route": RouteLimit(client_rate=1, client_burst=2)})
+    admission.acquire("route", "alice")
+    admission.acquire("route", "alice")
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire("route", "alice")
+    assert rejected.value.status == 429
+    assert 0 < rejected.value.retry_after <= 1
+
+    # Other clients have their own bucket
+    admission.acquire("route", "bob")
+    assert admission.stats()["route"]["rejected_client"] == 1
+
+
+def test_route_quota_sheds_with_503():
+    admission = AdmissionController({"route": RouteLimit(route_rate=1, route_burst=1)})
+    admission.acquire("route", "alice")
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire("route", "bob")
+    assert rejected.value.status == 503
+    assert admission.stats()["route"]["rejected_route"] == 1
+
+
+def test_full_queue_sheds_immediately():
+    admission = AdmissionController({"route": RouteLimit(concurrency=1, queue_depth=0)})
+    admission.acquire("route", "alice")
+
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire("route", "bob")
+    assert rejected.value.status == 503
+    assert time.monotonic() - started < 0.5
+    assert admission.stats()["route"]["shed_queue_full"] == 1
+
+
+def test_expected_wait_past_the_deadline_sheds_without_waiting():
+    admission = AdmissionController({"route": RouteLimit(concurrency=1, queue_depth=5, max_wait=0.5)})
+    admission.acquire("route", "alice")
+    admission.routes["route"].service_time = 2.0
+
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire("route", "bob")
+    assert rejected.value.status == 503
+    assert rejected.value.retry_after == pytest.approx(2.0)
+    assert time.monotonic() - started < 0.2
+    assert admission.stats()["route"]["shed_deadline"] == 1
+
+
+def test_queued_request_runs_when_a_slot_frees():
+    admission = AdmissionController({"route": RouteLimit(concurrency=1, queue_depth=1, max_wait=5)})
+    first = admission.acquire("route", "alice")
+    admitted = []
+
+    waiter = threading.Thread(target=lambda: admitted.append(admission.acquire("route", "bob")))
+    waiter.start()
+    deadline = time.time() + 5
+    while admission.stats()["route"]["waiting"] != 1:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    admission.release(first)
+    waiter.join(5)
+
+    assert len(admitted) == 1
+    stats = admission.stats()["route"]
+    assert (stats["active"], stats["waiting"], stats["admitted"]) == (1, 0, 2)
+    assert stats["service_ms"] is not None
+
+
+def test_queued_request_times_out_at_its_deadline():
+    admission = AdmissionController({"route": RouteLimit(concurrency=1, queue_depth=1, max_wait=0.2)})
+    admission.acquire("route", "alice")
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire("route", "bob")
+    assert rejected.value.status == 503
+    stats = admission.stats()["route"]
+    assert stats["timed_out"] == 1 and stats["waiting"] == 0
+
+
+def test_routes_without_limits_are_not_tracked():
+    admission = AdmissionController({})
+    ticket = admission.acquire("other", "alice")
+    assert ticket is None
+    admission.release(ticket)
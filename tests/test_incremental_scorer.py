@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+pytest.importorskip("openai")
+
+from utils.cringe_meter import CringeMeter
+from utils.era_detector import EraDetector
+from utils.incremental_scorer import IncrementalScorer, text_digest, _lower
+
+WORDS = [
+    "yolo", "swag", "like a boss", "keep calm and", "rawr xD", ":D", "epic fail", "o rly",
+    "no cap", "sus", "vibe check", "sheesh", "not me crying", "asl?", "cyber", "lol", "brb",
+    "soooooo", "!!!!", "!", "the", "cat", "went", "home", "LOL", "Über"
+]
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return IncrementalScorer(EraDetector(), CringeMeter())
+
+
+def expected(scorer, text, era):
+    scores = scorer.era_detector._pattern_detect(text)
+    return {era: round(score, 4) for era, score in scores.items()}, scorer.cringe_meter.quick_rate(text, era)
+
+
+@pytest.mark.parametrize("era", ["1990s", "2000s", "2010s", "2020s"])
+def test_scores_match_full_text_scoring_after_random_edits(scorer, era):
+    rng = random.Random(era)
+    text = " ".join(rng.choice(WORDS) for _ in range(30))
+    session_id, scores = scorer.start(text, era)
+
+    for _ in range(300):
+        start = rng.randint(0, len(text))
+        end = min(len(text), start + rng.choice([0, 0, 1, 3, 12]))
+        insert = rng.choice(["", " " + rng.choice(WORDS), rng.choice(WORDS) + " ", "!", "o"])
+        text = text[:start] + insert + text[end:]
+        scores = scorer.update(session_id, start, end, insert, era, len(text), text_digest(_lower(text)))
+
+        era_scores, cringe = expected(scorer, text, era)
+        assert scores["era_scores"] == era_scores
+        assert scores["cringe_score"] == cringe
+        assert scores["length"] == len(text)
+
+
+def test_era_change_rescores_the_same_text(scorer):
+    text = "yolo swag no cap sheesh"
+    session_id, _ = scorer.start(text, "2010s")
+    scores = scorer.update(session_id, len(text), len(text), "!", "2020s", len(text) + 1, text_digest(text + "!"))
+
+    assert scores["cringe_score"] == scorer.cringe_meter.quick_rate(text + "!", "2020s")
+
+
+def test_stale_copies_ask_for_a_resync(scorer):
+    session_id, _ = scorer.start("hello there", "2010s")
+
+    # Wrong length: the client's text diverged
+    assert scorer.update(session_id, 0, 0, "a", "2010s", 99, text_digest("ahello there")) is None
+    assert scorer.update(session_id, 0, 0, "a", "2010s", 12, text_digest("ahello there")) is None
+
+    session_id, _ = scorer.start("hello there", "2010s", session_id)
+    # Right length, different text
+    assert scorer.update(session_id, 0, 0, "a", "2010s", 12, text_digest("bhello there")) is None
+    assert scorer.update(session_id, 0, 0, "a", "2010s", 12, text_digest("ahello there")) is None
+
+    assert scorer.update("missing", 0, 0, "a", "2010s", 1, text_digest("a")) is None
+
+
+def test_sessions_are_evicted_past_the_limit():
+    scorer = IncrementalScorer(EraDetector(), CringeMeter(), max_sessions=2)
+    first, _ = scorer.start("one", "2010s")
+    scorer.start("two", "2010s")
+    scorer.start("three", "2010s")
+
+    assert scorer.stats()["sessions"] == 2
+    assert scorer.update(first, 0, 0, "a", "2010s", 4, text_digest("aone")) is None
@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import uuid
+import subprocess
+from concurrent.futures import Future
+
+import pytest
+
+from services import job_queue
+from services.job_queue import JobQueue, MemoryJobStore, SQLiteJobStore
+
+
+class FakePool:
+    """Runs jobs inline; a payload with "error" fails"""
+    max_workers = 2
+
+    def submit(self, task, payload, timeout=None):
+        future = Future()
+        if "error" in payload:
+            future.set_exception(RuntimeError(payload["error"]))
+        else:
+            future.set_result({"task": task, "url": "/static/out.png"})
+        return future
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore()
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+@pytest.fixture
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def add_job(store, priority=1):
+    job = {
+        "id": str(uuid.uuid4()), "type": "meme", "priority": priority, "status": "queued",
+        "payload": {}, "result": None, "error": None, "created": time.time(),
+        "started": None, "finished": None
+    }
+    store.add(job)
+    return job["id"]
+
+
+def test_claims_follow_priority(store):
+    low = add_job(store, priority=5)
+    high = add_job(store, priority=0)
+
+    assert store.claim_next(os.getpid())["id"] == high
+    assert store.claim_next(os.getpid())["id"] == low
+    assert store.claim_next(os.getpid()) is None
+
+
+def test_owner_and_heartbeat_stay_internal(store):
+    job_id = add_job(store)
+    claimed = store.claim_next(os.getpid())
+
+    assert set(claimed) == set(job_queue.JOB_COLUMNS)
+    assert set(store.get(job_id)) == set(job_queue.JOB_COLUMNS)
+
+
+def test_jobs_of_a_dead_owner_are_requeued(store, dead_pid):
+    orphaned = add_job(store)
+    store.claim_next(dead_pid)
+    alive = add_job(store)
+    store.claim_next(os.getpid())
+
+    assert store.running_owners() == {dead_pid, os.getpid()}
+    store.requeue_running(time.time() - job_queue.JOB_HEARTBEAT_TIMEOUT, [dead_pid])
+
+    assert store.get(orphaned)["status"] == "queued"
+    assert store.get(orphaned)["started"] is None
+    assert store.get(alive)["status"] == "running"
+
+
+def test_long_job_with_a_fresh_heartbeat_is_not_requeued(store):
+    job_id = add_job(store)
+    store.claim_next(os.getpid())
+
+    # Ten minutes on, the owner has kept the heartbeat going
+    later = time.time() + 600
+    store.heartbeat([job_id], os.getpid())
+    store.requeue_running(later - job_queue.JOB_HEARTBEAT_TIMEOUT - 600)
+    assert store.get(job_id)["status"] == "running"
+
+    # Without heartbeats it is requeued
+    store.requeue_running(later - job_queue.JOB_HEARTBEAT_TIMEOUT)
+    assert store.get(job_id)["status"] == "queued"
+
+
+def test_requeued_run_cannot_overwrite_the_new_one(store, dead_pid):
+    job_id = add_job(store)
+    store.claim_next(dead_pid)
+    store.requeue_running(time.time() - job_queue.JOB_HEARTBEAT_TIMEOUT, [dead_pid])
+    store.claim_next(os.getpid())
+
+    store.finish(job_id, "done", result="stale", owner=dead_pid)
+    assert store.get(job_id)["status"] == "running"
+    store.finish(job_id, "done", result="fresh", owner=os.getpid())
+    assert store.get(job_id)["result"] == "fresh"
+
+
+def test_heartbeat_only_touches_the_owners_jobs(store):
+    job_id = add_job(store)
+    store.claim_next(os.getpid())
+    time.sleep(0.01)
+    claimed_before = time.time()
+
+    store.heartbeat([job_id], os.getpid() + 1)
+    store.requeue_running(claimed_before)
+    assert store.get(job_id)["status"] == "queued"
+
+
+@pytest.fixture
+def queue(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    return JobQueue(store=store, pool=FakePool())
+
+
+def test_submitted_jobs_finish(queue):
+    done = queue.submit("meme", {})
+    failed = queue.submit("meme", {"error": "bad template"})
+
+    job = queue.wait_for_update(done, "queued", timeout=5)
+    if job["status"] == "running":
+        job = queue.wait_for_update(done, "running", timeout=5)
+    assert job["status"] == "done"
+    assert job["result"] == {"task": "meme", "url": "/static/out.png"}
+
+    deadline = time.time() + 5
+    while queue.get(failed)["status"] != "failed":
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert queue.get(failed)["error"] == "bad template"
+    assert queue.get("missing") is None
+
+
+def test_unknown_job_types_are_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.submit("mine_bitcoin", {})
+
+
+def test_maintenance_requeues_orphans_and_keeps_live_jobs(queue, dead_pid):
+    orphaned = add_job(queue.store)
+    queue.store.claim_next(dead_pid)
+    alive = add_job(queue.store)
+    queue.store.claim_next(os.getpid())
+
+    queue._last_prune = 0
+    queue._maintain()
+
+    assert queue.store.get(orphaned)["status"] == "queued"
+    assert queue.store.get(alive)["status"] == "running"
@@ -0,0 +1,40 @@
+import time
+
+from services.long_audio import FakeRecognizer, LongAudioTranscriber
+from tests.conftest import SAMPLE_RATE
+
+
+class SlowShortRecognizer:
+    """Longer segments answer sooner; the 13 s segment fails"""
+
+    def recognize(self, pcm, sample_rate, language_code):
+        seconds = len(pcm) / 2 / sample_rate
+        time.sleep(max(0.0, 0.3 - seconds / 50))
+        if 12.5 < seconds < 13.5:
+            raise RuntimeError("upstream error")
+        return f"{seconds:.1f}s"
+
+
+def test_fake_transcript_is_stitched_in_order(pcm):
+    audio = pcm((10, 8000), (1, 0), (10, 8000))
+    result = LongAudioTranscriber(FakeRecognizer()).transcribe(audio, SAMPLE_RATE, "en-GB")
+
+    segments = result["segments"]
+    assert len(segments) == 2
+    assert segments[0]["start"] == 0 and segments[0]["end"] == segments[1]["start"]
+    for segment in segments:
+        assert segment["text"] == f"[{segment['end'] - segment['start']:.2f}s of en-GB speech]"
+    assert result["transcript"] == " ".join(segment["text"] for segment in segments)
+
+
+def test_segments_keep_their_order_and_failures_are_blank(pcm):
+    audio = pcm((10, 8000), (1, 0), (12, 8000), (1, 0), (14, 8000))
+    result = LongAudioTranscriber(SlowShortRecognizer(), max_workers=3).transcribe(audio, SAMPLE_RATE)
+
+    assert [segment["text"] for segment in result["segments"]] == ["10.5s", "", "14.5s"]
+    assert result["transcript"] == "10.5s 14.5s"
+
+
+def test_silence_transcribes_to_nothing(pcm):
+    result = LongAudioTranscriber(FakeRecognizer()).transcribe(pcm((2, 0)), SAMPLE_RATE)
+    assert result == {"transcript": "", "segments": []}
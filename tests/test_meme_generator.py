@@ -1,5 +1,78 @@
-packaging==24.1
-pillow==10.4.0
-python-dotenv==1.0.1
-requests==2.32.3
-urllib3==2.2.3
+import os
+import json
+
+import pytest
+from PIL import Image
+
+from models.meme_generator import MemeGenerator
+
+TEMPLATES = {
+    "caption_card": {
+        "name": "Caption Card",
+        "description": "Plain card with a caption",
+        "type": "text_only",
+        "background": "card.png",
+        "era": "2010s",
+        "text_fields": [{"position": [200, 40]}, {"position": [200, 260]}]
+    },
+    "photo_frame": {
+        "name": "Photo Frame",
+        "description": "User photo with a caption",
+        "type": "image_text",
+        "background": "frame.png",
+        "era": "2020s",
+        "text_fields": [{"position": [200, 260]}],
+        "image_fields": [{"position": [50, 50], "width": 300, "height": 180}]
+    },
+    "broken": {"name": "Broken", "type": "no_such_type", "background": "card.png"}
+}
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    templates_dir = tmp_path / "static" / "images" / "templates"
+    templates_dir.mkdir(parents=True)
+    for background in ("card.png", "frame.png"):
+        Image.new("RGB", (400, 300), "navy").save(templates_dir / background)
+    (tmp_path / "data").mkdir()
+    path = tmp_path / "data" / "meme_templates.json"
+    path.write_text(json.dumps(TEMPLATES))
+
+    monkeypatch.setenv("MEME_TEMPLATES_PATH", str(path))
+    # Output URLs are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return MemeGenerator()
+
+
+def test_invalid_templates_are_not_listed(generator):
+    assert sorted(generator.templates) == ["caption_card", "photo_frame"]
+
+
+def test_templates_are_filtered(generator):
+    assert [t["id"] for t in generator.list_templates(era="2010s")] == ["caption_card"]
+    assert [t["id"] for t in generator.list_templates(template_type="image_text")] == ["photo_frame"]
+    assert [t["id"] for t in generator.list_templates(query="phot")] == ["photo_frame"]
+    assert generator.list_templates(query="missing") == []
+
+
+def test_text_meme_is_rendered_and_cached(generator):
+    url = generator.generate("caption_card", text="top|bottom", output_format="webp")
+
+    assert url.startswith("/static/images/memes/") and url.endswith(".webp")
+    with Image.open(url.lstrip("/")) as meme:
+        assert meme.size == (400, 300)
+    assert generator.generate("caption_card", text="top|bottom", output_format="webp") == url
+    assert generator.generate("caption_card", text="other", output_format="webp") != url
+
+
+def test_image_template_needs_an_image(generator, tmp_path):
+    assert generator.generate("photo_frame", text="hi") == "Image required for this template"
+
+    photo = tmp_path / "photo.jpg"
+    Image.new("RGB", (640, 480), "orange").save(photo)
+    url = generator.generate("photo_frame", image=str(photo), text="hi", output_format="webp")
+    assert os.path.isfile(url.lstrip("/"))
+
+
+def test_unknown_template(generator):
+    assert generator.generate("nope", text="hi") == "Template not found"
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from utils.phash_index import PerceptualHashIndex, dhash, hamming_distance, split_hash
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PerceptualHashIndex("test", path=str(tmp_path / "phash.sqlite3"))
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def test_split_hash_round_trips():
+    value = 0x0123456789ABCDEF
+    assert split_hash(value) == (0x0123, 0x4567, 0x89AB, 0xCDEF)
+
+
+def test_recall_matches_brute_force(index):
+    rng = random.Random(7)
+    stored = [rng.getrandbits(64) for _ in range(2000)]
+    for value in stored:
+        index.add(value, value)
+
+    queries = [flip_bits(rng.choice(stored), rng.randint(0, 5), rng) for _ in range(300)]
+    queries += [rng.getrandbits(64) for _ in range(50)]
+    for query in queries:
+        nearest = min(hamming_distance(query, value) for value in stored)
+        found = index.lookup(query)
+        if nearest <= index.max_distance:
+            assert found is not None
+            assert hamming_distance(query, found) == nearest
+        else:
+            assert found is None
+
+
+def test_namespaces_are_separate(tmp_path):
+    path = str(tmp_path / "phash.sqlite3")
+    first = PerceptualHashIndex("first", path=path)
+    second = PerceptualHashIndex("second", path=path)
+    first.add(42, {"caption": "hi"})
+
+    assert first.lookup(42) == {"caption": "hi"}
+    assert second.lookup(42) is None
+    assert second.stats()["misses"] == 1
+
+
+def test_max_distance_must_keep_recall_exact(tmp_path):
+    with pytest.raises(ValueError):
+        PerceptualHashIndex("test", path=str(tmp_path / "phash.sqlite3"), max_distance=4)
+
+
+def test_dhash_is_stable_under_resizing():
+    img = Image.new("RGB", (320, 240), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((40, 30, 200, 180), fill="black")
+    draw.ellipse((150, 60, 300, 220), fill="gray")
+
+    assert hamming_distance(dhash(img), dhash(img.resize((160, 120)))) <= 3
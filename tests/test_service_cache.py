@@ -0,0 +1,164 @@
+import time
+import threading
+
+from utils.service_cache import MemoryBackend, SQLiteBackend, ServiceCache
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_concurrent_misses_share_one_call():
+    cache = ServiceCache("test", ttl=60, backend=MemoryBackend())
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: cache.coalesced == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["value"] * 5
+    assert cache.get_or_compute("key", compute) == "value"
+    assert cache.stats()["hits"] == 1
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = ServiceCache("test", ttl=60, backend=MemoryBackend())
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_compute("key", compute)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: cache.coalesced == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["upstream down"] * 3
+    assert cache.backend.get("key") is None
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    backend = MemoryBackend()
+    cache = ServiceCache("test", ttl=60, stale_ttl=60, backend=backend)
+    backend.set("key", {"value": "old", "stored_at": time.time() - 90})
+
+    assert cache.get_or_compute("key", lambda: "new") == "old"
+    assert cache.stale_hits == 1
+    wait_until(lambda: backend.get("key")["value"] == "new")
+    assert cache.get_or_compute("key", lambda: "newer") == "new"
+
+
+def test_expired_value_is_recomputed():
+    backend = MemoryBackend()
+    cache = ServiceCache("test", ttl=60, stale_ttl=60, backend=backend)
+    backend.set("key", {"value": "old", "stored_at": time.time() - 200})
+
+    assert cache.get_or_compute("key", lambda: "new") == "new"
+    assert cache.misses == 1
+    assert cache.peek("key") == "new"
+
+
+def test_invalid_entries_are_dropped():
+    cache = ServiceCache("test", ttl=60, backend=MemoryBackend())
+    cache.store("key", "/static/missing.png")
+
+    assert cache.get_or_compute("key", lambda: "fresh", valid=lambda value: value == "fresh") == "fresh"
+
+
+def test_sweep_drops_entries_past_the_stale_window():
+    backend = MemoryBackend()
+    cache = ServiceCache("test", ttl=60, stale_ttl=60, backend=backend)
+    backend.set("stale", {"value": 1, "stored_at": time.time() - 90})
+    backend.set("expired", {"value": 2, "stored_at": time.time() - 200})
+    backend.acquire_lease("leased", ttl=-1)
+
+    cache._last_prune = 0
+    cache.store("new", 3)
+
+    assert backend.get("expired") is None
+    assert backend.get("stale")["value"] == 1
+    assert backend.get("new")["value"] == 3
+    assert backend.acquire_lease("leased", ttl=60)
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", {"value": 1, "stored_at": 0})
+    backend.set("b", {"value": 2, "stored_at": 0})
+    backend.get("a")
+    backend.set("c", {"value": 3, "stored_at": 0})
+
+    assert backend.get("b") is None
+    assert backend.get("a") is not None and backend.get("c") is not None
+
+
+def test_shared_backend_lease_makes_other_caches_wait(tmp_path):
+    # Two caches stand in for two worker processes sharing one database
+    path = str(tmp_path / "cache.sqlite3")
+    leader = ServiceCache("test", ttl=60, backend=SQLiteBackend("test", path=path))
+    follower = ServiceCache("test", ttl=60, backend=SQLiteBackend("test", path=path))
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    thread = threading.Thread(target=leader.get_or_compute, args=("key", compute))
+    thread.start()
+    started.wait(5)
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(follower.get_or_compute("key", compute)))
+    waiter.start()
+    time.sleep(0.1)
+    release.set()
+    thread.join()
+    waiter.join()
+
+    assert calls == [1]
+    assert result == ["value"]
+    assert follower.shared_waits == 1
+
+
+def test_sqlite_prune_only_touches_its_namespace(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = SQLiteBackend("first", path=path)
+    second = SQLiteBackend("second", path=path)
+    first.set("key", {"value": 1, "stored_at": 10})
+    second.set("key", {"value": 2, "stored_at": 10})
+
+    first.prune(older_than=100)
+
+    assert first.get("key") is None
+    assert second.get("key")["value"] == 2
@@ -0,0 +1,65 @@
+from services.structured_response import StructuredResponseParser
+
+SCHEMA = {
+    "translated": (str, ""),
+    "tags": (list, [])
+}
+
+
+def test_json_in_a_code_fence():
+    parser = StructuredResponseParser(SCHEMA)
+    result = parser.parse('```json\n{"translated": "hello", "tags": ["a", "b"]}\n```')
+
+    assert result == {"translated": "hello", "tags": ["a", "b"]}
+    assert parser.last_stats["path"] == "json"
+
+
+def test_malformed_json_is_repaired():
+    parser = StructuredResponseParser(SCHEMA)
+    result = parser.parse("{translated: 'hi there', tags: ['a', \"b\"],}")
+
+    assert result == {"translated": "hi there", "tags": ["a", "b"]}
+    assert parser.last_stats["path"] == "fallback"
+    assert parser.stats()["fallbacks"] == 1
+
+
+def test_bullet_lists_are_collected():
+    parser = StructuredResponseParser(SCHEMA)
+    result = parser.parse("translated: hello\ntags:\n- one\n- two\nnot a bullet")
+
+    assert result == {"translated": "hello", "tags": ["one", "two"]}
+
+
+def test_unusable_output_falls_back_to_defaults():
+    parser = StructuredResponseParser(SCHEMA)
+    result = parser.parse("Sorry, I can't help with that.")
+
+    assert result == {"translated": "", "tags": []}
+    assert result["tags"] is not SCHEMA["tags"][1]
+    assert parser.last_stats["path"] == "failed"
+    assert parser.stats()["failure_rate"] == 1.0
+
+
+def test_values_are_coerced_to_the_schema():
+    parser = StructuredResponseParser(SCHEMA)
+    assert parser.parse('{"translated": 5, "tags": "solo"}') == {"translated": "5", "tags": ["solo"]}
+    assert parser.parse('{"translated": {"nested": 1}, "tags": [1, 2]}') == {"translated": "", "tags": ["1", "2"]}
+
+
+def test_stats_accumulate():
+    parser = StructuredResponseParser(SCHEMA)
+    parser.parse('{"translated": "a"}')
+    parser.parse("translated: b")
+    parser.parse("")
+
+    stats = parser.stats()
+    assert (stats["calls"], stats["fallbacks"], stats["failures"]) == (3, 2, 1)
+    assert stats["failure_rate"] == round(1 / 3, 4)
+
+
+def test_response_schema_lists_every_field():
+    schema = StructuredResponseParser(SCHEMA).response_schema()
+
+    assert schema["required"] == ["translated", "tags"]
+    assert schema["properties"]["tags"]["type"] == "array"
+    assert schema["properties"]["translated"]["type"] == "string"
@@ -1,5 +1,75 @@
-packaging==24.1
-pillow==10.4.0
-python-dotenv==1.0.1
-requests==2.32.3
-urllib3==2.2.3
+from types import SimpleNamespace
+
+import pytest
+
+from models.text_model import TextTranslator
+
+
+class FakeModel:
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        return SimpleNamespace(text=self.replies.pop(0))
+
+
+class FakeCringeMeter:
+    def quick_rate(self, content, era):
+        return 4
+
+
+@pytest.fixture
+def translator(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_GEMINI_API_KEY", raising=False)
+    return TextTranslator()
+
+
+def with_model(translator, *replies):
+    translator.model = FakeModel(*replies)
+    translator.api_available = True
+    return translator
+
+
+def test_without_a_key_translation_is_mocked(translator):
+    assert translator.api_available is False
+    assert translator.translate("hello friend", "2010s") == translator._mock_translation("hello friend", "2010s")
+
+
+def test_unknown_era(translator):
+    assert translator.translate("hi", "1850s").startswith("Era 1850s not supported")
+    assert translator.translate_and_rate("hi", "1850s", FakeCringeMeter())["source"] == "error"
+
+
+def test_translate_and_rate_uses_the_model_reply(translator):
+    with_model(translator, '{"translated": " yolo, friend ", "cringe_score": "12"}')
+    result = translator.translate_and_rate("hello friend", "2010s", FakeCringeMeter())
+
+    assert result == {"translated": "yolo, friend", "cringe_score": 10, "source": "model"}
+
+
+def test_malformed_reply_is_repaired(translator):
+    with_model(translator, "translated: 'sup fam'\ncringe_score: 7")
+    result = translator.translate_and_rate("hello friend", "2020s", FakeCringeMeter())
+
+    assert result == {"translated": "sup fam", "cringe_score": 7, "source": "model"}
+    assert translator.translate_and_rate_parser.stats()["fallbacks"] == 1
+
+
+def test_missing_score_is_rated_locally(translator):
+    with_model(translator, '{"translated": "sup fam", "cringe_score": "very"}')
+    result = translator.translate_and_rate("hello friend", "2020s", FakeCringeMeter())
+
+    assert result["cringe_score"] == 4
+    assert result["source"] == "model"
+
+
+def test_empty_reply_falls_back_to_mock(translator):
+    with_model(translator, "")
+    result = translator.translate_and_rate("hello friend", "2010s", FakeCringeMeter())
+
+    assert result["source"] == "mock"
+    assert result["translated"] == translator._mock_translation("hello friend", "2010s")
+    assert result["cringe_score"] == 4
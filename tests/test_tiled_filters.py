@@ -0,0 +1,67 @@
+import random
+
+import pytest
+from PIL import Image, ImageChops, ImageEnhance
+
+from utils import tiled_filters
+
+# Wide enough that the default strip size splits it into several strips
+SIZE = (2400, 2000)
+
+
+@pytest.fixture(scope="module", params=["RGB", "RGBA", "L"])
+def noise(request):
+    mode = request.param
+    rng = random.Random(mode)
+    bands = len(mode)
+    return Image.frombytes(mode, SIZE, rng.randbytes(SIZE[0] * SIZE[1] * bands))
+
+
+def max_difference(a, b):
+    assert a.mode == b.mode and a.size == b.size
+    extrema = ImageChops.difference(a, b).getextrema()
+    if len(a.getbands()) == 1:
+        extrema = [extrema]
+    return max(high for _, high in extrema)
+
+
+def test_image_is_split_into_strips(noise):
+    strips = []
+    tiled_filters.process_in_strips(noise.copy(), lambda strip: strips.append(strip.size) or strip)
+    assert len(strips) > 1
+
+
+def test_pixelate_matches_full_image(noise):
+    block = tiled_filters.PIXEL_BLOCK
+    full = noise.resize((SIZE[0] // block, SIZE[1] // block), resample=Image.NEAREST)
+    full = full.resize(SIZE, resample=Image.NEAREST)
+
+    assert max_difference(tiled_filters.pixelate(noise.copy()), full) == 0
+
+
+def test_sharpen_saturate_matches_full_image(noise):
+    full = ImageEnhance.Color(ImageEnhance.Sharpness(noise).enhance(2.0)).enhance(1.5)
+    assert max_difference(tiled_filters.sharpen_saturate(noise.copy()), full) == 0
+
+
+def test_contrast_sharpen_matches_full_image(noise):
+    full = ImageEnhance.Sharpness(ImageEnhance.Contrast(noise).enhance(1.2)).enhance(1.1)
+    assert max_difference(tiled_filters.contrast_sharpen(noise.copy()), full) == 0
+
+
+def test_sepia_matches_full_image(noise):
+    if noise.mode != "RGB":
+        pytest.skip("sepia runs on RGB images")
+    full = noise.convert("RGB", tiled_filters.SEPIA_MATRIX)
+    assert max_difference(tiled_filters.sepia(noise.copy()), full) == 0
+
+
+def test_strip_overlap_handles_odd_sizes():
+    rng = random.Random(3)
+    img = Image.frombytes("RGB", (37, 53), rng.randbytes(37 * 53 * 3))
+    full = ImageEnhance.Sharpness(img).enhance(2.0)
+
+    tiled = tiled_filters.process_in_strips(
+        img.copy(), lambda strip: ImageEnhance.Sharpness(strip).enhance(2.0), overlap=1, tile_bytes=37 * 3 * 4
+    )
+    assert max_difference(tiled, full) == 0
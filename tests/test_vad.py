@@ -0,0 +1,60 @@
+from utils.vad import detect_speech_segments, FRAME_MS
+from tests.conftest import SAMPLE_RATE
+
+FRAME = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def seconds(samples):
+    return samples / SAMPLE_RATE
+
+
+def test_silence_has_no_segments(pcm):
+    assert detect_speech_segments(pcm((3, 0)), SAMPLE_RATE) == []
+    assert detect_speech_segments(b"", SAMPLE_RATE) == []
+
+
+def test_cut_in_the_middle_of_a_pause(pcm):
+    audio = pcm((1, 8000), (1, 0), (1, 8000))
+    segments = detect_speech_segments(audio, SAMPLE_RATE, target_seconds=1)
+
+    assert len(segments) == 2
+    (first_start, first_end), (second_start, second_end) = segments
+    assert first_start == 0
+    assert first_end == second_start
+    assert abs(seconds(first_end) - 1.5) <= FRAME_MS / 1000
+    assert second_end == len(audio) // 2
+
+
+def test_short_pause_is_not_a_boundary(pcm):
+    audio = pcm((1, 8000), (0.1, 0), (1, 8000))
+    assert len(detect_speech_segments(audio, SAMPLE_RATE, target_seconds=1)) == 1
+
+
+def test_pieces_merge_up_to_the_target(pcm):
+    audio = pcm((1, 8000), (1, 0), (1, 8000), (1, 0), (1, 8000))
+    assert len(detect_speech_segments(audio, SAMPLE_RATE, target_seconds=1)) == 3
+    assert len(detect_speech_segments(audio, SAMPLE_RATE, target_seconds=15)) == 1
+
+
+def test_long_speech_splits_at_its_quietest_frames(pcm):
+    # A dip too short to count as a pause sits in the back half of the window
+    audio = pcm((8, 8000), (0.1, 1000), (6, 8000))
+    segments = detect_speech_segments(audio, SAMPLE_RATE, max_seconds=10)
+
+    assert len(segments) == 2
+    assert segments[0][1] == segments[1][0]
+    assert abs(seconds(segments[0][1]) - 8.05) <= 0.05 + FRAME_MS / 1000
+    assert segments[-1][1] == len(audio) // 2
+    for start, end in segments:
+        assert seconds(end - start) <= 10
+
+
+def test_every_segment_fits_the_maximum(pcm):
+    audio = pcm((23, 8000))
+    segments = detect_speech_segments(audio, SAMPLE_RATE, max_seconds=5)
+
+    assert segments[0][0] == 0 and segments[-1][1] == len(audio) // 2
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert end == start
+    for start, end in segments:
+        assert seconds(end - start) <= 5
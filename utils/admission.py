@@ -0,0 +1,192 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Client buckets remembered per route; a full bucket is the same as a new one
+MAX_CLIENT_BUCKETS = 10000
+
+# Weight of the newest request in the service time average
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class AdmissionRejected(Exception):
+    """A request turned away; status is 429 for client limits, 503 for overload"""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now):
+        """Take a token; returns 0 on success, else seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RouteLimit:
+    """
+    Admission limits for one route.
+    client_rate/client_burst: token bucket per client address.
+    route_rate/route_burst: one bucket for the route, e.g. an upstream quota.
+    concurrency: requests running at once; queue_depth: requests waiting.
+    max_wait: how long a queued request may wait before it is shed.
+    """
+
+    def __init__(self, client_rate=None, client_burst=None, route_rate=None, route_burst=None,
+                 concurrency=None, queue_depth=0, max_wait=10.0):
+        self.client_rate = client_rate
+        self.client_burst = client_burst or max(1, client_rate or 1)
+        self.route_rate = route_rate
+        self.route_burst = route_burst or max(1, route_rate or 1)
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.max_wait = max_wait
+
+
+class RouteState:
+    def __init__(self, limit):
+        self.limit = limit
+        self.route_bucket = TokenBucket(limit.route_rate, limit.route_burst) if limit.route_rate else None
+        self.client_buckets = OrderedDict()
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.service_time = None
+        self.admitted = 0
+        self.rejected_client = 0
+        self.rejected_route = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self.timed_out = 0
+
+
+class AdmissionController:
+    """
+    Decides whether a request runs now, waits briefly or is turned away,
+    before any work is done for it. Over-limit clients get 429; when the
+    route is saturated the request is shed with 503 as soon as its expected
+    queue wait passes its deadline, rather than after waiting it out.
+    """
+
+    def __init__(self, limits):
+        self.routes = {name: RouteState(limit) for name, limit in limits.items()}
+
+    def acquire(self, route, client, timeout=None):
+        """
+        Admit a request, waiting in the route's queue if needed. Returns a
+        ticket for release(), or None for routes without limits. Raises
+        AdmissionRejected when the request should not run.
+        """
+        state = self.routes.get(route)
+        if state is None:
+            return None
+        limit = state.limit
+        now = time.monotonic()
+        deadline = now + (min(timeout, limit.max_wait) if timeout else limit.max_wait)
+
+        with state.condition:
+            if limit.client_rate:
+                bucket = state.client_buckets.get(client)
+                if bucket is None:
+                    bucket = TokenBucket(limit.client_rate, limit.client_burst)
+                    state.client_buckets[client] = bucket
+                    if len(state.client_buckets) > MAX_CLIENT_BUCKETS:
+                        state.client_buckets.popitem(last=False)
+                else:
+                    state.client_buckets.move_to_end(client)
+                wait = bucket.take(now)
+                if wait:
+                    state.rejected_client += 1
+                    raise AdmissionRejected(429, "Too many requests", wait)
+
+            if state.route_bucket is not None:
+                wait = state.route_bucket.take(now)
+                if wait:
+                    state.rejected_route += 1
+                    raise AdmissionRejected(503, "Service at capacity", wait)
+
+            if limit.concurrency and state.active >= limit.concurrency:
+                self._wait_for_slot(state, now, deadline)
+
+            state.active += 1
+            state.admitted += 1
+        return (state, time.monotonic())
+
+    def release(self, ticket):
+        """Free the ticket's slot and record how long the request ran"""
+        if ticket is None:
+            return
+        state, started = ticket
+        elapsed = time.monotonic() - started
+        with state.condition:
+            state.active -= 1
+            if state.service_time is None:
+                state.service_time = elapsed
+            else:
+                state.service_time += SERVICE_TIME_SMOOTHING * (elapsed - state.service_time)
+            state.condition.notify()
+
+    def stats(self):
+        """Queue depth, load and rejection counts per route"""
+        report = {}
+        for name, state in self.routes.items():
+            with state.condition:
+                report[name] = {
+                    "active": state.active,
+                    "waiting": state.waiting,
+                    "concurrency": state.limit.concurrency,
+                    "queue_depth": state.limit.queue_depth,
+                    "admitted": state.admitted,
+                    "rejected_client": state.rejected_client,
+                    "rejected_route": state.rejected_route,
+                    "shed_queue_full": state.shed_queue_full,
+                    "shed_deadline": state.shed_deadline,
+                    "timed_out": state.timed_out,
+                    "service_ms": round(state.service_time * 1000, 1) if state.service_time is not None else None
+                }
+        return report
+
+    def _expected_wait(self, state):
+        """Queue wait for a new arrival, from the average service time"""
+        if state.service_time is None:
+            return 0.0
+        return (state.waiting + 1) * state.service_time / state.limit.concurrency
+
+    def _wait_for_slot(self, state, now, deadline):
+        """Queue for a slot; called holding state.condition"""
+        expected = self._expected_wait(state)
+        if state.waiting >= state.limit.queue_depth:
+            state.shed_queue_full += 1
+            raise AdmissionRejected(503, "Server busy, try again shortly", max(1.0, expected))
+        if now + expected > deadline:
+            # It would time out in the queue anyway; fail fast instead
+            state.shed_deadline += 1
+            raise AdmissionRejected(503, "Server busy, try again shortly", expected)
+
+        state.waiting += 1
+        try:
+            while state.active >= state.limit.concurrency:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    state.timed_out += 1
+                    # Pass on a wakeup this thread may have consumed
+                    state.condition.notify()
+                    raise AdmissionRejected(503, "Server busy, try again shortly", max(1.0, self._expected_wait(state)))
+                state.condition.wait(remaining)
+        finally:
+            state.waiting -= 1
@@ -0,0 +1,135 @@
+import io
+import wave
+import struct
+import hashlib
+
+CANONICAL_SAMPLE_RATE = 16000
+HEADER_BYTES = 4096
+
+# WAVE fmt chunk format tags
+WAV_CODECS = {1: "pcm", 3: "float", 6: "alaw", 7: "mulaw", 0xFFFE: "extensible"}
+
+
+class CanonicalAudio:
+    """Decoded 16-bit little-endian mono PCM shared by every audio consumer"""
+
+    def __init__(self, pcm, sample_rate, source_format, source_codec, source_digest):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.source_format = source_format
+        self.source_codec = source_codec
+        self.source_digest = source_digest
+
+    @property
+    def duration(self):
+        return len(self.pcm) / 2 / self.sample_rate
+
+
+def sniff_audio_format(header):
+    """Identify (container, codec) from the first bytes of a file"""
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav", _wav_codec(header)
+    if header[:4] == b"fLaC":
+        return "flac", "flac"
+    if header[:4] == b"OggS":
+        if b"OpusHead" in header:
+            return "ogg", "opus"
+        if b"\x01vorbis" in header:
+            return "ogg", "vorbis"
+        if b"FLAC" in header:
+            return "ogg", "flac"
+        return "ogg", None
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        # Browsers' MediaRecorder produces WebM/Matroska, usually with Opus
+        if b"A_OPUS" in header:
+            return "webm", "opus"
+        if b"A_VORBIS" in header:
+            return "webm", "vorbis"
+        return "webm", None
+    if header[4:8] == b"ftyp":
+        return "mp4", "aac"
+    if header[:4] == b"FORM" and header[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff", "pcm"
+    if header[:5] == b"#!AMR":
+        return "amr", "amr"
+    if header[:3] == b"ID3":
+        return "mp3", "mp3"
+    if len(header) >= 2 and header[0] == 0xFF:
+        if header[1] & 0xF6 == 0xF0:
+            return "aac", "aac"
+        if header[1] & 0xE0 == 0xE0 and header[1] & 0x06:
+            return "mp3", "mp3"
+    return None, None
+
+
+def _wav_codec(header):
+    """Read the format tag and bit depth from the WAVE fmt chunk"""
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack("<I", header[offset + 4:offset + 8])[0]
+        if chunk_id == b"fmt " and offset + 24 <= len(header):
+            format_tag = struct.unpack("<H", header[offset + 8:offset + 10])[0]
+            bits = struct.unpack("<H", header[offset + 22:offset + 24])[0]
+            codec = WAV_CODECS.get(format_tag, f"0x{format_tag:04x}")
+            return f"{codec}_{bits}" if codec == "pcm" else codec
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def ingest_audio(audio_file, sample_rate=CANONICAL_SAMPLE_RATE):
+    """
+    Sniff an upload and decode it once into canonical mono PCM.
+    Unknown or undecodable formats raise ValueError before anything is sent
+    upstream; OSError means the decoder (ffmpeg) itself is unavailable.
+    Already ingested audio is returned unchanged.
+    """
+    if isinstance(audio_file, CanonicalAudio):
+        return audio_file
+
+    if isinstance(audio_file, (bytes, bytearray)):
+        data = bytes(audio_file)
+    elif isinstance(audio_file, str):
+        with open(audio_file, "rb") as f:
+            data = f.read()
+    else:
+        data = audio_file.read()
+        if hasattr(audio_file, "seek"):
+            audio_file.seek(0)
+
+    container, codec = sniff_audio_format(data[:HEADER_BYTES])
+    if container is None:
+        raise ValueError("Unsupported audio format")
+
+    digest = hashlib.sha256(data).hexdigest()
+
+    # PCM WAV needs no ffmpeg round trip; everything else is decoded once by pydub
+    if container == "wav" and codec == "pcm_16":
+        try:
+            pcm, source_rate, channels = _read_wav(data)
+        except (wave.Error, EOFError, RuntimeError, struct.error) as e:
+            # wave raises RuntimeError when a chunk runs past the end
+            raise ValueError(f"Could not decode {container} audio") from e
+        if channels == 1 and source_rate == sample_rate:
+            return CanonicalAudio(pcm, sample_rate, container, codec, digest)
+        segment = _pcm_segment(pcm, source_rate, channels)
+    else:
+        from pydub import AudioSegment
+        from pydub.exceptions import CouldntDecodeError
+        try:
+            segment = AudioSegment.from_file(io.BytesIO(data), format=container)
+        except CouldntDecodeError as e:
+            raise ValueError(f"Could not decode {container} audio") from e
+
+    segment = segment.set_channels(1).set_frame_rate(sample_rate).set_sample_width(2)
+    return CanonicalAudio(segment.raw_data, sample_rate, container, codec, digest)
+
+
+def _read_wav(data):
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        return wav.readframes(wav.getnframes()), wav.getframerate(), wav.getnchannels()
+
+
+def _pcm_segment(pcm, sample_rate, channels):
+    from pydub import AudioSegment
+    return AudioSegment(data=pcm, sample_width=2, frame_rate=sample_rate, channels=channels)
@@ -1,17 +1,22 @@
 import os
 import re
-import json
 import openai
 from dotenv import load_dotenv
+from utils.service_cache import ServiceCache, make_key
+from utils.data_store import slang_dictionary, slang_terms
+
+# AI ratings for a given text and era are shared by every worker for a month
+RATING_CACHE_TTL = 30 * 24 * 3600
 
 class CringeMeter:
     def __init__(self):
         load_dotenv()
         openai.api_key = os.getenv("OPENAI_API_KEY")
         
-        # Load slang dictionary
-        with open('data/slang_dictionary.json', 'r') as f:
-            self.slang_dictionary = json.load(f)
+        # Shared read-only slang dictionary
+        self.slang_dictionary = slang_dictionary()
+        
+        self.cache = ServiceCache("cringe", ttl=RATING_CACHE_TTL)
         
         # Cringe indicators by era
         self.cringe_indicators = {
@@ -44,6 +49,12 @@ class CringeMeter:
                 (r"(sheesh|sksksk|and\s*i\s*oop)", 2)
             ]
         }
+        
+        # Compiled once instead of looked up in the re cache on every call
+        self.cringe_matchers = {
+            era: tuple((re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in indicators)
+            for era, indicators in self.cringe_indicators.items()
+        }
     
     def rate(self, content, era):
         """
@@ -68,6 +79,10 @@ class CringeMeter:
         # Ensure score is between 1-10
         return max(1, min(10, round(final_score)))
     
+    def quick_rate(self, content, era):
+        """Pattern-only 1-10 rating with no AI call, for latency-sensitive paths"""
+        return max(1, min(10, round(self._pattern_rate(content.lower(), era))))
+    
     def _pattern_rate(self, content, era):
         """Rate cringe based on pattern matching"""
         score = 5  # Start with neutral score
@@ -76,16 +91,14 @@ class CringeMeter:
             return score
         
         # Check against regex patterns for specified era
-        for pattern, weight in self.cringe_indicators[era]:
-            matches = re.findall(pattern, content, re.IGNORECASE)
+        for matcher, weight in self.cringe_matchers[era]:
+            matches = matcher.findall(content)
             score += len(matches) * weight * 0.5
         
         # Check slang usage
-        if era in self.slang_dictionary:
-            era_slang = self.slang_dictionary[era]
-            for slang in era_slang:
-                if slang.lower() in content:
-                    score += 0.5
+        for slang in slang_terms(era):
+            if slang in content:
+                score += 0.5
         
         # Look for over-usage indicators
         exclamation_count = content.count('!')
@@ -106,45 +119,47 @@ class CringeMeter:
     def _ai_rate(self, content, era):
         """Use AI to rate cringe factor"""
         try:
-            era_descriptions = {
-                "1990s": "early internet slang, 'leet speak', dial-up references, ASCII art",
-                "2000s": "MySpace emo culture, random XD, excessive emoticons, early memes",
-                "2010s": "YOLO, hashtag overuse, 'epic' everything, Keep Calm memes",
-                "2020s": "TikTok slang, 'no cap', 'sus', stan culture language"
-            }
-            
-            prompt = f"""
-            Rate how authentically "cringey" this content is for {era} internet culture.
-            Example {era} internet culture includes: {era_descriptions.get(era, "")}
-            
-            Content: "{content}"
-            
-            Provide a rating from 1-10 where:
-            1 = not cringey at all for the era
-            5 = moderately cringey
-            10 = extremely, authentically cringey for {era}
-            
-            Only respond with a number from 1-10.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an internet culture historian specializing in cringe culture."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=10
-            )
-            
-            result = response.choices[0].message.content.strip()
-            
-            # Extract just the number
-            match = re.search(r'(\d+)', result)
-            if match:
-                return int(match.group(1))
-            else:
-                return 0
-                
+            return self.cache.get_or_compute(make_key(content, era), lambda: self._ask_rating(content, era))
         except Exception as e:
             print(f"AI cringe rating error: {str(e)}")
             return 0  # Return 0 to indicate AI rating failed
+    
+    def _ask_rating(self, content, era):
+        """Ask the model for a rating; errors propagate so they aren't cached"""
+        era_descriptions = {
+            "1990s": "early internet slang, 'leet speak', dial-up references, ASCII art",
+            "2000s": "MySpace emo culture, random XD, excessive emoticons, early memes",
+            "2010s": "YOLO, hashtag overuse, 'epic' everything, Keep Calm memes",
+            "2020s": "TikTok slang, 'no cap', 'sus', stan culture language"
+        }
+        
+        prompt = f"""
+        Rate how authentically "cringey" this content is for {era} internet culture.
+        Example {era} internet culture includes: {era_descriptions.get(era, "")}
+        
+        Content: "{content}"
+        
+        Provide a rating from 1-10 where:
+        1 = not cringey at all for the era
+        5 = moderately cringey
+        10 = extremely, authentically cringey for {era}
+        
+        Only respond with a number from 1-10.
+        """
+        
+        response = openai.ChatCompletion.create(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": "You are an internet culture historian specializing in cringe culture."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=10
+        )
+        
+        result = response.choices[0].message.content.strip()
+        
+        # Extract just the number
+        match = re.search(r'(\d+)', result)
+        if match:
+            return int(match.group(1))
+        raise ValueError(f"No rating in response: {result}")
@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import threading
+from types import MappingProxyType
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SLANG_PATH = os.path.join(ROOT_DIR, "data", "slang_dictionary.json")
+
+# Used when data/slang_dictionary.json is missing
+DEFAULT_SLANG = {
+    "1990s": {"lol": "laugh out loud", "asl": "age/sex/location"},
+    "2000s": {"rofl": "rolling on floor laughing", "brb": "be right back"},
+    "2010s": {"yolo": "you only live once", "swag": "style"},
+    "2020s": {"no cap": "no lie", "fr": "for real"}
+}
+
+_lock = threading.Lock()
+_slang = None
+_slang_terms = None
+_registries = {}
+
+
+def _intern_pairs(pairs):
+    """json object hook: interned keys and string values"""
+    return {
+        sys.intern(key): sys.intern(value) if isinstance(value, str) else value
+        for key, value in pairs
+    }
+
+
+def load_json(path):
+    """Parse a JSON file with every object key and string value interned"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f, object_pairs_hook=_intern_pairs)
+
+
+def freeze(value):
+    """Read-only copy: dicts become mappingproxies and lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def slang_dictionary():
+    """
+    The slang dictionary as read-only era -> {term: meaning} mappings.
+    Parsed once per process; loaded before fork it stays in shared pages.
+    """
+    global _slang, _slang_terms
+    if _slang is None:
+        with _lock:
+            if _slang is None:
+                path = os.environ.get("SLANG_DICTIONARY_PATH", SLANG_PATH)
+                try:
+                    data = load_json(path)
+                except FileNotFoundError:
+                    print("Warning: slang_dictionary.json not found. Using default dictionary.")
+                    data = DEFAULT_SLANG
+                _slang_terms = MappingProxyType({
+                    sys.intern(era): tuple(sys.intern(term.lower()) for term in terms)
+                    for era, terms in data.items()
+                })
+                _slang = freeze(data)
+    return _slang
+
+
+def slang_terms(era):
+    """Lowercased slang terms for an era, ready for substring matching"""
+    slang_dictionary()
+    return _slang_terms.get(era, ())
+
+
+def template_registry(path=None):
+    """The process-wide template registry for a templates file"""
+    from models.template_registry import TemplateRegistry
+
+    key = path or os.environ.get("MEME_TEMPLATES_PATH", "")
+    registry = _registries.get(key)
+    if registry is None:
+        with _lock:
+            registry = _registries.get(key)
+            if registry is None:
+                registry = TemplateRegistry(path)
+                _registries[key] = registry
+    return registry
+
+
+def preload():
+    """Load all shared data now, e.g. in the gunicorn master before workers fork"""
+    slang_dictionary()
+    template_registry()
+
+
+def memory_report():
+    """
+    Memory of this process in KB from /proc/self/smaps_rollup. Pages still
+    shared with the master after fork show up as Shared_*, and Pss splits
+    them between the processes using them.
+    """
+    fields = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+    report = {"pid": os.getpid()}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    report[name.lower()] = int(value.split()[0])
+    except OSError:
+        import resource
+        # Peak RSS only; ru_maxrss is KB on Linux
+        report["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
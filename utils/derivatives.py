@@ -0,0 +1,133 @@
+import os
+import threading
+from PIL import Image
+from utils.image_encoding import ENCODING_PROFILES, encode_image
+
+# Only these widths are ever generated, so the cache can't be filled with arbitrary sizes
+DERIVATIVE_WIDTHS = (160, 320, 640, 1280)
+
+# Output folders that derivatives can be made from, by URL kind
+SOURCE_DIRS = {
+    "memes": "static/images/memes",
+    "output": "static/images/output"
+}
+
+DERIVATIVES_DIR = "static/images/derivatives"
+
+# Derivatives keep the original's format
+EXTENSION_PROFILES = {
+    profile["extension"]: name for name, profile in ENCODING_PROFILES.items()
+}
+
+
+class DerivativeStore:
+    """
+    Downscaled copies of generated images, made on first request.
+    The first miss for an image decodes it once and writes every smaller
+    whitelisted width in a cascade, each resized from the previous one.
+    """
+
+    def __init__(self, source_dirs=None, derivatives_dir=DERIVATIVES_DIR, widths=DERIVATIVE_WIDTHS):
+        self.source_dirs = source_dirs or SOURCE_DIRS
+        self.derivatives_dir = derivatives_dir
+        self.widths = tuple(sorted(widths))
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def source_path(self, kind, filename):
+        """Path of an original, or None if the kind or filename is not allowed"""
+        source_dir = self.source_dirs.get(kind)
+        if source_dir is None or os.path.basename(filename) != filename or filename.startswith("."):
+            return None
+        return os.path.join(source_dir, filename)
+
+    def derivative_path(self, kind, width, filename):
+        return os.path.join(self.derivatives_dir, kind, str(width), filename)
+
+    def thumbnails(self, url):
+        """
+        Map of width to URL for srcset: a resize URL for each width below the
+        original's, plus the original itself. Reads the header, not the pixels.
+        """
+        kind, filename = self._split_url(url)
+        path = self.source_path(kind, filename) if kind else None
+        if path is None or not os.path.exists(path) or not self._extension_profile(filename):
+            return {}
+
+        with Image.open(path) as img:
+            if getattr(img, "n_frames", 1) > 1:
+                # Animations are served whole; a still thumbnail would lose them
+                return {}
+            original_width = img.width
+
+        thumbnails = {
+            width: f"/thumb/{kind}/{width}/{filename}"
+            for width in self.widths if width < original_width
+        }
+        if thumbnails:
+            thumbnails[original_width] = url
+        return thumbnails
+
+    def get(self, kind, width, filename):
+        """Return the derivative's path, creating it (and its siblings) if needed"""
+        if width not in self.widths:
+            return None
+        source = self.source_path(kind, filename)
+        if source is None or not self._extension_profile(filename) or not os.path.exists(source):
+            return None
+
+        path = self.derivative_path(kind, width, filename)
+        if os.path.exists(path):
+            return path
+
+        with self._lock_for(kind, filename):
+            if not os.path.exists(path):
+                self._render_all(kind, filename, source)
+        with self._locks_guard:
+            # Concurrent misses have been served; a late one only redoes atomic writes
+            self._locks.pop((kind, filename), None)
+        return path if os.path.exists(path) else None
+
+    def _render_all(self, kind, filename, source):
+        """Decode the original once and write every missing smaller width"""
+        profile_name = self._extension_profile(filename)
+        with Image.open(source) as img:
+            widths = [width for width in self.widths if width < img.width]
+            if not widths:
+                return
+            if img.format == "JPEG":
+                largest = widths[-1]
+                img.draft(img.mode, (largest, img.height * largest // img.width))
+            current = img.copy()
+
+        # Largest first, so each step resizes the smallest image that still covers it
+        for width in reversed(widths):
+            height = max(1, round(current.height * width / current.width))
+            current = current.resize((width, height), Image.LANCZOS)
+
+            path = self.derivative_path(kind, width, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(encode_image(current, profile_name))
+            os.replace(temp_path, path)
+
+    def _lock_for(self, kind, filename):
+        with self._locks_guard:
+            lock = self._locks.get((kind, filename))
+            if lock is None:
+                lock = self._locks[(kind, filename)] = threading.Lock()
+            return lock
+
+    def _split_url(self, url):
+        """'/static/images/memes/x.jpg' -> ('memes', 'x.jpg')"""
+        if not url:
+            return None, None
+        directory, filename = os.path.split(url.lstrip("/"))
+        for kind, source_dir in self.source_dirs.items():
+            if directory.rstrip("/") == source_dir.rstrip("/"):
+                return kind, filename
+        return None, None
+
+    def _extension_profile(self, filename):
+        return EXTENSION_PROFILES.get(os.path.splitext(filename)[1].lstrip(".").lower())
@@ -1,17 +1,22 @@
 import os
 import re
-import json
 import openai
 from dotenv import load_dotenv
+from utils.service_cache import ServiceCache, make_key
+from utils.data_store import slang_dictionary, slang_terms
+
+# Model verdicts for a given text are reused by every worker for a month
+ERA_CACHE_TTL = 30 * 24 * 3600
 
 class EraDetector:
     def __init__(self):
         load_dotenv()
         openai.api_key = os.getenv("OPENAI_API_KEY")
         
-        # Load slang dictionary for pattern matching
-        with open('data/slang_dictionary.json', 'r') as f:
-            self.slang_dictionary = json.load(f)
+        # Shared read-only slang dictionary for pattern matching
+        self.slang_dictionary = slang_dictionary()
+        
+        self.cache = ServiceCache("era", ttl=ERA_CACHE_TTL)
         
         # Era patterns for basic detection
         self.era_patterns = {
@@ -32,6 +37,12 @@ class EraDetector:
                 r"cheugy", r"yeet", r"bussin", r"based"
             ]
         }
+        
+        # Compiled once instead of looked up in the re cache on every call
+        self.era_matchers = {
+            era: tuple(re.compile(pattern, re.IGNORECASE) for pattern in patterns)
+            for era, patterns in self.era_patterns.items()
+        }
     
     def detect(self, content):
         """
@@ -55,15 +66,15 @@ class EraDetector:
         scores = {"1990s": 0, "2000s": 0, "2010s": 0, "2020s": 0}
         
         # Check against regex patterns
-        for era, patterns in self.era_patterns.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
+        for era, matchers in self.era_matchers.items():
+            for matcher in matchers:
+                matches = matcher.findall(content)
                 scores[era] += len(matches) * 0.2  # Weight for exact matches
         
         # Check slang dictionary
-        for era, slang_dict in self.slang_dictionary.items():
-            for slang, meaning in slang_dict.items():
-                if slang.lower() in content:
+        for era in self.slang_dictionary:
+            for slang in slang_terms(era):
+                if slang in content:
                     scores[era] += 0.1
         
         # Normalize scores
@@ -77,43 +88,46 @@ class EraDetector:
     def _ai_detect(self, content):
         """Use AI to detect era based on content"""
         try:
-            prompt = f"""
-            Analyze the following text and determine which internet era it most likely belongs to:
-            - 1990s (early internet, IRC, dial-up era)
-            - 2000s (MySpace, early YouTube, pre-smartphone era)
-            - 2010s (Facebook peak, Instagram rise, early TikTok)
-            - 2020s (TikTok dominant, modern meme culture)
-            
-            Text to analyze: "{content}"
-            
-            Only respond with the era (1990s, 2000s, 2010s, or 2020s).
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an internet culture historian."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=10
-            )
-            
-            result = response.choices[0].message.content.strip()
-            
-            # Extract just the decade
-            if "1990s" in result:
-                return "1990s"
-            elif "2000s" in result:
-                return "2000s"
-            elif "2010s" in result:
-                return "2010s"
-            elif "2020s" in result:
-                return "2020s"
-            else:
-                # Default to 2020s if unrecognized
-                return "2020s"
-                
+            return self.cache.get_or_compute(make_key(content), lambda: self._ask_era(content))
         except Exception as e:
             print(f"AI detection error: {str(e)}")
             # Fall back to most recent era if there's an error
             return "2020s"
+    
+    def _ask_era(self, content):
+        """Ask the model for the era; errors propagate so they aren't cached"""
+        prompt = f"""
+        Analyze the following text and determine which internet era it most likely belongs to:
+        - 1990s (early internet, IRC, dial-up era)
+        - 2000s (MySpace, early YouTube, pre-smartphone era)
+        - 2010s (Facebook peak, Instagram rise, early TikTok)
+        - 2020s (TikTok dominant, modern meme culture)
+        
+        Text to analyze: "{content}"
+        
+        Only respond with the era (1990s, 2000s, 2010s, or 2020s).
+        """
+        
+        response = openai.ChatCompletion.create(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": "You are an internet culture historian."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=10
+        )
+        
+        result = response.choices[0].message.content.strip()
+        
+        # Extract just the decade
+        if "1990s" in result:
+            return "1990s"
+        elif "2000s" in result:
+            return "2000s"
+        elif "2010s" in result:
+            return "2010s"
+        elif "2020s" in result:
+            return "2020s"
+        else:
+            # Default to 2020s if unrecognized
+            return "2020s"
@@ -0,0 +1,134 @@
+import io
+import os
+import uuid
+from PIL import Image
+
+# Encoder settings per output format
+ENCODING_PROFILES = {
+    "jpeg": {
+        "format": "JPEG",
+        "extension": "jpg",
+        "mime_type": "image/jpeg",
+        "params": {"quality": 85, "progressive": True, "optimize": True, "subsampling": "4:2:0"}
+    },
+    "webp": {
+        "format": "WEBP",
+        "extension": "webp",
+        "mime_type": "image/webp",
+        "params": {"quality": 80, "method": 4}
+    },
+    "avif": {
+        "format": "AVIF",
+        "extension": "avif",
+        "mime_type": "image/avif",
+        "params": {"quality": 60, "speed": 6}
+    }
+}
+
+# Preferred order when the client accepts several formats
+PROFILE_PREFERENCE = ("avif", "webp", "jpeg")
+MIN_QUALITY = 20
+
+
+def _encoder_available(profile_name):
+    """Check whether this Pillow build can write the profile's format"""
+    if profile_name == "avif":
+        try:
+            import pillow_avif  # noqa: F401  Registers AVIF on Pillow < 11.2
+        except ImportError:
+            pass
+    Image.init()
+    return ENCODING_PROFILES[profile_name]["format"] in Image.SAVE
+
+
+AVAILABLE_PROFILES = tuple(name for name in PROFILE_PREFERENCE if _encoder_available(name))
+
+
+def choose_profile(accept_header=None, requested=None):
+    """
+    Pick an encoding profile from an explicit request or the Accept header.
+    Only formats the client names explicitly count; */* falls back to JPEG.
+    """
+    if requested in AVAILABLE_PROFILES:
+        return requested
+
+    accepted = set()
+    for item in (accept_header or "").split(","):
+        parts = item.strip().split(";")
+        mime_type = parts[0].strip().lower()
+        quality = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(mime_type)
+
+    for name in AVAILABLE_PROFILES:
+        if ENCODING_PROFILES[name]["mime_type"] in accepted:
+            return name
+    return "jpeg"
+
+
+def prepare_for_profile(img, profile_name):
+    """Convert modes the encoder can't write, flattening alpha onto white for JPEG"""
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+
+    if profile_name == "jpeg":
+        if has_alpha:
+            rgba = img.convert("RGBA")
+            flattened = Image.new("RGB", rgba.size, (255, 255, 255))
+            flattened.paste(rgba, mask=rgba.getchannel("A"))
+            return flattened
+        return img if img.mode in ("RGB", "L") else img.convert("RGB")
+
+    if has_alpha:
+        return img if img.mode == "RGBA" else img.convert("RGBA")
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+
+def encode_image(img, profile_name="jpeg", max_kb=None):
+    """
+    Encode an image with a profile. With max_kb, binary search the highest
+    quality that fits the size budget (the lowest quality is used if none fit).
+    """
+    profile = ENCODING_PROFILES[profile_name]
+    img = prepare_for_profile(img, profile_name)
+
+    def encode(quality):
+        buffer = io.BytesIO()
+        params = dict(profile["params"], quality=quality)
+        img.save(buffer, format=profile["format"], **params)
+        return buffer.getvalue()
+
+    best_quality = profile["params"]["quality"]
+    data = encode(best_quality)
+    if not max_kb or len(data) <= max_kb * 1024:
+        return data
+
+    low, high = MIN_QUALITY, best_quality - 1
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        candidate = encode(quality)
+        if len(candidate) <= max_kb * 1024:
+            best = candidate
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    return best if best is not None else encode(MIN_QUALITY)
+
+
+def save_image(img, output_dir, accept_header=None, requested=None, max_kb=None):
+    """Encode with the negotiated profile and write it; returns the filename"""
+    profile_name = choose_profile(accept_header, requested)
+    data = encode_image(img, profile_name, max_kb)
+
+    filename = f"{uuid.uuid4()}.{ENCODING_PROFILES[profile_name]['extension']}"
+    with open(os.path.join(output_dir, filename), "wb") as f:
+        f.write(data)
+    return filename
@@ -0,0 +1,128 @@
+from PIL import Image, ImageChops
+
+# Palette analysis runs on a small copy; grid analysis on the prepared image
+PALETTE_SIDE = 128
+PALETTE_COLORS = 10
+MIN_PALETTE_FRACTION = 0.02
+JPEG_BLOCK = 8
+MAX_PIXEL_BLOCK = 16
+
+# A block grid needs at least this many lines across the image
+MIN_GRID_LINES = 3
+
+
+def compute_image_stats(image, scale=1.0):
+    """
+    Compute color and compression statistics for era heuristics.
+    `scale` is the ratio between this image and the original upload; JPEG
+    blockiness is only measured when the 8px grid survived downscaling.
+    """
+    rgb = image.convert("RGB")
+
+    small = rgb.copy()
+    small.thumbnail((PALETTE_SIDE, PALETTE_SIDE), Image.BILINEAR)
+
+    gray = rgb.convert("L")
+    column_profile = _gradient_profile(gray)
+    row_profile = _gradient_profile(gray.transpose(Image.TRANSPOSE))
+
+    blockiness = 0.0
+    if scale == 1.0:
+        blockiness = max(
+            _grid_contrast(column_profile, JPEG_BLOCK),
+            _grid_contrast(row_profile, JPEG_BLOCK)
+        )
+
+    return {
+        "palette": _palette(small),
+        "saturation_histogram": _bucket_histogram(small.convert("HSV").getchannel("S")),
+        "brightness_histogram": _bucket_histogram(small.convert("L")),
+        "pixelation": min(_pixelation(column_profile), _pixelation(row_profile)),
+        "blockiness": round(blockiness, 4)
+    }
+
+
+def _palette(image):
+    """Dominant colors with their pixel fraction, brightness and saturation"""
+    quantized = image.quantize(colors=PALETTE_COLORS, method=Image.Quantize.MEDIANCUT)
+    palette = quantized.getpalette()
+    total = image.width * image.height
+
+    colors = []
+    for count, index in sorted(quantized.getcolors(), reverse=True):
+        fraction = count / total
+        if fraction < MIN_PALETTE_FRACTION:
+            continue
+
+        r, g, b = palette[index * 3:index * 3 + 3]
+        max_channel = max(r, g, b)
+        min_channel = min(r, g, b)
+        colors.append({
+            "rgb": (r, g, b),
+            "pixel_fraction": round(fraction, 4),
+            "brightness": (r + g + b) / 3,
+            "saturation": (max_channel - min_channel) / max_channel if max_channel > 0 else 0
+        })
+    return colors
+
+
+def _bucket_histogram(channel, buckets=8):
+    """Collapse a 256-bin channel histogram into normalized buckets"""
+    histogram = channel.histogram()
+    total = sum(histogram) or 1
+    width = 256 // buckets
+    return [
+        round(sum(histogram[i * width:(i + 1) * width]) / total, 4)
+        for i in range(buckets)
+    ]
+
+
+def _gradient_profile(gray):
+    """Mean absolute difference between each pair of adjacent columns"""
+    width, height = gray.size
+    if width < 2:
+        return []
+
+    diff = ImageChops.difference(gray.crop((1, 0, width, height)), gray.crop((0, 0, width - 1, height)))
+    return list(diff.convert("F").resize((width - 1, 1), Image.BOX).getdata())
+
+
+def _grid_contrast(profile, period):
+    """How much stronger gradients are on a grid boundary than elsewhere"""
+    boundary = [value for i, value in enumerate(profile) if i % period == period - 1]
+    interior = [value for i, value in enumerate(profile) if i % period != period - 1]
+    if not boundary or not interior:
+        return 0.0
+
+    boundary_mean = sum(boundary) / len(boundary)
+    interior_mean = sum(interior) / len(interior)
+    if boundary_mean == 0:
+        return 0.0
+    return max(0.0, boundary_mean / (interior_mean + 1.0) - 1.0)
+
+
+def _pixelation(profile):
+    """
+    Share of gradient energy concentrated on a regular block grid, scaled so
+    unstructured images score near 0 and block-upscaled images near 1.
+    The share is weighted by how many of the grid's lines carry energy, so
+    a single hard edge or a two-tone split doesn't look like a grid.
+    """
+    total = sum(profile)
+    if total == 0:
+        return 0.0
+    mean = total / len(profile)
+
+    best = 0.0
+    for period in range(2, MAX_PIXEL_BLOCK + 1):
+        if len(profile) < MIN_GRID_LINES * period:
+            break
+        expected = 1 / period
+        for offset in range(period):
+            lines = profile[offset::period]
+            excess = (sum(lines) / total - expected) / (1 - expected)
+            if excess <= best:
+                continue
+            active = sum(1 for value in lines if value > mean) / len(lines)
+            best = max(best, excess * active)
+    return round(best, 4)
@@ -0,0 +1,240 @@
+import re
+import time
+import zlib
+import uuid
+import bisect
+import threading
+from collections import OrderedDict
+from utils.data_store import slang_terms
+
+# Characters rescanned on each side of an edit. Must be longer than any
+# indicator match, so live features cap the whitespace between words;
+# REPEATED_CHARS is unbounded but a run long enough to matter is already a
+# span, and spans touching an edit are rescanned whole
+CONTEXT_WINDOW = 64
+MAX_WORD_GAP = 8
+
+# Live sessions kept per worker; the least recently typed-in is dropped first
+MAX_SESSIONS = 1000
+SESSION_TTL = 15 * 60
+
+# Longer text should go through /detect-era instead
+MAX_TEXT_LENGTH = 10000
+
+REPEATED_CHARS = re.compile(r'(\w)\1{3,}')
+
+
+def _bounded(matcher):
+    """matcher with unbounded whitespace between words capped at MAX_WORD_GAP"""
+    return re.compile(matcher.pattern.replace(r"\s*", r"\s{0,%d}" % MAX_WORD_GAP), matcher.flags)
+
+
+def text_digest(text):
+    """Short hash of the lowercased text; the client computes the same one"""
+    return format(zlib.crc32(text.encode("utf-8")), "08x")
+
+
+def _lower(text):
+    """Lowercase without changing length, so client offsets stay valid"""
+    if text.isascii():
+        return text.lower()
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class RegexFeature:
+    """Non-overlapping matches of one compiled pattern"""
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+
+    def scan(self, text, lo, hi):
+        return [match.span() for match in self.matcher.finditer(text, lo, hi)]
+
+
+class SubstringFeature:
+    """Every occurrence of a slang term, overlapping ones included"""
+
+    def __init__(self, term):
+        self.term = term
+
+    def scan(self, text, lo, hi):
+        spans = []
+        index = text.find(self.term, lo, hi)
+        while index != -1:
+            spans.append((index, index + len(self.term)))
+            index = text.find(self.term, index + 1, hi)
+        return spans
+
+
+class LiveScoreSession:
+    """
+    Text being typed plus the match spans of every indicator in it.
+    An edit drops the spans near it, shifts the ones after it and rescans
+    only that stretch, so scores never need a pass over the whole text.
+    """
+
+    def __init__(self, text, era, features, window=CONTEXT_WINDOW):
+        self.text = _lower(text)
+        self.era = era
+        self.window = window
+        self.features = features
+        self.spans = [feature.scan(self.text, 0, len(self.text)) for feature in features]
+        self.exclamations = self.text.count('!')
+        self.touched = time.time()
+
+    def apply(self, start, end, insert):
+        """Replace text[start:end] with insert"""
+        insert = _lower(insert)
+        delta = len(insert) - (end - start)
+        old_text = self.text
+        self.text = old_text[:start] + insert + old_text[end:]
+        self.exclamations += insert.count('!') - old_text.count('!', start, end)
+        self.touched = time.time()
+
+        dirty_lo = max(0, start - self.window)
+        dirty_hi = end + self.window
+        for i, feature in enumerate(self.features):
+            spans = self.spans[i]
+            # Starts and ends both ascend: regex matches don't overlap and a
+            # term's occurrences all have the same length
+            first = bisect.bisect_left(spans, (dirty_lo,))
+            while first > 0 and spans[first - 1][1] > dirty_lo:
+                first -= 1
+            last = bisect.bisect_left(spans, (dirty_hi,), first)
+
+            lo = min(dirty_lo, spans[first][0]) if first < last else dirty_lo
+            hi = max(dirty_hi, spans[last - 1][1]) if first < last else dirty_hi
+            hi = min(len(self.text), hi + delta)
+
+            after = [(s + delta, e + delta) for s, e in spans[last:]]
+            self.spans[i] = spans[:first] + feature.scan(self.text, lo, hi) + after
+
+
+class IncrementalScorer:
+    """
+    Live era and cringe scores for text being typed, matching
+    EraDetector._pattern_detect and CringeMeter._pattern_rate on the full
+    text, except that a cringe phrase with more than MAX_WORD_GAP spaces
+    between its words doesn't count. Sessions live in this worker's memory;
+    each edit carries the resulting length and digest, so a missing or stale
+    copy (another worker took edits in between) asks the client to resync.
+    """
+
+    def __init__(self, era_detector, cringe_meter, window=CONTEXT_WINDOW,
+                 max_sessions=MAX_SESSIONS, session_ttl=SESSION_TTL):
+        self.era_detector = era_detector
+        self.cringe_meter = cringe_meter
+        self.window = window
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.eras = tuple(era_detector.era_matchers)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Era detection features are the same for every session
+        self._era_features = []
+        self._era_weights = []
+        for era in self.eras:
+            for matcher in era_detector.era_matchers[era]:
+                self._era_features.append(RegexFeature(_bounded(matcher)))
+                self._era_weights.append((era, 0.2, False))
+        for era in era_detector.slang_dictionary:
+            for term in slang_terms(era):
+                self._era_features.append(SubstringFeature(term))
+                self._era_weights.append((era, 0.1, True))
+        self._cringe_features = {
+            era: [RegexFeature(_bounded(matcher)) for matcher, _ in matchers]
+            for era, matchers in cringe_meter.cringe_matchers.items()
+        }
+
+    def start(self, text, era, session_id=None):
+        """Open (or, on resync, replace) a session for text and return (session_id, scores)"""
+        session = LiveScoreSession(text, era, self._features(era), self.window)
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = session
+            self._evict()
+        return session_id, self._score(session)
+
+    def update(self, session_id, start, end, insert, era, length, digest):
+        """
+        Apply one edit and return the new scores, or None to resync. length
+        and digest describe the client's text after the edit; a copy that
+        doesn't end up matching them is dropped.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or not 0 <= start <= end <= len(session.text):
+                return None
+            new_length = len(session.text) - (end - start) + len(insert)
+            if new_length != length or new_length > MAX_TEXT_LENGTH:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+
+            if era != session.era:
+                # Cringe indicators differ per era; rebuild against the new set
+                session = LiveScoreSession(session.text, era, self._features(era), self.window)
+                self._sessions[session_id] = session
+            session.apply(start, end, insert)
+            if text_digest(session.text) != digest:
+                # Same length, different text: this copy is stale
+                del self._sessions[session_id]
+                return None
+            return self._score(session)
+
+    def end(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions)}
+
+    def _features(self, era):
+        """Era detection features followed by the era's cringe features"""
+        return self._era_features + self._cringe_features.get(era, []) + [RegexFeature(REPEATED_CHARS)]
+
+    def _score(self, session):
+        counts = [len(spans) for spans in session.spans]
+        era_count = len(self._era_features)
+
+        scores = {era: 0 for era in self.eras}
+        for count, (era, weight, presence) in zip(counts, self._era_weights):
+            if count:
+                scores[era] += weight if presence else count * weight
+        total = sum(scores.values())
+        if total > 0:
+            for era in scores:
+                scores[era] /= total
+        top_era = max(scores, key=scores.get) if total > 0 else None
+
+        # Same terms as _pattern_rate: indicators, slang, '!' overuse, repeats
+        cringe = 5
+        indicators = self.cringe_meter.cringe_matchers.get(session.era, ())
+        if indicators:
+            for count, (_, weight) in zip(counts[era_count:], indicators):
+                cringe += count * weight * 0.5
+            for count, (era, _, presence) in zip(counts, self._era_weights):
+                if presence and count and era == session.era:
+                    cringe += 0.5
+            if session.exclamations > 3:
+                cringe += min(2, session.exclamations * 0.2)
+            cringe += counts[-1] * 0.4
+            cringe = max(1, min(10, cringe))
+
+        return {
+            "era_scores": {era: round(score, 4) for era, score in scores.items()},
+            "top_era": top_era,
+            "confidence": round(scores[top_era], 4) if top_era else 0.0,
+            "cringe_score": max(1, min(10, round(cringe))),
+            "length": len(session.text)
+        }
+
+    def _evict(self):
+        now = time.time()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.touched < self.session_ttl:
+                break
+            del self._sessions[session_id]
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INDEX_PATH = os.path.join(BASE_DIR, "data", "cache", "phash_index.sqlite3")
+
+# 64-bit hashes split into 4 x 16-bit chunks for multi-index hashing.
+# Two hashes within Hamming distance 3 must share at least one exact chunk.
+CHUNK_COUNT = 4
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def dhash(image, hash_size=8):
+    """Compute a 64-bit difference hash of a PIL image"""
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = gray.tobytes()
+    row_width = hash_size + 1
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * row_width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+
+def split_hash(value):
+    """Split a 64-bit hash into its 16-bit chunks, most significant first"""
+    return tuple(
+        (value >> (CHUNK_BITS * (CHUNK_COUNT - 1 - i))) & CHUNK_MASK
+        for i in range(CHUNK_COUNT)
+    )
+
+
+class PerceptualHashIndex:
+    """
+    Disk-backed near-duplicate lookup keyed by perceptual hash.
+    Each chunk column is indexed, so a lookup only touches rows sharing a
+    chunk with the query and stays fast at millions of entries.
+    """
+
+    def __init__(self, namespace, path=None, max_distance=3):
+        if max_distance >= CHUNK_COUNT:
+            raise ValueError(f"max_distance must be below {CHUNK_COUNT} for exact recall")
+
+        self.namespace = namespace
+        self.path = path or os.getenv("PHASH_INDEX_PATH", DEFAULT_INDEX_PATH)
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._connection = None
+        self._pid = None
+        # Opened now so a bad path or schema fails at startup
+        self._conn
+
+    @property
+    def _conn(self):
+        # Connections can't cross fork (gunicorn preload_app), so each process opens its own
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS phash ("
+                "namespace TEXT NOT NULL, c0 INTEGER NOT NULL, c1 INTEGER NOT NULL, "
+                "c2 INTEGER NOT NULL, c3 INTEGER NOT NULL, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            for i in range(CHUNK_COUNT):
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS phash_c{i} ON phash (namespace, c{i})"
+                )
+            conn.commit()
+            self._connection = conn
+            self._pid = os.getpid()
+        return self._connection
+
+    def lookup(self, image_hash):
+        """Return the cached value of the closest stored hash, or None"""
+        chunks = split_hash(image_hash)
+        query = " UNION ".join(
+            f"SELECT c0, c1, c2, c3, value FROM phash WHERE namespace = ? AND c{i} = ?"
+            for i in range(CHUNK_COUNT)
+        )
+        params = []
+        for i in range(CHUNK_COUNT):
+            params.extend([self.namespace, chunks[i]])
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        best_value = None
+        best_distance = self.max_distance + 1
+        for c0, c1, c2, c3, value in rows:
+            stored = (c0 << 48) | (c1 << 32) | (c2 << 16) | c3
+            distance = hamming_distance(image_hash, stored)
+            if distance < best_distance:
+                best_distance = distance
+                best_value = value
+                if distance == 0:
+                    break
+
+        if best_value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(best_value)
+
+    def add(self, image_hash, value):
+        """Store a JSON-serializable value under a perceptual hash"""
+        chunks = split_hash(image_hash)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO phash (namespace, c0, c1, c2, c3, value, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, *chunks, json.dumps(value), time.time())
+            )
+            self._conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters for this namespace"""
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,88 @@
+import re
+
+# Rough token count: about four characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Budget for a whole translation prompt. The input text is never cut, so
+# only the slang section shrinks to fit
+DEFAULT_MAX_PROMPT_TOKENS = 400
+
+# Terms always offered as style examples, even when none match the input
+STYLE_EXAMPLES = 3
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Words too common in slang meanings to say anything about relevance
+STOPWORDS = frozenset(
+    "a an and are as at be by for from i in is it my of on or so the to too "
+    "you your that this with what who how i'm im not".split()
+)
+
+
+def estimate_tokens(text):
+    """Approximate token count used for prompt budgeting"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _words(text):
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+
+class EraPromptBuilder:
+    """
+    Translation prompts built from text precompiled per era at startup.
+    Only slang whose term or meaning shares a word with the input is
+    included, best matches first, until the prompt's token budget is used.
+    """
+
+    def __init__(self, slang_dictionary, max_prompt_tokens=DEFAULT_MAX_PROMPT_TOKENS):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.prefixes = {}
+        self.entries = {}
+        self.index = {}
+
+        for era, slang_terms in slang_dictionary.items():
+            self.prefixes[era] = (
+                f"Translate the text into authentic {era} internet slang and style, "
+                f"keeping its meaning.\n"
+            )
+            # "term=meaning" entries, compact and in dictionary order
+            self.entries[era] = [f"{term}={meaning}" for term, meaning in slang_terms.items()]
+
+            era_index = {}
+            for position, (term, meaning) in enumerate(slang_terms.items()):
+                for word in set(_words(term) + _words(meaning)):
+                    era_index.setdefault(word, []).append(position)
+            self.index[era] = era_index
+
+    def build(self, text, era, instructions=""):
+        """Prompt for one request; instructions are appended after the text"""
+        prefix = self.prefixes[era]
+        body = f'Text: "{text}"\n'
+        budget = self.max_prompt_tokens - estimate_tokens(prefix + body + instructions)
+
+        slang = []
+        for position in self.select(text, era):
+            entry = self.entries[era][position]
+            cost = estimate_tokens(entry) + 1
+            if cost > budget:
+                break
+            slang.append(entry)
+            budget -= cost
+
+        slang_line = f"Slang: {'; '.join(slang)}\n" if slang else ""
+        return prefix + slang_line + body + instructions
+
+    def select(self, text, era):
+        """Positions of relevant slang, most matching words first, then style examples"""
+        era_index = self.index[era]
+        scores = {}
+        for word in _words(text):
+            for position in era_index.get(word, ()):
+                scores[position] = scores.get(position, 0) + 1
+
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        for position in range(min(STYLE_EXAMPLES, len(self.entries[era]))):
+            if position not in scores:
+                ranked.append(position)
+        return ranked
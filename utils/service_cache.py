@@ -0,0 +1,483 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, "data", "cache", "services")
+DEFAULT_CACHE_DB = os.path.join(BASE_DIR, "data", "cache", "services.sqlite3")
+
+# A worker holding a lease this long is assumed dead and the key is retaken
+LEASE_TTL = 60.0
+
+# How often a worker waiting on another worker's lease checks for the value
+LEASE_POLL_INTERVAL = 0.05
+
+# Entries an in-process cache keeps before dropping the least recently used
+MEMORY_MAX_ENTRIES = int(os.getenv("SERVICE_CACHE_MAX_ENTRIES", 10000))
+
+# How often a cache sweeps expired entries out of its backend
+PRUNE_INTERVAL = 600
+
+
+def make_key(*parts):
+    """Build a stable cache key from strings, numbers and bytes"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(bytes(part))
+        else:
+            digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def read_source(source):
+    """Bytes of an upload given as a path, bytes or file object, rewinding the file"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    data = source.read()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return data
+
+
+def static_file_exists(url):
+    """Whether a cached /static/... URL still points at a file on disk"""
+    # Output directories are relative to the working directory, like the URLs
+    return isinstance(url, str) and url.startswith("/static/") and os.path.isfile(url.lstrip("/"))
+
+
+class MemoryBackend:
+    """In-process cache storage, holding at most max_entries (LRU)"""
+
+    def __init__(self, max_entries=MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def acquire_lease(self, key, ttl):
+        with self._lock:
+            now = time.time()
+            if self._leases.get(key, 0) > now:
+                return False
+            self._leases[key] = now + ttl
+            return True
+
+    def release_lease(self, key):
+        with self._lock:
+            self._leases.pop(key, None)
+
+    def prune(self, older_than):
+        """Drop entries stored before older_than and expired leases"""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry["stored_at"] < older_than]:
+                del self._entries[key]
+            for key in [key for key, expires in self._leases.items() if expires <= now]:
+                del self._leases[key]
+
+
+class DiskBackend:
+    """One JSON file per entry under a local directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, entry):
+        # Write to a temp file first so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            print(f"Cache write error: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def acquire_lease(self, key, ttl):
+        # An exclusively created lock file is the lease; stale ones are broken
+        lease_path = os.path.join(self.directory, f"{key}.lease")
+        for _ in range(2):
+            try:
+                os.close(os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lease_path) < ttl:
+                        return False
+                    os.remove(lease_path)
+                except OSError:
+                    pass
+        return False
+
+    def release_lease(self, key):
+        try:
+            os.remove(os.path.join(self.directory, f"{key}.lease"))
+        except OSError:
+            pass
+
+    def prune(self, older_than):
+        """Remove entries written before older_than, plus stale leases and temp files"""
+        # A file's mtime is its write time, so entries needn't be opened
+        lease_cutoff = time.time() - LEASE_TTL
+        try:
+            with os.scandir(self.directory) as files:
+                for item in files:
+                    try:
+                        modified = item.stat().st_mtime
+                        if item.name.endswith(".lease"):
+                            expired = modified < lease_cutoff
+                        else:
+                            expired = modified < older_than
+                        if expired:
+                            os.remove(item.path)
+                    except OSError:
+                        pass
+        except OSError as e:
+            print(f"Cache prune error: {str(e)}")
+
+
+class SQLiteBackend:
+    """
+    Host-wide cache in one SQLite file shared by every worker process.
+    Leases live in the same database, so only one process computes a
+    missing key. Networked backends (Redis, memcached) would implement the
+    same get/set/delete/acquire_lease/release_lease methods.
+    """
+
+    def __init__(self, namespace, path=None):
+        self.namespace = namespace
+        self.path = path or os.getenv("SERVICE_CACHE_DB", DEFAULT_CACHE_DB)
+        self.owner = None
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _connection(self):
+        # Connections don't survive fork, so each worker process opens its own
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, entry TEXT NOT NULL, "
+                "stored_at REAL NOT NULL DEFAULT 0, PRIMARY KEY (namespace, key))"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(entries)")]
+            if "stored_at" not in columns:
+                try:
+                    # Rows from before the column existed read as expired
+                    self._conn.execute("ALTER TABLE entries ADD COLUMN stored_at REAL NOT NULL DEFAULT 0")
+                except sqlite3.OperationalError:
+                    pass  # another worker added it first
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (namespace, stored_at)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, owner TEXT NOT NULL, expires REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._pid = os.getpid()
+            self.owner = f"{os.uname().nodename}:{self._pid}"
+        return self._conn
+
+    def get(self, key):
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT entry FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+                ).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Cache read error: {str(e)}")
+            return None
+
+    def set(self, key, entry):
+        try:
+            with self._lock:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, entry, stored_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(entry), entry["stored_at"])
+                )
+        except sqlite3.Error as e:
+            print(f"Cache write error: {str(e)}")
+
+    def delete(self, key):
+        try:
+            with self._lock:
+                self._connection().execute(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+                )
+        except sqlite3.Error:
+            pass
+
+    def acquire_lease(self, key, ttl):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute(
+                        "SELECT expires FROM leases WHERE namespace = ? AND key = ?", (self.namespace, key)
+                    ).fetchone()
+                    acquired = row is None or row[0] <= now
+                    if acquired:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO leases (namespace, key, owner, expires) VALUES (?, ?, ?, ?)",
+                            (self.namespace, key, self.owner, now + ttl)
+                        )
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+            return acquired
+        except sqlite3.Error as e:
+            # Without the shared lock, computing locally is still correct
+            print(f"Cache lease error: {str(e)}")
+            return True
+
+    def release_lease(self, key):
+        try:
+            with self._lock:
+                self._connection().execute(
+                    "DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?",
+                    (self.namespace, key, self.owner)
+                )
+        except sqlite3.Error:
+            pass
+
+    def prune(self, older_than):
+        """Delete this namespace's entries stored before older_than, and expired leases"""
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND stored_at < ?", (self.namespace, older_than)
+                )
+                conn.execute("DELETE FROM leases WHERE expires < ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"Cache prune error: {str(e)}")
+
+
+def create_backend(namespace):
+    """Pick the storage backend from SERVICE_CACHE_BACKEND (sqlite, disk or memory)"""
+    backend = os.getenv("SERVICE_CACHE_BACKEND", "sqlite").lower()
+    if backend == "memory":
+        return MemoryBackend()
+    if backend == "sqlite":
+        return SQLiteBackend(namespace)
+    cache_dir = os.getenv("SERVICE_CACHE_DIR", DEFAULT_CACHE_DIR)
+    return DiskBackend(os.path.join(cache_dir, namespace))
+
+
+class ServiceCache:
+    """
+    Response cache for upstream service calls.
+    Entries are fresh for `ttl` seconds; for a further `stale_ttl` seconds the
+    stale value is served while one background refresh runs. Concurrent
+    misses for the same key share a single upstream call, across worker
+    processes too when the backend is shared.
+    """
+
+    def __init__(self, namespace, ttl, stale_ttl=0, backend=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend or create_backend(namespace)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.shared_waits = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.time()
+
+    def get_or_compute(self, key, compute, valid=None):
+        """
+        Return the cached value for key, computing it on a miss.
+        valid(value) can reject an entry, e.g. a URL whose file was removed.
+        """
+        entry = self.backend.get(key)
+        if entry is not None and valid is not None and not valid(entry["value"]):
+            self.backend.delete(key)
+            entry = None
+        if entry is not None:
+            age = time.time() - entry["stored_at"]
+            if age < self.ttl:
+                self.hits += 1
+                return entry["value"]
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._refresh_in_background(key, compute)
+                return entry["value"]
+
+        self.misses += 1
+        return self._single_flight(key, compute)
+
+    def peek(self, key):
+        """Return a fresh cached value without computing anything, or None"""
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry["stored_at"] < self.ttl:
+            self.hits += 1
+            return entry["value"]
+        self.misses += 1
+        return None
+
+    def store(self, key, value):
+        """Cache a value computed outside get_or_compute"""
+        self.backend.set(key, {"value": value, "stored_at": time.time()})
+        self._maintain()
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+    def stats(self):
+        """Return hit/miss counters"""
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "shared_waits": self.shared_waits,
+            "hit_rate": round((self.hits + self.stale_hits) / total, 4) if total else 0.0
+        }
+
+    def _single_flight(self, key, compute):
+        """Run compute once per key; concurrent callers wait for that result"""
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "value": None, "error": None}
+                self._inflight[key] = call
+
+        if not leader:
+            self.coalesced += 1
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["value"]
+
+        try:
+            value = self._compute_shared(key, compute)
+            call["value"] = value
+            return value
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call["event"].set()
+
+    def _compute_shared(self, key, compute):
+        """Compute under the backend lease, or wait for the process holding it"""
+        leased = self.backend.acquire_lease(key, LEASE_TTL)
+        if not leased:
+            entry, leased = self._wait_for_entry(key)
+            if entry is not None:
+                self.shared_waits += 1
+                return entry["value"]
+
+        try:
+            value = compute()
+            self.backend.set(key, {"value": value, "stored_at": time.time()})
+            self._maintain()
+            return value
+        finally:
+            if leased:
+                self.backend.release_lease(key)
+
+    def _wait_for_entry(self, key):
+        """
+        Poll while another process holds the lease. Returns (entry, leased):
+        the fresh entry it stored, or the lease once the holder gives up.
+        """
+        deadline = time.time() + LEASE_TTL
+        while time.time() < deadline:
+            time.sleep(LEASE_POLL_INTERVAL)
+            entry = self.backend.get(key)
+            if entry is not None and time.time() - entry["stored_at"] < self.ttl:
+                return entry, False
+            # The holder failed or released without storing; take over
+            if self.backend.acquire_lease(key, LEASE_TTL):
+                return None, True
+        return None, False
+
+    def _maintain(self):
+        """Occasionally sweep entries past their stale window out of the backend"""
+        now = time.time()
+        # Backends with native expiry (e.g. Redis) need no sweep
+        if now - self._last_prune < PRUNE_INTERVAL or not hasattr(self.backend, "prune"):
+            return
+        self._last_prune = now
+        self.backend.prune(now - self.ttl - self.stale_ttl)
+
+    def _refresh_in_background(self, key, compute):
+        """Recompute a stale entry without blocking the caller"""
+        with self._lock:
+            if key in self._inflight:
+                return
+
+        def refresh():
+            try:
+                self._single_flight(key, compute)
+            except Exception as e:
+                print(f"Background refresh failed for {self.namespace}: {str(e)}")
+
+        threading.Thread(target=refresh, daemon=True).start()
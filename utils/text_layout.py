@@ -0,0 +1,201 @@
+import os
+import threading
+from collections import OrderedDict
+from PIL import ImageFont
+
+FONT_PATH = "static/fonts/impact.ttf"
+MIN_FONT_SIZE = 12
+STROKE_WIDTH = 2
+LINE_SPACING = 4
+BOX_MARGIN = 10
+
+
+class FontMetrics:
+    """A font at one size with glyph advances measured once and reused"""
+
+    def __init__(self, font_path, size):
+        self.size = size
+        self.font = load_font(font_path, size)
+        self._advances = {}
+
+        # Same line pitch Pillow uses when drawing multiline text
+        self.line_height = self.font.getbbox("A", stroke_width=STROKE_WIDTH)[3] + STROKE_WIDTH + LINE_SPACING
+        ascent, descent = self.font.getmetrics()
+        self.text_height = ascent + descent + 2 * STROKE_WIDTH
+        self.space_width = self.advance(" ")
+
+    def advance(self, char):
+        width = self._advances.get(char)
+        if width is None:
+            width = self.font.getlength(char)
+            self._advances[char] = width
+        return width
+
+    def width(self, text):
+        return sum(self.advance(char) for char in text) + 2 * STROKE_WIDTH
+
+    def block_height(self, line_count):
+        return (line_count - 1) * self.line_height + self.text_height
+
+
+def load_font(font_path, size):
+    """Load a TrueType font, falling back to Pillow's default font"""
+    if os.path.exists(font_path):
+        return ImageFont.truetype(font_path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 only ships a fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+class TextLayout:
+    """Wrapped lines, font and position for one text field"""
+
+    def __init__(self, lines, metrics, position):
+        self.lines = lines
+        self.metrics = metrics
+        self.position = position
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+
+class LayoutEngine:
+    """
+    Fit captions into text field boxes.
+    The largest font size whose word-wrapped text fits the box is found by
+    binary search, and finished layouts are cached by (template, field, text).
+    """
+
+    def __init__(self, font_path=FONT_PATH, cache_size=2048):
+        self.font_path = font_path
+        self.cache_size = cache_size
+        self._metrics = {}
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def metrics(self, size):
+        metrics = self._metrics.get(size)
+        if metrics is None:
+            metrics = FontMetrics(self.font_path, size)
+            self._metrics[size] = metrics
+        return metrics
+
+    def layout(self, template_key, field_index, fields, text, image_size):
+        """
+        Return the cached or freshly computed layout for one of a template's
+        fields. template_key must change whenever the template's fields do.
+        """
+        key = (template_key, field_index, text, image_size)
+        with self._lock:
+            cached = self._layouts.get(key)
+            if cached is not None:
+                self._layouts.move_to_end(key)
+                return cached
+
+        field = fields[field_index]
+        position = tuple(field["position"])
+        box_width, box_height = field_box(field, image_size, fields)
+        max_size = field.get("font_size", 36)
+        metrics, lines = self.fit(text, box_width, box_height, max_size)
+        result = TextLayout(lines, metrics, position)
+
+        with self._lock:
+            self._layouts[key] = result
+            if len(self._layouts) > self.cache_size:
+                self._layouts.popitem(last=False)
+        return result
+
+    def fit(self, text, box_width, box_height, max_size, min_size=MIN_FONT_SIZE):
+        """Binary search the largest size at which the wrapped text fits"""
+        best = None
+        low, high = min_size, max(min_size, max_size)
+        while low <= high:
+            size = (low + high) // 2
+            metrics = self.metrics(size)
+            lines = self.wrap(text, metrics, box_width)
+            if metrics.block_height(len(lines)) <= box_height and all(
+                metrics.width(line) <= box_width for line in lines
+            ):
+                best = (metrics, lines)
+                low = size + 1
+            else:
+                high = size - 1
+
+        if best is None:
+            # Nothing fits; draw at the minimum size rather than dropping text
+            metrics = self.metrics(min_size)
+            best = (metrics, self.wrap(text, metrics, box_width))
+        return best
+
+    def wrap(self, text, metrics, max_width):
+        """Greedy word wrap using the cached glyph advances"""
+        lines = []
+        for paragraph in text.split("\n"):
+            current = ""
+            current_width = 0
+            for word in paragraph.split():
+                word_width = metrics.width(word) - 2 * STROKE_WIDTH
+                if current and current_width + metrics.space_width + word_width <= max_width:
+                    current += " " + word
+                    current_width += metrics.space_width + word_width
+                    continue
+
+                if current:
+                    lines.append(current)
+
+                # A single word wider than the box is broken by character
+                if word_width + 2 * STROKE_WIDTH <= max_width:
+                    pieces = [word]
+                else:
+                    pieces = self._break_word(word, metrics, max_width)
+                lines.extend(pieces[:-1])
+                current = pieces[-1]
+                current_width = metrics.width(current)
+            lines.append(current)
+        return lines
+
+    def _break_word(self, word, metrics, max_width):
+        pieces = []
+        current = ""
+        for char in word:
+            if current and metrics.width(current + char) > max_width:
+                pieces.append(current)
+                current = char
+            else:
+                current += char
+        pieces.append(current)
+        return pieces
+
+    def draw(self, draw, layout, color):
+        """Draw a laid out field in a single pass"""
+        draw.multiline_text(
+            layout.position,
+            layout.text,
+            font=layout.metrics.font,
+            fill=color,
+            spacing=LINE_SPACING,
+            stroke_width=STROKE_WIDTH,
+            stroke_fill="black"
+        )
+
+
+def field_box(field, image_size, fields=()):
+    """
+    Width and height available to a text field. Without explicit width and
+    height the box runs to the image edge, stopping above the next field.
+    """
+    x, y = field["position"]
+    width = field.get("width") or image_size[0] - x - BOX_MARGIN
+
+    height = field.get("height")
+    if not height:
+        bottom = image_size[1]
+        for other in fields:
+            other_y = other["position"][1]
+            if y < other_y < bottom:
+                bottom = other_y
+        height = bottom - y - BOX_MARGIN
+    return max(1, width), max(1, height)
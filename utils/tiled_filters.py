@@ -0,0 +1,110 @@
+import struct
+from PIL import Image, ImageEnhance
+
+# Working memory per strip; strips are this many bytes of pixels, whatever the image size
+TILE_BYTES = 4 * 1024 * 1024
+
+PIXEL_BLOCK = 10
+
+SEPIA_MATRIX = (
+    0.393, 0.769, 0.189, 0,
+    0.349, 0.686, 0.168, 0,
+    0.272, 0.534, 0.131, 0
+)
+
+
+def process_in_strips(img, fn, overlap=0, align=1, tile_bytes=TILE_BYTES):
+    """
+    Run fn over horizontal strips of img and write the results back in place.
+    Neighbourhood filters get `overlap` extra rows of original pixels on each
+    side; strip heights are a multiple of `align` so blocks never straddle strips.
+    """
+    width, height = img.size
+    bands = len(img.getbands())
+    rows = max(align, tile_bytes // max(1, width * bands))
+    rows -= rows % align
+
+    above = None
+    for top in range(0, height, rows):
+        bottom = min(height, top + rows)
+        crop_top = max(0, top - overlap)
+        strip = img.crop((0, crop_top, width, min(height, bottom + overlap)))
+
+        # The rows above were already overwritten, so restore their originals
+        if above is not None:
+            strip.paste(above, (0, 0))
+        if overlap and bottom < height:
+            above = img.crop((0, bottom - overlap, width, bottom))
+
+        result = fn(strip)
+        offset = top - crop_top
+        img.paste(result.crop((0, offset, width, offset + bottom - top)), (0, top))
+    return img
+
+
+def image_mean(img, tile_bytes=TILE_BYTES):
+    """Mean grey level, as ImageEnhance.Contrast computes it, from per-strip histograms"""
+    width, height = img.size
+    rows = max(1, tile_bytes // max(1, width * len(img.getbands())))
+    counts = [0] * 256
+    for top in range(0, height, rows):
+        strip = img.crop((0, top, width, min(height, top + rows))).convert("L")
+        for level, count in enumerate(strip.histogram()):
+            counts[level] += count
+    total = sum(counts) or 1
+    return int(sum(level * count for level, count in enumerate(counts)) / total + 0.5)
+
+
+def _float32(value):
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+
+def contrast_lut(img, mean, factor):
+    """Point table equivalent to ImageEnhance.Contrast around a global mean"""
+    # Image.blend works in single precision and truncates; doing the same
+    # keeps every level identical rather than off by one
+    factor = _float32(factor)
+    table = [
+        min(255, max(0, int(_float32(mean + _float32(factor * (value - mean))))))
+        for value in range(256)
+    ]
+    lut = []
+    for band in img.getbands():
+        lut.extend(table if band != "A" else range(256))
+    return lut
+
+
+def pixelate(img, block=PIXEL_BLOCK):
+    """Nearest-neighbour pixelation, one block-aligned strip at a time"""
+    def run(strip):
+        small = strip.resize(
+            (max(1, -(-strip.width // block)), max(1, -(-strip.height // block))),
+            resample=Image.NEAREST
+        )
+        return small.resize(strip.size, resample=Image.NEAREST)
+
+    return process_in_strips(img, run, align=block)
+
+
+def sharpen_saturate(img, sharpness=2.0, color=1.5):
+    """Sharpen with a 3x3 kernel (1px overlap), then boost saturation"""
+    def run(strip):
+        strip = ImageEnhance.Sharpness(strip).enhance(sharpness)
+        return ImageEnhance.Color(strip).enhance(color)
+
+    return process_in_strips(img, run, overlap=1)
+
+
+def sepia(img):
+    """Sepia tone through a colour matrix, strip by strip"""
+    return process_in_strips(img, lambda strip: strip.convert("RGB", SEPIA_MATRIX))
+
+
+def contrast_sharpen(img, contrast=1.2, sharpness=1.1):
+    """Contrast around the whole image's mean, then light sharpening"""
+    lut = contrast_lut(img, image_mean(img), contrast)
+
+    def run(strip):
+        return ImageEnhance.Sharpness(strip.point(lut)).enhance(sharpness)
+
+    return process_in_strips(img, run, overlap=1)
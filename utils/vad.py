@@ -0,0 +1,99 @@
+import sys
+from array import array
+
+FRAME_MS = 30
+MIN_SILENCE_MS = 300
+TARGET_SEGMENT_SECONDS = 15
+MAX_SEGMENT_SECONDS = 50
+ENERGY_STRIDE = 4  # Sample every 4th value; plenty for a frame energy estimate
+MIN_THRESHOLD = 200
+
+
+def frame_energies(pcm, sample_rate, frame_ms=FRAME_MS):
+    """Mean absolute amplitude of each frame of 16-bit mono PCM"""
+    samples = array("h")
+    samples.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    energies = []
+    for start in range(0, len(samples), frame_len):
+        frame = samples[start:start + frame_len:ENERGY_STRIDE]
+        energies.append(sum(map(abs, frame)) / len(frame) if frame else 0)
+    return energies, frame_len
+
+
+def detect_speech_segments(pcm, sample_rate, frame_ms=FRAME_MS, min_silence_ms=MIN_SILENCE_MS,
+                           target_seconds=TARGET_SEGMENT_SECONDS, max_seconds=MAX_SEGMENT_SECONDS):
+    """
+    Split 16-bit mono PCM at silence boundaries.
+    Returns (start_sample, end_sample) pairs covering the speech, each at most
+    `max_seconds` long. Neighbouring pieces are merged up to `target_seconds`
+    so short pauses don't turn into many tiny upstream calls.
+    """
+    energies, frame_len = frame_energies(pcm, sample_rate, frame_ms)
+    if not energies:
+        return []
+
+    # Adaptive threshold above the quietest frames, but never above half the
+    # median so clips with almost no pauses still count as speech
+    ordered = sorted(energies)
+    noise_floor = ordered[len(ordered) // 20]
+    threshold = max(MIN_THRESHOLD, min(noise_floor * 3, ordered[len(ordered) // 2] * 0.5))
+    voiced = [energy > threshold for energy in energies]
+    if not any(voiced):
+        return []
+
+    # Cut in the middle of every silence run that is long enough
+    min_silence_frames = max(1, min_silence_ms // frame_ms)
+    pad = min_silence_frames // 2
+    pieces = []
+    piece_start = None
+    last_voiced = None
+    for index, is_voiced in enumerate(voiced):
+        if not is_voiced:
+            continue
+        if piece_start is None:
+            piece_start = max(0, index - pad)
+        elif index - last_voiced - 1 >= min_silence_frames:
+            cut = (last_voiced + 1 + index) // 2
+            pieces.append((piece_start, cut))
+            piece_start = cut
+        last_voiced = index
+    pieces.append((piece_start, min(len(voiced), last_voiced + 1 + pad)))
+
+    # Merge short pieces, then split anything still too long
+    target_frames = target_seconds * 1000 // frame_ms
+    max_frames = max_seconds * 1000 // frame_ms
+    merged = []
+    for start, end in pieces:
+        if merged and end - merged[-1][0] <= target_frames:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    segments = []
+    for start, end in merged:
+        for piece in _split_long(energies, start, end, max_frames):
+            segments.append(piece)
+
+    total_samples = len(pcm) // 2
+    return [
+        (start * frame_len, min(end * frame_len, total_samples))
+        for start, end in segments
+    ]
+
+
+def _split_long(energies, start, end, max_frames):
+    """Split a frame range at its quietest frames until each part fits"""
+    parts = []
+    while end - start > max_frames:
+        # Cut at the quietest frame in the back half of the allowed window
+        window_start = start + max_frames // 2
+        window_end = start + max_frames
+        cut = min(range(window_start, window_end), key=lambda i: energies[i])
+        parts.append((start, cut))
+        start = cut
+    parts.append((start, end))
+    return parts
@@ -0,0 +1,69 @@
+import io
+from PIL import Image
+
+# Vision models don't need more than this for label/era detection
+MAX_VISION_SIDE = 1024
+MAX_VISION_BYTES = 512 * 1024
+VISION_QUALITIES = (85, 75, 65, 50, 40)
+
+
+class PreparedImage:
+    """A decoded, downscaled and re-encoded image ready for vision backends"""
+
+    def __init__(self, image, data, mime_type, original_size):
+        self.image = image
+        self.data = data
+        self.mime_type = mime_type
+        self.original_size = original_size
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def scale(self):
+        """Ratio between the prepared and the original width"""
+        return self.image.width / self.original_size[0] if self.original_size[0] else 1.0
+
+    def as_blob(self):
+        """Inline blob accepted by Gemini generate_content"""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def prepare_vision_image(image_file, max_side=MAX_VISION_SIDE, max_bytes=MAX_VISION_BYTES):
+    """
+    Decode an upload once at reduced size and re-encode it within a byte budget.
+    Already prepared images are returned unchanged so every backend in a
+    request shares the same buffer.
+    """
+    if isinstance(image_file, PreparedImage):
+        return image_file
+
+    img = Image.open(image_file)
+    original_size = img.size
+
+    # Let the JPEG decoder scale down during decode instead of after
+    if img.format == "JPEG":
+        img.draft("RGB", (max_side, max_side))
+
+    img = img.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    # Reset the file pointer for future use
+    if hasattr(image_file, "seek"):
+        image_file.seek(0)
+
+    data = _encode_within_budget(img, max_bytes)
+    return PreparedImage(img, data, "image/jpeg", original_size)
+
+
+def _encode_within_budget(img, max_bytes):
+    """Encode as JPEG, stepping quality down until it fits the budget"""
+    data = b""
+    for quality in VISION_QUALITIES:
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=quality, optimize=True)
+        data = buffer.getvalue()
+        if len(data) <= max_bytes:
+            break
+    return data